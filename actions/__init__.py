@@ -1,5 +1,6 @@
 # actions/__init__.py
 from .actions_busqueda.actions_busqueda import ActionBusquedaSituacion
+from .actions_busqueda.actions_paginacion import ActionPaginaResultados
 from .actions_confneg import ActionConfNegAgradecer
 from .actions_smalltalk import ActionSmallTalkSituacion
 from .actions_context_validation import ActionContextValidator
@@ -9,6 +10,7 @@ from .actions_fallback import ActionFallback
 
 __all__ = [
     'ActionBusquedaSituacion',
+    'ActionPaginaResultados',
     'ActionConfNegAgradecer', 
     'ActionSmallTalkSituacion',
     'ActionContextValidator',
@@ -23,7 +23,11 @@ from actions.config import (
     get_entity_suggestions
 )
 from actions.models.model_manager import get_search_engine
-from ..conversation_state import ConversationState, SuggestionManager, create_smart_suggestion, get_improved_suggestions
+from actions.search_result_store import get_search_result_store
+from ..conversation_state import (
+    ConversationState, SuggestionManager, create_smart_suggestion, get_improved_suggestions,
+    append_search_history, history_timestamp
+)
 from .comparison_detector import ComparisonDetector
 from .modification_detector import ModificationDetector
 from ..helpers import validate_entities_for_intent, validate_entity_detection
@@ -236,7 +240,7 @@ class ActionBusquedaSituacion(Action):
             
             # ✅ Formatear y enviar resultados
             if result.get('type') == 'search_success':
-                self._send_search_results(result, dispatcher)
+                self._send_search_results(result, dispatcher, tracker.sender_id)
             
             events.extend(self._process_result(result, context))
             logger.info(f"[ActionBusquedaSituacion] Completado. Eventos: {len(events)}")
@@ -312,12 +316,18 @@ class ActionBusquedaSituacion(Action):
                 if is_gpu:
                     logger.info("[HandleSearch] 🚀 Ruta: GPU (flujo original preservado)")
                     
+                    # La API arranca con el pre-análisis mientras el LLM piensa
+                    speculative = self.search_engine.start_speculative_direct(
+                        pre_analyzed_params, search_type
+                    )
+                    
                     llm_result = self.search_engine.execute_search(
                         search_params=pre_analyzed_params,
                         search_type=search_type,
                         user_message=user_message,
                         is_modification=False,
-                        previous_params=None
+                        previous_params=None,
+                        speculative=speculative
                     )
                 
                 # --- RUTA 2: CPU SIMPLE (BYPASS DIRECTO) ---
@@ -346,6 +356,11 @@ class ActionBusquedaSituacion(Action):
                 else:
                     logger.info("[HandleSearch] 🐢 Ruta: CPU con LLM (timeout 40s + fallback)")
                     
+                    # La API arranca con el pre-análisis mientras el LLM piensa
+                    speculative = self.search_engine.start_speculative_direct(
+                        pre_analyzed_params, search_type
+                    )
+                    
                     # Intentar con LLM CPU (timeout 40s)
                     cpu_result = self.search_engine_cpu.execute_with_timeout(
                         pre_analyzed_params=pre_analyzed_params,
@@ -362,9 +377,9 @@ class ActionBusquedaSituacion(Action):
                         final_action = cpu_result["action"]
                         final_search_type = "ofertas" if final_action == "search_offers" else "productos"
                         
-                        # Ejecutar búsqueda con parámetros del LLM
-                        direct_result = self.search_engine.execute_direct(
-                            final_params, final_search_type
+                        # Ejecutar búsqueda con parámetros del LLM (o reutilizar la especulativa)
+                        direct_result = self.search_engine.execute_direct_or_reuse(
+                            final_params, final_search_type, speculative
                         )
                         
                         llm_result = {
@@ -381,8 +396,8 @@ class ActionBusquedaSituacion(Action):
                     else:
                         logger.warning("[HandleSearch] ⚠️ CPU LLM falló/timeout, usando fallback (pre-análisis)")
                         
-                        direct_result = self.search_engine.execute_direct(
-                            pre_analyzed_params, search_type
+                        direct_result = self.search_engine.execute_direct_or_reuse(
+                            pre_analyzed_params, search_type, speculative
                         )
                         
                         llm_result = {
@@ -889,9 +904,12 @@ class ActionBusquedaSituacion(Action):
 
     # ============== SEND RESULTS ==============
     
-    def _send_search_results(self, result: Dict[str, Any], dispatcher: CollectingDispatcher) -> None:
+    def _send_search_results(self, result: Dict[str, Any], dispatcher: CollectingDispatcher,
+                             sender_id: Optional[str] = None) -> None:
         """
-        Envía un solo mensaje con 'text' (resumen) y 'custom' (JSON)
+        Envía un solo mensaje con 'text' (resumen) y 'custom' (JSON).
+        Con SEARCH_RESULTS_PAGINATION solo viaja la primera página; el resto
+        queda en el action server bajo custom['pagination']['handle'].
         """
         try:
             search_results = result.get('search_results', {})
@@ -907,6 +925,10 @@ class ActionBusquedaSituacion(Action):
                 item_type = "ofertas" if search_type == "ofertas" else "productos"
                 text_message = f"✅ Encontré {total_results} {item_type}."
             
+            search_results, pagination = get_search_result_store().paginate(
+                search_results, search_type, sender_id
+            )
+            
             # Payload custom
             custom_payload = {
                 "type": "search_results",
@@ -917,6 +939,8 @@ class ActionBusquedaSituacion(Action):
                 "search_results": search_results,
                 "comparison_analysis": result.get('comparison_info')
             }
+            if pagination:
+                custom_payload["pagination"] = pagination
             
             dispatcher.utter_message(
                 text=text_message,
@@ -1269,10 +1293,8 @@ class ActionBusquedaSituacion(Action):
                 ])
             
             elif result_type == 'search_success':
-                search_history = context.get('search_history', [])
-                
                 history_entry = {
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': history_timestamp(),
                     'type': result['search_type'],
                     'parameters': result['parameters'],
                     'status': 'completed'
@@ -1285,7 +1307,7 @@ class ActionBusquedaSituacion(Action):
                         'operator': result['comparison_info'].get('operator')
                     }
                 
-                search_history.append(history_entry)
+                search_history = append_search_history(context.get('search_history', []), history_entry)
                 
                 events.extend([
                     SlotSet("search_history", search_history),
@@ -0,0 +1,55 @@
+# actions/actions_busqueda/actions_paginacion.py
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.events import EventType
+
+from actions.search_result_store import get_search_result_store
+
+logger = logging.getLogger(__name__)
+
+
+class ActionPaginaResultados(Action):
+    """
+    Devuelve una página de un resultado de búsqueda guardado por
+    ActionBusquedaSituacion. No pasa por el NLU: bot/main.py la invoca
+    directo contra el webhook con el handle y la página en
+    latest_message.metadata.
+    """
+
+    def name(self) -> str:
+        return "action_pagina_resultados_busqueda"
+
+    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[str, Any]) -> List[EventType]:
+        metadata = (tracker.latest_message or {}).get('metadata') or {}
+        handle = metadata.get('handle')
+
+        try:
+            page = int(metadata.get('page', 1))
+        except (TypeError, ValueError):
+            page = 1
+
+        found = get_search_result_store().get_page(handle, page, tracker.sender_id) if handle else None
+
+        if found is None:
+            logger.info(f"[PaginaResultados] Handle inexistente o vencido: {handle}")
+            dispatcher.utter_message(
+                text="Esos resultados ya no están disponibles, repetí la búsqueda.",
+                custom={"type": "search_results_page", "error": "handle_not_found", "handle": handle}
+            )
+            return []
+
+        search_type, search_results, pagination = found
+        dispatcher.utter_message(custom={
+            "type": "search_results_page",
+            "search_type": search_type,
+            "timestamp": datetime.now().isoformat(),
+            "search_results": search_results,
+            "pagination": pagination
+        })
+
+        logger.info(f"[PaginaResultados] Página {pagination['page']}/{pagination['total_pages']} de {handle[:8]}")
+        return []
@@ -55,6 +55,79 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+_PERCENT_RE = re.compile(r'\d+\s*%')
+_DIGIT_RE = re.compile(r'\d')
+
+
+def _name_groups(pattern: str, prefix: str) -> Tuple[str, List[str]]:
+    """Convierte los grupos de captura sin nombre de pattern en grupos nombrados prefix0, prefix1..."""
+    out = []
+    names = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if char == '(' and not pattern.startswith('(?', i):
+            name = f"{prefix}{len(names)}"
+            names.append(name)
+            out.append(f"(?P<{name}>")
+        else:
+            out.append(char)
+        i += 1
+    return ''.join(out), names
+
+
+class CompiledPatternSet:
+    """
+    Todos los patrones de una categoría compilados en una sola alternancia.
+
+    Cada patrón queda como `(?P<aN>...)` dentro de un lookahead, así finditer
+    prueba la alternancia en cada posición del texto en una única pasada y el
+    resultado respeta la prioridad original: gana el primer patrón (en orden
+    de operador y de lista) que matchee en cualquier parte del texto.
+
+    Si todos los patrones exigen un dígito, los textos sin números se
+    descartan sin correr la alternancia (la mayoría de los mensajes).
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        parts = []
+        self.alternatives: List[Tuple[str, List[str]]] = []
+        for operator, operator_patterns in patterns.items():
+            for pattern in operator_patterns:
+                index = len(self.alternatives)
+                named_pattern, group_names = _name_groups(pattern, f"a{index}_")
+                parts.append(f"(?P<a{index}>{named_pattern})")
+                self.alternatives.append((operator, group_names))
+        self.regex = re.compile(f"(?=(?:{'|'.join(parts)}))", re.IGNORECASE)
+        self.requires_digit = all(
+            '\\d' in pattern for operator_patterns in patterns.values() for pattern in operator_patterns
+        )
+
+    def search(self, text: str) -> Optional[Tuple[str, List[Optional[str]]]]:
+        """(operador, grupos del patrón) del match de mayor prioridad, o None"""
+        if self.requires_digit and not _DIGIT_RE.search(text):
+            return None
+
+        best_index = None
+        best_match = None
+        for match in self.regex.finditer(text):
+            index = int(match.lastgroup[1:])
+            if best_index is None or index < best_index:
+                best_index, best_match = index, match
+                if index == 0:
+                    break
+
+        if best_match is None:
+            return None
+
+        operator, group_names = self.alternatives[best_index]
+        return operator, [best_match.group(name) for name in group_names]
+
+
 class ComparisonDetector:
     """Detecta y procesa comparaciones en el texto del usuario"""
     
@@ -177,6 +250,16 @@ class ComparisonDetector:
             ]
         }
         
+        # ========== COMPILACIÓN (una alternancia por categoría) ==========
+        self._compiled = {
+            'numeric': CompiledPatternSet(self.numeric_patterns),
+            'price': CompiledPatternSet(self.price_patterns),
+            'quality': CompiledPatternSet(self.quality_patterns),
+            'temporal': CompiledPatternSet(self.temporal_patterns),
+            'quantity': CompiledPatternSet(self.quantity_patterns),
+            'size': CompiledPatternSet(self.size_patterns)
+        }
+        
         logger.info("[ComparisonDetector] ✅ Inicializado con todos los patrones")
     
     def detect_comparison(self, text: str, entities: List[Dict[str, Any]]) -> ComparisonResult:
@@ -274,18 +357,16 @@ class ComparisonDetector:
                 return None
             
             # Intentar detectar operador
-            for operator, patterns in self.numeric_patterns.items():
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        value = match.group(1)
-                        return {
-                            'detected': True,
-                            'type': 'numeric',
-                            'operator': operator,
-                            'value': value,
-                            'confidence': 0.9
-                        }
+            found = self._compiled['numeric'].search(text)
+            if found:
+                operator, groups = found
+                return {
+                    'detected': True,
+                    'type': 'numeric',
+                    'operator': operator,
+                    'value': groups[0],
+                    'confidence': 0.9
+                }
             
             # Si hay entidad pero no operador, asumir equal_to
             return {
@@ -303,17 +384,16 @@ class ComparisonDetector:
     def _detect_price_comparison(self, text: str) -> Optional[Dict[str, Any]]:
         """Detecta comparaciones de precio"""
         try:
-            for operator, patterns in self.price_patterns.items():
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        return {
-                            'detected': True,
-                            'type': 'price',
-                            'operator': operator,
-                            'value': match.group(1),
-                            'confidence': 0.85
-                        }
+            found = self._compiled['price'].search(text)
+            if found:
+                operator, groups = found
+                return {
+                    'detected': True,
+                    'type': 'price',
+                    'operator': operator,
+                    'value': groups[0],
+                    'confidence': 0.85
+                }
             return None
             
         except Exception as e:
@@ -323,15 +403,14 @@ class ComparisonDetector:
     def _detect_quality_comparison(self, text: str) -> Optional[Dict[str, Any]]:
         """Detecta comparaciones de calidad"""
         try:
-            for operator, patterns in self.quality_patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        return {
-                            'detected': True,
-                            'type': 'quality',
-                            'operator': operator,
-                            'confidence': 0.8
-                        }
+            found = self._compiled['quality'].search(text)
+            if found:
+                return {
+                    'detected': True,
+                    'type': 'quality',
+                    'operator': found[0],
+                    'confidence': 0.8
+                }
             return None
             
         except Exception as e:
@@ -351,20 +430,18 @@ class ComparisonDetector:
                 return None
             
             # Evitar confundir porcentajes con meses
-            if re.search(r'\d+\s*%', text):
+            if _PERCENT_RE.search(text):
                 logger.debug("[ComparisonDetector] Descartado temporal: contiene porcentajes")
                 return None
             
-            for comparison_type, patterns in self.temporal_patterns.items():
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        return {
-                            'detected': True,
-                            'type': 'temporal',
-                            'operator': comparison_type,
-                            'confidence': 0.75
-                        }
+            found = self._compiled['temporal'].search(text)
+            if found:
+                return {
+                    'detected': True,
+                    'type': 'temporal',
+                    'operator': found[0],
+                    'confidence': 0.75
+                }
             
             return None
             
@@ -375,17 +452,16 @@ class ComparisonDetector:
     def _detect_quantity_comparison(self, text: str) -> Optional[Dict[str, Any]]:
         """Detecta comparaciones de cantidad"""
         try:
-            for operator, patterns in self.quantity_patterns.items():
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        return {
-                            'detected': True,
-                            'type': 'quantity',
-                            'operator': operator,
-                            'value': match.group(1),
-                            'confidence': 0.8
-                        }
+            found = self._compiled['quantity'].search(text)
+            if found:
+                operator, groups = found
+                return {
+                    'detected': True,
+                    'type': 'quantity',
+                    'operator': operator,
+                    'value': groups[0],
+                    'confidence': 0.8
+                }
             return None
             
         except Exception as e:
@@ -395,21 +471,17 @@ class ComparisonDetector:
     def _detect_size_comparison(self, text: str) -> Optional[Dict[str, Any]]:
         """Detecta comparaciones de tamaño"""
         try:
-            for operator, patterns in self.size_patterns.items():
-                for pattern in patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        value = match.group(1)
-                        unit = match.group(2) if match.lastindex >= 2 else None
-                        
-                        return {
-                            'detected': True,
-                            'type': 'size',
-                            'operator': operator,
-                            'value': value,
-                            'unit': unit,
-                            'confidence': 0.8
-                        }
+            found = self._compiled['size'].search(text)
+            if found:
+                operator, groups = found
+                return {
+                    'detected': True,
+                    'type': 'size',
+                    'operator': operator,
+                    'value': groups[0],
+                    'unit': groups[1] if len(groups) >= 2 else None,
+                    'confidence': 0.8
+                }
             return None
             
         except Exception as e:
@@ -13,7 +13,7 @@ from actions.functions.chat_handler import generate_with_safe_fallback
 
 from .helpers import validate_entities_for_intent
 from .logger import log_message
-from .conversation_state import ConversationState
+from .conversation_state import ConversationState, append_search_history, history_timestamp
 
 
 class ActionFallback(Action):
@@ -136,8 +136,8 @@ class ActionFallback(Action):
     ) -> Optional[List[EventType]]:
         """
         Usa el modelo de búsqueda (MistralB) para:
-        1. Clasificar si es búsqueda o conversacional
-        2a. Si es búsqueda → generar parámetros y ejecutar
+        1. Clasificar si es búsqueda o conversacional (y extraer parámetros, misma llamada)
+        2a. Si es búsqueda → ejecutar con los parámetros ya extraídos
         2b. Si NO es búsqueda → generar respuesta conversacional con LLM
         """
         try:
@@ -146,9 +146,11 @@ class ActionFallback(Action):
             
             user_msg = context.get('user_message', '')
             
-            # ===== PASO 1: CLASIFICAR =====
+            # ===== PASO 1: CLASIFICAR + EXTRAER (una sola generación) =====
             logger.info(f"[LLM Classify] Clasificando mensaje: '{user_msg}'")
-            classification = search_engine.classify_intent(user_msg, context)
+            classification = search_engine.classify_and_extract(
+                user_msg, context, search_type="productos"
+            )
             
             is_search = classification.get('is_search', False)
             confidence = classification.get('confidence', 0.0)
@@ -161,17 +163,10 @@ class ActionFallback(Action):
                 f"    Razón: {reasoning}"
             )
             
-            # ===== PASO 2a: ES BÚSQUEDA → GENERAR Y EJECUTAR =====
+            # ===== PASO 2a: ES BÚSQUEDA → EJECUTAR =====
             if is_search and confidence >= 0.6:  # Umbral de confianza
-                logger.info("[LLM Classify] ✅ Generando parámetros de búsqueda con LLM...")
-                
-                # Generar parámetros de búsqueda
-                generation_result = search_engine.generate_search_from_message(
-                    user_msg, context, search_type="productos"
-                )
-                
-                if not generation_result.get('success'):
-                    logger.error(f"[LLM Classify] ❌ Error generando búsqueda: {generation_result.get('error')}")
+                if not classification.get('success') or not classification.get('search_params'):
+                    logger.error(f"[LLM Classify] ❌ Error generando búsqueda: {classification.get('error', 'sin parámetros')}")
                     # Fallback a mensaje conversacional
                     dispatcher.utter_message(
                         "Entiendo que quieres buscar algo, pero no pude entender bien los detalles. "
@@ -179,24 +174,18 @@ class ActionFallback(Action):
                     )
                     return [SlotSet("user_engagement_level", "needs_clarification")]
                 
-                search_params = generation_result['search_params']
-                search_type = generation_result['search_type']
-                llm_time = generation_result.get('llm_time', 0.0)
+                search_params = classification['search_params']
+                search_type = classification['search_type']
+                llm_time = classification.get('llm_time', 0.0)
                 
                 logger.info(
                     f"[LLM Classify] ✅ Parámetros generados: {json.dumps(search_params)}\n"
                     f"    Tipo: {search_type}, Tiempo LLM: {llm_time:.2f}s"
                 )
                 
-                # Ejecutar búsqueda
+                # Ejecutar búsqueda (los params ya vienen del LLM, no hace falta otra pasada)
                 try:
-                    search_result = search_engine.execute_search(
-                        search_params=search_params,
-                        search_type=search_type,
-                        user_message=user_msg,
-                        is_modification=False,
-                        previous_params=None
-                    )
+                    search_result = search_engine.execute_direct(search_params, search_type)
                     
                     if search_result.get('success'):
                         total_results = search_result.get('total_results', 0)
@@ -225,9 +214,8 @@ class ActionFallback(Action):
                         dispatcher.utter_message(text=text_message, custom=custom_payload)
                         
                         # Actualizar historial
-                        search_history = context.get('search_history', [])
-                        search_history.append({
-                            'timestamp': datetime.now().isoformat(),
+                        search_history = append_search_history(context.get('search_history', []), {
+                            'timestamp': history_timestamp(),
                             'type': search_type,
                             'parameters': search_params,
                             'status': 'completed_by_llm',
@@ -405,8 +393,7 @@ Confirma amigablemente que agregaste los nuevos parámetros y procederás con la
                         "completed_from_suggestion": True, "timestamp": datetime.now().isoformat()
                     })
                     
-                    search_history = context.get('search_history', [])
-                    search_history.append({'timestamp': datetime.now().isoformat(), 'type': search_type, 'parameters': combined_params, 'status': 'completed_from_suggestion'})
+                    search_history = append_search_history(context.get('search_history', []), {'timestamp': history_timestamp(), 'type': search_type, 'parameters': combined_params, 'status': 'completed_from_suggestion'})
                     events.extend([SlotSet("search_history", search_history), SlotSet("pending_suggestion", None), SlotSet("user_engagement_level", "satisfied")])
                 else:
                     criteria = pending_suggestion.get('required_criteria', 'información adicional')
@@ -8,7 +8,8 @@ import random
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
-from actions.functions.chat_handler import generate_with_safe_fallback
+from actions.functions.chat_handler import USER_TEXT_PLACEHOLDER, generate_with_safe_fallback
+from actions.conversation_state import append_search_history, history_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -51,8 +52,13 @@ class ActionHandleOutOfContext(Action):
             # LÓGICA CONVERSACIONAL EXISTENTE
             # ============================================================
             
-            # 1. Construir el prompt contextual
-            prompt = self._get_contextual_prompt(current_intent, user_message, tracker)
+            # 1. Construir el prompt contextual. Las consultas veterinarias no se
+            # reutilizan entre usuarios (y detectan emergencias sobre el texto real);
+            # el resto lleva el placeholder y el chat_handler inserta user_message
+            is_medical = current_intent == "consulta_veterinaria_profesional"
+            prompt = self._get_contextual_prompt(
+                current_intent, user_message if is_medical else USER_TEXT_PLACEHOLDER, tracker
+            )
             
             # 2. Definir parámetros para la generación
             max_tokens = 150 if current_intent == "consulta_veterinaria_profesional" else 100
@@ -64,7 +70,11 @@ class ActionHandleOutOfContext(Action):
                 tracker=tracker,
                 fallback_template=f"utter_{current_intent}",
                 max_new_tokens=max_tokens,
-                temperature=0.7
+                temperature=0.7,
+                cache_scope=None if is_medical else f"outofcontext:{current_intent}",
+                user_text=user_message,
+                # Off-topic es texto libre: solo el mismo mensaje normalizado, sin variantes
+                cache_similar=False
             )
 
             # 4. Enviar botones de seguimiento
@@ -95,8 +105,8 @@ class ActionHandleOutOfContext(Action):
     ) -> Optional[List[EventType]]:
         """
         Usa el modelo de búsqueda (MistralB) para:
-        1. Clasificar si es búsqueda o conversacional
-        2a. Si es búsqueda → generar parámetros y ejecutar
+        1. Clasificar si es búsqueda o conversacional (y extraer parámetros, misma llamada)
+        2a. Si es búsqueda → ejecutar con los parámetros ya extraídos
         2b. Si NO es búsqueda → retornar None para continuar con lógica conversacional
         """
         try:
@@ -106,9 +116,11 @@ class ActionHandleOutOfContext(Action):
             # Construir contexto
             context = self._build_context_dict(tracker)
             
-            # ===== PASO 1: CLASIFICAR =====
+            # ===== PASO 1: CLASIFICAR + EXTRAER (una sola generación) =====
             logger.info(f"[OutOfContext LLM] Clasificando: '{user_message}'")
-            classification = search_engine.classify_intent(user_message, context)
+            classification = search_engine.classify_and_extract(
+                user_message, context, search_type="productos"
+            )
             
             is_search = classification.get('is_search', False)
             confidence = classification.get('confidence', 0.0)
@@ -121,17 +133,12 @@ class ActionHandleOutOfContext(Action):
                 f"    Razón: {reasoning}"
             )
             
-            # ===== PASO 2a: ES BÚSQUEDA → GENERAR Y EJECUTAR =====
+            # ===== PASO 2a: ES BÚSQUEDA → EJECUTAR =====
             if is_search and confidence >= 0.6:  # Umbral de confianza
-                logger.info("[OutOfContext LLM] ✅ Detectada búsqueda, generando parámetros...")
+                logger.info("[OutOfContext LLM] ✅ Detectada búsqueda")
                 
-                # Generar parámetros de búsqueda
-                generation_result = search_engine.generate_search_from_message(
-                    user_message, context, search_type="productos"
-                )
-                
-                if not generation_result.get('success'):
-                    logger.error(f"[OutOfContext LLM] ❌ Error generando búsqueda: {generation_result.get('error')}")
+                if not classification.get('success') or not classification.get('search_params'):
+                    logger.error(f"[OutOfContext LLM] ❌ Error generando búsqueda: {classification.get('error', 'sin parámetros')}")
                     # Fallback a mensaje conversacional
                     dispatcher.utter_message(
                         "Creo que querés buscar algo, pero no entendí bien. "
@@ -139,24 +146,18 @@ class ActionHandleOutOfContext(Action):
                     )
                     return [SlotSet("user_engagement_level", "needs_clarification")]
                 
-                search_params = generation_result['search_params']
-                search_type = generation_result['search_type']
-                llm_time = generation_result.get('llm_time', 0.0)
+                search_params = classification['search_params']
+                search_type = classification['search_type']
+                llm_time = classification.get('llm_time', 0.0)
                 
                 logger.info(
                     f"[OutOfContext LLM] ✅ Parámetros: {search_params}\n"
                     f"    Tipo: {search_type}, Tiempo: {llm_time:.2f}s"
                 )
                 
-                # Ejecutar búsqueda
+                # Ejecutar búsqueda (los params ya vienen del LLM, no hace falta otra pasada)
                 try:
-                    search_result = search_engine.execute_search(
-                        search_params=search_params,
-                        search_type=search_type,
-                        user_message=user_message,
-                        is_modification=False,
-                        previous_params=None
-                    )
+                    search_result = search_engine.execute_direct(search_params, search_type)
                     
                     if search_result.get('success'):
                         total_results = search_result.get('total_results', 0)
@@ -186,9 +187,8 @@ class ActionHandleOutOfContext(Action):
                         dispatcher.utter_message(text=text_message, custom=custom_payload)
                         
                         # Actualizar historial
-                        search_history = context.get('search_history', [])
-                        search_history.append({
-                            'timestamp': datetime.now().isoformat(),
+                        search_history = append_search_history(context.get('search_history', []), {
+                            'timestamp': history_timestamp(),
                             'type': search_type,
                             'parameters': search_params,
                             'status': 'completed_by_llm',
@@ -2,12 +2,13 @@
 
 import logging
 from typing import Any, Dict, List
-from datetime import datetime
 
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, EventType
 
+from actions.conversation_state import append_search_history, history_timestamp
+
 logger = logging.getLogger(__name__)
 
 class ActionRecomendaciones(Action):
@@ -60,15 +61,14 @@ class ActionRecomendaciones(Action):
             ]
             
             # Agregar al historial con información del análisis
-            search_history = tracker.get_slot("search_history") or []
             history_entry = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': history_timestamp(),
                 'type': 'recommendation_request',
                 'recommendation_analysis': recommendation_analysis,
                 'status': 'not_available',
                 'intent': current_intent
             }
-            search_history.append(history_entry)
+            search_history = append_search_history(tracker.get_slot("search_history") or [], history_entry)
             events.append(SlotSet("search_history", search_history))
             
             logger.info(f"[ActionRecomendaciones] Procesamiento completado. {len(events)} eventos generados")
@@ -1,6 +1,6 @@
 # actions/actions_smalltalk_situacion.py
 
-from actions.functions.chat_handler import generate_with_safe_fallback
+from actions.functions.chat_handler import USER_TEXT_PLACEHOLDER, generate_with_safe_fallback
 from actions.logger import log_message
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
@@ -37,8 +37,8 @@ class ActionSmallTalkSituacion(Action):
             current_intent = tracker.latest_message.get("intent", {}).get("name", "")
             user_message = tracker.latest_message.get("text", "")
 
-            # 1. Preparar los parámetros
-            prompt = self._get_simple_prompt(current_intent, user_message)
+            # 1. Preparar los parámetros (el chat_handler inserta user_message en el placeholder)
+            prompt = self._get_simple_prompt(current_intent, USER_TEXT_PLACEHOLDER)
             temp = 0.6 if current_intent in ["saludo", "despedida"] else 0.7
             max_tokens = 30 if current_intent in ["saludo", "despedida"] else 40
             
@@ -54,7 +54,10 @@ class ActionSmallTalkSituacion(Action):
                 # Usamos un template de Rasa como fallback prioritario
                 fallback_template=f"utter_{current_intent}",
                 max_new_tokens=max_tokens,
-                temperature=temp
+                temperature=temp,
+                # Saludos/agradecimientos casi iguales reutilizan la generación
+                cache_scope=f"smalltalk:{current_intent}",
+                user_text=user_message
             )
 
         except Exception as e:
@@ -1,8 +1,17 @@
 # actions/api_client.py
+import copy
+import json
+import os
+import random
+import re
 import requests
+import requests.adapters
 import logging
+import threading
 import time
-from typing import Dict, Any, Tuple
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Callable, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +26,337 @@ API_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# ============== CONFIGURACIÓN ==============
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))
+API_POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", "16"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "2"))            # reintentos por request
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.25"))   # base del backoff (s)
+API_RETRY_MAX_BACKOFF = float(os.getenv("API_RETRY_MAX_BACKOFF", "2"))
+# Tope de tiempo total (s) de un GET sumando todos sus intentos y esperas
+API_RETRY_MAX_TOTAL = float(os.getenv("API_RETRY_MAX_TOTAL", "35"))
+# Presupuesto global: reintentos <= ratio * requests + mínimo (evita tormentas de reintentos)
+API_RETRY_BUDGET_RATIO = float(os.getenv("API_RETRY_BUDGET_RATIO", "0.2"))
+API_RETRY_BUDGET_MIN = int(os.getenv("API_RETRY_BUDGET_MIN", "5"))
+RETRYABLE_STATUS = {502, 503, 504}
+
+# Cache de resultados de búsqueda
+API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "true").lower() == "true"
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "60"))                 # segundos
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+# Ventana extra (s) en la que se sirve un resultado vencido mientras se refresca en background (0 = apagado)
+API_CACHE_STALE_WHILE_REVALIDATE = float(os.getenv("API_CACHE_STALE_WHILE_REVALIDATE", "0"))
+# ===========================================
+
+
+class PooledAPIClient:
+    """
+    Sesión HTTP compartida hacia el backend Django: pool keep-alive (sin
+    handshake por búsqueda), respuestas comprimidas y reintentos acotados
+    con backoff + jitter para GETs (idempotentes), con tope de tiempo total.
+    """
+    
+    def __init__(self, pool_maxsize: int = API_POOL_MAXSIZE):
+        self.session = requests.Session()
+        self.adapter = requests.adapters.HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=pool_maxsize
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update(API_HEADERS)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
+        })
+        
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "retries_denied": 0, "retries_expired": 0, "failures": 0}
+    
+    def get(self, url: str, params: Dict[str, Any], timeout: float = API_TIMEOUT) -> requests.Response:
+        """
+        GET con reintentos ante errores de conexión y 502/503/504. Un read
+        timeout no se reintenta (el backend ya tardó el timeout entero y
+        repetirlo solo duplica la espera). Además todos los intentos comparten
+        un tope de API_RETRY_MAX_TOTAL segundos: cada reintento usa como
+        timeout lo que queda de ese tope. Devuelve la última respuesta (el
+        llamador hace raise_for_status) o propaga la última excepción de requests.
+        """
+        deadline = time.monotonic() + max(timeout, API_RETRY_MAX_TOTAL)
+        attempt = 0
+        while True:
+            with self._lock:
+                self._stats["requests"] += 1
+            
+            attempt_timeout = min(timeout, deadline - time.monotonic())
+            try:
+                response = self.session.get(url, params=params, timeout=attempt_timeout)
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                delay = self._backoff(attempt)
+                if not self._within_deadline(deadline, delay) or not self._can_retry(attempt):
+                    return response
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            except requests.exceptions.ConnectionError as e:
+                # Incluye ConnectTimeout; un ReadTimeout no es ConnectionError y se propaga directo
+                delay = self._backoff(attempt)
+                if not self._within_deadline(deadline, delay) or not self._can_retry(attempt):
+                    with self._lock:
+                        self._stats["failures"] += 1
+                    raise
+                reason = type(e).__name__
+            except requests.exceptions.Timeout:
+                with self._lock:
+                    self._stats["failures"] += 1
+                raise
+            
+            attempt += 1
+            logger.warning(f"🔁 [APIClient] {reason}, reintento {attempt}/{API_MAX_RETRIES} en {delay:.2f}s")
+            time.sleep(delay)
+    
+    def _within_deadline(self, deadline: float, delay: float) -> bool:
+        """Queda tiempo para esperar el backoff y hacer un intento útil (al menos 1s)"""
+        if deadline - time.monotonic() - delay >= 1.0:
+            return True
+        with self._lock:
+            self._stats["retries_expired"] += 1
+        return False
+    
+    def _can_retry(self, attempt: int) -> bool:
+        if attempt >= API_MAX_RETRIES:
+            return False
+        
+        with self._lock:
+            budget = API_RETRY_BUDGET_MIN + API_RETRY_BUDGET_RATIO * self._stats["requests"]
+            if self._stats["retries"] >= budget:
+                self._stats["retries_denied"] += 1
+                return False
+            self._stats["retries"] += 1
+            return True
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full jitter: uniforme entre 0 y base * 2^intento (con tope)"""
+        cap = min(API_RETRY_MAX_BACKOFF, API_RETRY_BACKOFF * (2 ** attempt))
+        return random.uniform(0, cap)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de reintentos y reutilización de conexiones del pool"""
+        with self._lock:
+            stats = dict(self._stats)
+        
+        new_connections = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += getattr(pool, "num_connections", 0)
+            pooled_requests += getattr(pool, "num_requests", 0)
+        
+        stats["new_connections"] = new_connections
+        stats["pooled_requests"] = pooled_requests
+        stats["connection_reuse_rate"] = (
+            round(1 - new_connections / pooled_requests, 3) if pooled_requests else 0.0
+        )
+        return stats
+
+
+# ============== INSTANCIA GLOBAL ==============
+_api_client: Optional[PooledAPIClient] = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client() -> PooledAPIClient:
+    """Obtiene el cliente HTTP compartido"""
+    global _api_client
+    if _api_client is None:
+        with _api_client_lock:
+            if _api_client is None:
+                _api_client = PooledAPIClient()
+    return _api_client
+
+
+def get_api_client_stats() -> Dict[str, Any]:
+    return get_api_client().get_stats()
+
+
+# ============== CACHE DE RESULTADOS ==============
+
+_PRODUCT_KEY_RE = re.compile(r"^(producto|dosis_\w+)_\d+$")
+# Decimal "plano" (sin exponente). Con cero a la izquierda ("007", "0779...") es un código, no un número
+_PLAIN_NUMBER_RE = re.compile(r"^[+-]?(0|[1-9]\d*)(\.\d+)?$|^[+-]?\.\d+$")
+
+
+def _canonical_scalar(value: Any) -> str:
+    """
+    Normalización sin pérdida: 20 == 20.0 == "20" y 0.5 == "0.50", pero dos
+    números distintos nunca colapsan (EANs, códigos largos) y los códigos que
+    no son números planos quedan como texto.
+    """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    text = re.sub(r"\s+", " ", str(value).strip().lower())
+    if not _PLAIN_NUMBER_RE.match(text):
+        return text
+    number = Decimal(text)
+    if number == number.to_integral_value():
+        return str(int(number))
+    return format(number.normalize(), "f")
+
+
+def canonicalize_api_params(api_params: Dict[str, Any]) -> str:
+    """
+    Forma canónica de los params que arma SearchEngine._transform_params_for_api:
+    claves y valores en minúsculas y sin espacios sobrantes, números normalizados
+    ("20" == 20 == 20.0), listas con comas ordenadas y sin duplicados, vacíos
+    descartados. producto_N / dosis_*_N conservan su posición (la dosis va con
+    el producto 1).
+    """
+    canonical = {}
+    for key, value in (api_params or {}).items():
+        if value is None or value == "" or value == []:
+            continue
+        
+        key = str(key).strip().lower()
+        if isinstance(value, (list, tuple)):
+            parts = [_canonical_scalar(v) for v in value]
+        elif isinstance(value, str) and "," in value and not _PRODUCT_KEY_RE.match(key):
+            parts = [_canonical_scalar(v) for v in value.split(",")]
+        else:
+            canonical[key] = _canonical_scalar(value)
+            continue
+        
+        parts = sorted({part for part in parts if part})
+        if parts:
+            canonical[key] = ",".join(parts)
+    
+    return json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+
+
+class SearchResultCache:
+    """
+    Cache LRU + TTL de respuestas normalizadas de la API, thread-safe.
+    Con stale-while-revalidate, un resultado vencido hace menos de
+    API_CACHE_STALE_WHILE_REVALIDATE segundos se devuelve igual y se refresca
+    en un hilo aparte (uno por clave).
+    """
+    
+    def __init__(self, ttl: float = API_CACHE_TTL, max_entries: int = API_CACHE_MAX_ENTRIES,
+                 stale_while_revalidate: float = API_CACHE_STALE_WHILE_REVALIDATE,
+                 enabled: bool = API_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0}
+    
+    def get_or_fetch(self, kind: str, api_params: Dict[str, Any],
+                     fetch: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], float]]) -> Tuple[Dict[str, Any], float]:
+        if not self.enabled:
+            return fetch(api_params)
+        
+        start = time.time()
+        key = (kind, canonicalize_api_params(api_params))
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, data = entry
+                age = start - stored_at
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    logger.info(f"⚡ [APIClient] Cache hit {kind} ({age:.1f}s)")
+                    return copy.deepcopy(data), time.time() - start
+                
+                if age <= self.ttl + self.stale_while_revalidate:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, api_params, fetch),
+                            name="api-cache-refresh", daemon=True
+                        ).start()
+                    logger.info(f"⚡ [APIClient] Cache stale {kind} ({age:.1f}s), refrescando en background")
+                    return copy.deepcopy(data), time.time() - start
+                
+                del self._entries[key]
+            self._stats["misses"] += 1
+        
+        data, api_time = fetch(api_params)
+        self._store(key, data)
+        return data, api_time
+    
+    def _refresh(self, key: Tuple[str, str], api_params: Dict[str, Any],
+                 fetch: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], float]]):
+        try:
+            data, _ = fetch(api_params)
+            self._store(key, data)
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ [APIClient] Error refrescando cache: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def _store(self, key: Tuple[str, str], data: Dict[str, Any]):
+        # Los errores (backend caído, 4xx) no se cachean
+        if data.get("error"):
+            return
+        
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+_result_cache = SearchResultCache()
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    return _result_cache.get_stats()
+
+
+def clear_search_cache():
+    _result_cache.clear()
+
+
 def search_products(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    """Busca productos en la API (con cache de resultados por params canónicos)"""
+    return _result_cache.get_or_fetch("productos", api_params, _fetch_products)
+
+
+def search_offers(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    """Busca ofertas en la API (con cache de resultados por params canónicos)"""
+    return _result_cache.get_or_fetch("ofertas", api_params, _fetch_offers)
+
+
+def _fetch_products(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
     """
     Busca productos en la API.
     
@@ -35,12 +374,7 @@ def search_products(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
     
     api_start = time.time()
     try:
-        response = requests.get(
-            PRODUCT_SEARCH_URL,
-            params=api_params,
-            headers=API_HEADERS,
-            timeout=30
-        )
+        response = get_api_client().get(PRODUCT_SEARCH_URL, api_params)
         api_time = time.time() - api_start
         
         logger.info(f"📥 [APIClient] Status Code: {response.status_code}")
@@ -99,7 +433,7 @@ def search_products(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
         }, api_time
 
 
-def search_offers(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+def _fetch_offers(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
     """
     Busca ofertas en la API.
     
@@ -117,12 +451,7 @@ def search_offers(api_params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
     
     api_start = time.time()
     try:
-        response = requests.get(
-            OFFER_SEARCH_URL,
-            params=api_params,
-            headers=API_HEADERS,
-            timeout=30
-        )
+        response = get_api_client().get(OFFER_SEARCH_URL, api_params)
         api_time = time.time() - api_start
         
         logger.info(f"📥 [APIClient] Status Code: {response.status_code}")
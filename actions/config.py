@@ -1,57 +1,130 @@
 # actions/utils/config.py
 
 import logging
+import threading
+import time
 import yaml
-import unicodedata
 import os
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Any, Optional, Tuple
 
 
+from actions.config_snapshot import get_snapshot_stats, load_with_snapshot
+from actions.lookup_index import LookupIndex, build_lookup_indexes, normalize_text
+from actions.suggestion_cache import get_suggestion_cache, get_suggestion_cache_stats
 from actions.models.model_manager import get_search_engine
 from actions.models.model_manager import get_chat_model
+from actions.models.model_manager import get_model_readiness
+from actions.models.model_manager import get_broker_stats
 
 
 logger = logging.getLogger(__name__)
 
-class DomainBasedConfigurationManager:
+# Tope de candidatos (por trigramas) sobre los que corre difflib en sugerencias
+SUGGESTION_CANDIDATE_LIMIT = int(os.getenv("SUGGESTION_CANDIDATE_LIMIT", "200"))
+
+# Hot reload: cada cuántos segundos se revisa si cambiaron domain.yml / lookup_tables.yml (0 = apagado)
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", "5"))
+
+@dataclass(frozen=True)
+class ConfigState:
     """
-    Gestor de configuración que extrae TODO del domain.yml y carga los modelos.
-    Sin dependencias circulares, usando domain como fuente única de verdad.
+    Snapshot de la configuración recargable. Nunca se modifica en el lugar:
+    un hot reload arma uno nuevo y lo publica reasignando una sola referencia,
+    así que quien tomó el snapshot al empezar una operación lo ve completo
+    (tablas, índices, mapeos y health del mismo load) hasta el final.
     """
-    
-    _instance = None
-    _config_loaded = False
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        if not self._config_loaded:
-            # Estructuras de datos principales
-            self.domain_data = {}
-            self.lookup_tables = {}
-            self.intent_config = {}
-            
-            # Instancias de modelos
-            self.chat_model_instance = None 
-            self.search_engine_instance = None
-            
-            # Mapeos derivados
-            self.intent_to_slots = {}
-            self.intent_to_action = {}
-            self.entity_to_slot_mapping = {}
-            self.search_intent_mappings = {}
-            
-            # Estado del sistema
-            self._health_status = {}
-            
-            # Cargar configuración
-            self._load_all_configs()
-            DomainBasedConfigurationManager._config_loaded = True
-    
+    domain_data: Dict[str, Any] = field(default_factory=dict)
+    lookup_tables: Dict[str, List[str]] = field(default_factory=dict)
+    lookup_index: Dict[str, LookupIndex] = field(default_factory=dict)
+    intent_config: Dict[str, Any] = field(default_factory=dict)
+
+    # Instancias de modelos (no se recargan, pasan de un snapshot al siguiente)
+    chat_model_instance: Optional[Any] = None
+    search_engine_instance: Optional[Any] = None
+
+    # Mapeos derivados
+    intent_to_slots: Dict[str, List[str]] = field(default_factory=dict)
+    intent_to_action: Dict[str, str] = field(default_factory=dict)
+    entity_to_slot_mapping: Dict[str, str] = field(default_factory=dict)
+    search_intent_mappings: Dict[str, Any] = field(default_factory=dict)
+    lookup_to_domain_mapping: Dict[str, str] = field(default_factory=dict)
+
+    # Estado del sistema
+    health_status: Dict[str, Any] = field(default_factory=dict)
+
+    # Archivos de origen (para detectar cambios)
+    domain_source: Optional[Path] = None
+    lookup_source: Optional[Path] = None
+    source_signature: Optional[tuple] = None
+
+
+def _compute_source_signature(domain_source: Optional[Path], lookup_source: Optional[Path]) -> tuple:
+    """(path, mtime_ns, tamaño) de los archivos cargados"""
+    signature = []
+    for source in (domain_source, lookup_source):
+        if source is None:
+            continue
+        try:
+            stat = source.stat()
+            signature.append((str(source), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((str(source), None, None))
+    return tuple(signature)
+
+
+class _ConfigStaging:
+    """
+    Arma una configuración completa (parseo, índices, mapeos, health) fuera
+    del manager. Lo usan la carga inicial y cada hot reload; el resultado se
+    congela con freeze() y recién ahí se publica.
+    """
+
+    def __init__(self, chat_model_instance: Optional[Any] = None, search_engine_instance: Optional[Any] = None):
+        # Estructuras de datos principales
+        self.domain_data = {}
+        self.lookup_tables = {}
+        self.lookup_index: Dict[str, LookupIndex] = {}
+        self.intent_config = {}
+
+        # Instancias de modelos
+        self.chat_model_instance = chat_model_instance
+        self.search_engine_instance = search_engine_instance
+
+        # Mapeos derivados
+        self.intent_to_slots = {}
+        self.intent_to_action = {}
+        self.entity_to_slot_mapping = {}
+        self.search_intent_mappings = {}
+        self.lookup_to_domain_mapping = {}
+
+        # Estado del sistema
+        self._health_status = self._new_health_status()
+
+        # Archivos de origen (para detectar cambios)
+        self._domain_source: Optional[Path] = None
+        self._lookup_source: Optional[Path] = None
+
+    def freeze(self) -> ConfigState:
+        return ConfigState(
+            domain_data=self.domain_data,
+            lookup_tables=self.lookup_tables,
+            lookup_index=self.lookup_index,
+            intent_config=self.intent_config,
+            chat_model_instance=self.chat_model_instance,
+            search_engine_instance=self.search_engine_instance,
+            intent_to_slots=self.intent_to_slots,
+            intent_to_action=self.intent_to_action,
+            entity_to_slot_mapping=self.entity_to_slot_mapping,
+            search_intent_mappings=self.search_intent_mappings,
+            lookup_to_domain_mapping=self.lookup_to_domain_mapping,
+            health_status=self._health_status,
+            domain_source=self._domain_source,
+            lookup_source=self._lookup_source,
+            source_signature=_compute_source_signature(self._domain_source, self._lookup_source)
+        )
+
     def _detect_project_root(self) -> Path:
         """Detecta automáticamente la raíz del proyecto Rasa"""
         root = Path(__file__).parent.parent / "actions"
@@ -102,50 +175,62 @@ class DomainBasedConfigurationManager:
     def _load_all_configs(self):
         """Carga toda la configuración: domain, lookups y AMBOS modelos."""
         try:
-            self._health_status = {
-                'domain_loaded': False,
-                'lookup_tables_loaded': False,
-                'chat_model_loaded': False,
-                'search_engine_loaded': False,
-                'critical_errors': [],
-                'warnings': [],
-                'paths_tried': {'domain': [], 'lookup': []}
-            }
-            
-            # 1. Cargar domain.yml
-            domain_loaded = self._load_domain()
-            self._health_status['domain_loaded'] = domain_loaded
-            
-            # 2. Extraer configuración del domain
-            if domain_loaded:
-                self._extract_config_from_domain()
-            
-            # 3. Cargar lookup tables
-            lookup_loaded = self._load_lookup_tables()
-            self._health_status['lookup_tables_loaded'] = lookup_loaded
-            
+            # 1-3. Cargar domain.yml, extraer su configuración y cargar lookup tables
+            self._load_sources()
+
             # 4. Obtener ChatModel
             chat_model_loaded = self._get_chat_model_instance()
             self._health_status['chat_model_loaded'] = chat_model_loaded
-            
+
             # 5. Obtener SearchEngine
             search_engine_loaded = self._get_search_engine_instance()
             self._health_status['search_engine_loaded'] = search_engine_loaded
-            
+
             # 6. Construir mapeos inteligentes
             self._build_intelligent_mappings()
-            
+
             # 7. Validar estado del sistema
             self._validate_system_health()
-            
-            # 8. Reportar estado
-            self._report_loading_status()
-            
+
         except Exception as e:
             logger.error(f"Error crítico cargando configuración: {e}", exc_info=True)
             self._health_status['critical_errors'].append(str(e))
             self._set_fallback_config()
 
+    def _load_sources(self) -> Tuple[bool, bool]:
+        """Domain + lookup tables, con el tiempo de carga en el health. Devuelve (domain, lookups) cargados."""
+        load_start = time.perf_counter()
+        domain_loaded = self._load_domain()
+        self._health_status['domain_loaded'] = domain_loaded
+
+        if domain_loaded:
+            self._extract_config_from_domain()
+
+        lookup_loaded = self._load_lookup_tables()
+        self._health_status['lookup_tables_loaded'] = lookup_loaded
+
+        config_load_ms = (time.perf_counter() - load_start) * 1000
+        snapshot_stats = get_snapshot_stats()
+        self._health_status['config_load_ms'] = round(config_load_ms, 1)
+        self._health_status['config_snapshot'] = snapshot_stats
+        logger.info(
+            f"⏱️ [Config] Domain + lookups cargados en {config_load_ms:.1f}ms "
+            f"(snapshots: {snapshot_stats['hits']} hits, {snapshot_stats['misses']} regenerados)"
+        )
+        return domain_loaded, lookup_loaded
+
+    @staticmethod
+    def _new_health_status() -> Dict[str, Any]:
+        return {
+            'domain_loaded': False,
+            'lookup_tables_loaded': False,
+            'chat_model_loaded': False,
+            'search_engine_loaded': False,
+            'critical_errors': [],
+            'warnings': [],
+            'paths_tried': {'domain': [], 'lookup': []}
+        }
+
     def _get_chat_model_instance(self) -> bool:
         """
         Obtiene la instancia del ChatModel desde el ModelManager.
@@ -209,11 +294,11 @@ class DomainBasedConfigurationManager:
             
             try:
                 if domain_path.exists() and domain_path.is_file():
-                    with open(domain_path, 'r', encoding='utf-8') as f:
-                        domain_data = yaml.safe_load(f)
+                    domain_data = load_with_snapshot(domain_path, "domain", yaml.safe_load)
                     
                     if domain_data and isinstance(domain_data, dict):
                         self.domain_data = domain_data
+                        self._domain_source = domain_path
                         logger.info(f"✅ Domain cargado desde: {domain_path}")
                         intents = domain_data.get('intents', [])
                         entities = domain_data.get('entities', [])
@@ -322,6 +407,9 @@ class DomainBasedConfigurationManager:
                     
                     if loaded_lookups:
                         self.lookup_tables = loaded_lookups
+                        self.lookup_index = build_lookup_indexes(loaded_lookups)
+                        self._lookup_source = lookup_path
+                        get_suggestion_cache().invalidate("lookup tables recargadas")
                         logger.info(f"✅ Lookup tables cargadas desde: {lookup_path}")
                         logger.info(f"   Categorías: {list(loaded_lookups.keys())}")
                         logger.info(f"   Total elementos: {sum(len(v) for v in loaded_lookups.values())}")
@@ -338,9 +426,11 @@ class DomainBasedConfigurationManager:
         return False
     
     def _parse_lookup_file(self, path: Path) -> Dict[str, List[str]]:
-        """Parsea archivo de lookup tables"""
-        with open(path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        """Parsea archivo de lookup tables (vía snapshot compilado si el YAML no cambió)"""
+        return load_with_snapshot(path, "lookup_tables", self._parse_lookup_text)
+    
+    def _parse_lookup_text(self, text: str) -> Dict[str, List[str]]:
+        data = yaml.safe_load(text)
         
         if not data:
             return {}
@@ -513,6 +603,74 @@ class DomainBasedConfigurationManager:
             'has_critical_categories': len(missing_critical) == 0
         })
 
+    def _set_fallback_config(self):
+        """Configuración de emergencia"""
+        logger.warning("🆘 Activando configuración de emergencia")
+        
+        if self.domain_data:
+            try:
+                self._extract_config_from_domain()
+                self._build_intelligent_mappings()
+                return
+            except Exception as e:
+                logger.error(f"Error en configuración de emergencia: {e}")
+        
+        self.intent_config = {"intents": {}, "entities": {}, "slots": {}}
+        self.lookup_tables = {}
+        self.lookup_index = {}
+        get_suggestion_cache().invalidate("configuración de emergencia")
+        self.intent_to_slots = {}
+        self.intent_to_action = {}
+
+
+def _state_property(name: str) -> property:
+    """Atributo de solo lectura que se resuelve contra el snapshot publicado"""
+    return property(lambda self: getattr(self._state, name))
+
+
+class DomainBasedConfigurationManager:
+    """
+    Gestor de configuración que extrae TODO del domain.yml y carga los modelos.
+    Sin dependencias circulares, usando domain como fuente única de verdad.
+    
+    Todo lo recargable vive en un ConfigState inmutable (self._state). Cada
+    operación toma una sola referencia al snapshot y trabaja sobre ella.
+    """
+    
+    _instance = None
+    _config_loaded = False
+    _reload_lock = threading.Lock()
+    
+    # Compatibilidad: los atributos de siempre, leídos del snapshot actual
+    domain_data = _state_property('domain_data')
+    lookup_tables = _state_property('lookup_tables')
+    lookup_index = _state_property('lookup_index')
+    intent_config = _state_property('intent_config')
+    chat_model_instance = _state_property('chat_model_instance')
+    search_engine_instance = _state_property('search_engine_instance')
+    intent_to_slots = _state_property('intent_to_slots')
+    intent_to_action = _state_property('intent_to_action')
+    entity_to_slot_mapping = _state_property('entity_to_slot_mapping')
+    search_intent_mappings = _state_property('search_intent_mappings')
+    lookup_to_domain_mapping = _state_property('lookup_to_domain_mapping')
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if not self._config_loaded:
+            self._state = ConfigState()
+            
+            # Cargar configuración
+            staging = _ConfigStaging()
+            staging._load_all_configs()
+            self._state = staging.freeze()
+            self._report_loading_status()
+            DomainBasedConfigurationManager._config_loaded = True
+            self._start_config_watcher()
+    
     def _report_loading_status(self):
         """Reporta estado de carga"""
         status = self.get_health_status()
@@ -543,133 +701,232 @@ class DomainBasedConfigurationManager:
         
         logger.info("=" * 60)
 
-    def _set_fallback_config(self):
-        """Configuración de emergencia"""
-        logger.warning("🆘 Activando configuración de emergencia")
+    # === HOT RELOAD ===
+    
+    def reload(self, reason: str = "manual") -> bool:
+        """
+        Recarga domain.yml + lookup tables sin reiniciar el action server.
         
-        if self.domain_data:
+        Todo se construye en un _ConfigStaging (parseo, índices, mapeos,
+        health) y recién al final se publica con una única asignación de
+        self._state, así que los lectores ven el snapshot viejo o el nuevo
+        completo, nunca uno a medio armar. Los requests en curso no toman
+        ningún lock.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            logger.info(f"🔄 [Config] Recargando configuración ({reason})...")
+            
+            current = self._state
+            staging = _ConfigStaging(current.chat_model_instance, current.search_engine_instance)
+            staging._health_status['chat_model_loaded'] = current.health_status.get('chat_model_loaded', False)
+            staging._health_status['search_engine_loaded'] = current.health_status.get('search_engine_loaded', False)
+            
             try:
-                self._extract_config_from_domain()
-                self._build_intelligent_mappings()
-                return
+                domain_loaded, lookup_loaded = staging._load_sources()
+                if not domain_loaded or not lookup_loaded:
+                    logger.warning("⚠️ [Config] Reload abortado: se mantiene la configuración actual")
+                    # No reintentar en cada tick del watcher hasta que el archivo vuelva a cambiar
+                    self._state = replace(current, source_signature=self._current_signature(current))
+                    return False
+                
+                staging._build_intelligent_mappings()
+                staging._validate_system_health()
+                new_state = staging.freeze()
             except Exception as e:
-                logger.error(f"Error en configuración de emergencia: {e}")
+                logger.error(f"❌ [Config] Error recargando configuración: {e}", exc_info=True)
+                self._state = replace(current, source_signature=self._current_signature(current))
+                return False
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            new_state.health_status['last_reload'] = {
+                'reason': reason,
+                'at': time.time(),
+                'duration_ms': round(elapsed_ms, 1)
+            }
+            
+            # Publicación atómica: una sola reasignación de referencia
+            self._state = new_state
+            _publish_exports()
+            get_suggestion_cache().invalidate("hot reload")
+            
+            logger.info(
+                f"✅ [Config] Configuración recargada en {elapsed_ms:.1f}ms: "
+                f"{len(new_state.intent_config.get('intents', {}))} intents, "
+                f"{sum(len(v) for v in new_state.lookup_tables.values())} valores de lookup"
+            )
+            return True
+    
+    @staticmethod
+    def _current_signature(state: ConfigState) -> tuple:
+        return _compute_source_signature(state.domain_source, state.lookup_source)
+    
+    def _start_config_watcher(self):
+        if CONFIG_WATCH_INTERVAL <= 0:
+            return
         
-        self.intent_config = {"intents": {}, "entities": {}, "slots": {}}
-        self.lookup_tables = {}
-        self.intent_to_slots = {}
-        self.intent_to_action = {}
+        thread = threading.Thread(target=self._watch_config_files, name="config-watcher", daemon=True)
+        thread.start()
+        logger.info(f"👀 [Config] Hot reload activo (revisión cada {CONFIG_WATCH_INTERVAL:g}s)")
+    
+    def _watch_config_files(self):
+        stop = threading.Event()
+        while not stop.wait(CONFIG_WATCH_INTERVAL):
+            try:
+                state = self._state
+                if state.source_signature and self._current_signature(state) != state.source_signature:
+                    self.reload("archivo modificado")
+            except Exception as e:
+                logger.warning(f"⚠️ [Config] Error en el watcher de configuración: {e}")
     
     # === MÉTODOS PÚBLICOS ===
     
     def get_chat_model(self) -> Optional[Any]:
         """Devuelve la instancia del ChatModel."""
-        return self.chat_model_instance
+        return self._state.chat_model_instance
     
     def get_search_engine(self) -> Optional[Any]:
         """Devuelve la instancia del SearchEngine."""
-        return self.search_engine_instance
+        return self._state.search_engine_instance
 
     def get_intent_config(self) -> Dict[str, Any]:
-        return self.intent_config
+        return self._state.intent_config
     
     def get_lookup_tables(self) -> Dict[str, List[str]]:
-        return self.lookup_tables
+        return self._state.lookup_tables
     
     def get_entities_for_intent(self, intent_name: str) -> List[str]:
-        return self.intent_to_slots.get(intent_name, [])
+        return self._state.intent_to_slots.get(intent_name, [])
     
     def get_action_for_intent(self, intent_name: str) -> Optional[str]:
-        return self.intent_to_action.get(intent_name)
+        return self._state.intent_to_action.get(intent_name)
     
     def validate_entity_value(self, entity_type: str, value: str) -> bool:
-        if not self.lookup_tables:
+        state = self._state
+        if not state.lookup_tables:
             logger.debug("No hay lookup tables, aceptando valor")
             return True
         
-        if entity_type in self.lookup_tables:
-            return self._check_value_in_lookup(entity_type, value)
+        if entity_type in state.lookup_tables:
+            return self._check_value_in_lookup(state, entity_type, value)
         
-        for lookup_cat, domain_entity in getattr(self, 'lookup_to_domain_mapping', {}).items():
-            if domain_entity == entity_type and lookup_cat in self.lookup_tables:
+        for lookup_cat, domain_entity in state.lookup_to_domain_mapping.items():
+            if domain_entity == entity_type and lookup_cat in state.lookup_tables:
                 logger.debug(f"Validando '{value}' en '{entity_type}' usando lookup '{lookup_cat}'")
-                return self._check_value_in_lookup(lookup_cat, value)
+                return self._check_value_in_lookup(state, lookup_cat, value)
         
         logger.debug(f"No hay lookup para '{entity_type}', aceptando valor")
         return True
     
-    def _check_value_in_lookup(self, lookup_category: str, value: str) -> bool:
+    def _check_value_in_lookup(self, state: ConfigState, lookup_category: str, value: str) -> bool:
         try:
-            normalized_value = normalize_text(value)
-            normalized_lookup = [normalize_text(v) for v in self.lookup_tables[lookup_category]]
-            return normalized_value in normalized_lookup
+            return self._get_or_build_index(state, lookup_category).contains(value)
         except Exception as e:
             logger.error(f"Error validando '{value}' en '{lookup_category}': {e}")
             return True
     
     def get_entity_suggestions(self, entity_type: str, value: str, max_suggestions: int = 3) -> List[str]:
-        lookup_category = self._resolve_lookup_category(entity_type)
+        cache = get_suggestion_cache()
+        key = cache.make_key("get_entity_suggestions", entity_type, value, max_suggestions)
+        return cache.get_or_compute(
+            key, lambda: self._compute_entity_suggestions(entity_type, value, max_suggestions)
+        )
+    
+    def _compute_entity_suggestions(self, entity_type: str, value: str, max_suggestions: int) -> List[str]:
+        state = self._state
+        lookup_category = self._resolve_lookup_category(state, entity_type)
         
-        if not lookup_category or lookup_category not in self.lookup_tables:
+        if not lookup_category or lookup_category not in state.lookup_tables:
             return []
         
         try:
             import difflib
             
+            index = self._get_or_build_index(state, lookup_category)
             normalized_value = normalize_text(value)
-            original_values = self.lookup_tables[lookup_category]
-            normalized_lookup = [normalize_text(v) for v in original_values]
+            
+            # Candidatos por trigramas compartidos; en tablas chicas, todas
+            if len(index) <= SUGGESTION_CANDIDATE_LIMIT:
+                candidates = index.normalized
+            else:
+                candidates = [
+                    index.normalized[pos]
+                    for pos in index.ngram_candidates(normalized_value, SUGGESTION_CANDIDATE_LIMIT)
+                ]
             
             suggestions = difflib.get_close_matches(
-                normalized_value, normalized_lookup, n=max_suggestions, cutoff=0.6
+                normalized_value, candidates, n=max_suggestions, cutoff=0.6
             )
             
-            original_suggestions = []
-            for suggestion in suggestions:
-                for original in original_values:
-                    if normalize_text(original) == suggestion:
-                        original_suggestions.append(original)
-                        break
-            
-            return original_suggestions
+            return [index.original_for(suggestion) for suggestion in suggestions]
             
         except Exception as e:
             logger.error(f"Error obteniendo sugerencias para '{value}': {e}")
             return []
     
-    def _resolve_lookup_category(self, entity_type: str) -> Optional[str]:
-        if entity_type in self.lookup_tables:
+    @staticmethod
+    def _get_or_build_index(state: ConfigState, lookup_category: str) -> LookupIndex:
+        """
+        Índice de la categoría dentro del mismo snapshot. Si no coincide con la
+        tabla (alguien la modificó a mano) se arma uno local para esta
+        operación, sin tocar el snapshot publicado; para que el cambio quede,
+        hay que pasar por reload().
+        """
+        table = state.lookup_tables[lookup_category]
+        index = state.lookup_index.get(lookup_category)
+        if index is None or len(index) != len(table):
+            index = LookupIndex(lookup_category, table)
+        return index
+    
+    def get_lookup_index(self, entity_type: str) -> Optional[LookupIndex]:
+        """Índice precomputado para una entidad (resuelve lookup -> domain)"""
+        state = self._state
+        lookup_category = self._resolve_lookup_category(state, entity_type)
+        if not lookup_category or lookup_category not in state.lookup_tables:
+            return None
+        return self._get_or_build_index(state, lookup_category)
+    
+    @staticmethod
+    def _resolve_lookup_category(state: ConfigState, entity_type: str) -> Optional[str]:
+        if entity_type in state.lookup_tables:
             return entity_type
         
-        for lookup_cat, domain_entity in getattr(self, 'lookup_to_domain_mapping', {}).items():
+        for lookup_cat, domain_entity in state.lookup_to_domain_mapping.items():
             if domain_entity == entity_type:
                 return lookup_cat
         
         return None
     
     def get_health_status(self) -> Dict[str, Any]:
-        return self._health_status.copy()
+        status = self._state.health_status.copy()
+        # Los modelos se inicializan en background: el estado se consulta en vivo
+        status['models_readiness'] = get_model_readiness()
+        status['broker_traffic'] = get_broker_stats()
+        return status
     
     def get_search_intent_info(self, intent_name: str) -> Dict[str, Any]:
-        return self.search_intent_mappings.get(intent_name, {})
-
-
-# Función utilitaria
-def normalize_text(text: str) -> str:
-    if not text:
-        return ""
-    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("utf-8").lower()
+        return self._state.search_intent_mappings.get(intent_name, {})
 
 
 # === INSTANCIA GLOBAL Y EXPORTS ===
 
 config_manager = DomainBasedConfigurationManager()
 
-# Exports para compatibilidad
+# Exports para compatibilidad (se reasignan en cada hot reload; preferir los getters)
 INTENT_CONFIG = config_manager.get_intent_config()
 LOOKUP_TABLES = config_manager.get_lookup_tables()
 INTENT_TO_SLOTS = config_manager.intent_to_slots
 INTENT_TO_ACTION = config_manager.intent_to_action
+
+
+def _publish_exports():
+    global INTENT_CONFIG, LOOKUP_TABLES, INTENT_TO_SLOTS, INTENT_TO_ACTION
+    state = config_manager._state
+    INTENT_CONFIG = state.intent_config
+    LOOKUP_TABLES = state.lookup_tables
+    INTENT_TO_SLOTS = state.intent_to_slots
+    INTENT_TO_ACTION = state.intent_to_action
+
 CHAT_MODEL = config_manager.get_chat_model()
 SEARCH_ENGINE = config_manager.get_search_engine()
 
@@ -688,6 +945,13 @@ def validate_entity_value(entity_type: str, value: str) -> bool:
 def get_entity_suggestions(entity_type: str, value: str, max_suggestions: int = 3) -> List[str]:
     return config_manager.get_entity_suggestions(entity_type, value, max_suggestions)
 
+def get_lookup_index(entity_type: str) -> Optional[LookupIndex]:
+    return config_manager.get_lookup_index(entity_type)
+
+def reload_configuration(reason: str = "manual") -> bool:
+    """Recarga domain + lookups en caliente (ver DomainBasedConfigurationManager.reload)"""
+    return config_manager.reload(reason)
+
 def get_search_engine():
     """Función helper para obtener SearchEngine"""
     return config_manager.get_search_engine()
@@ -703,6 +967,7 @@ def diagnose_domain_configuration():
     logger.info(f"   📚 Lookup tables: {'✅' if health.get('lookup_tables_loaded') else '❌'}")
     logger.info(f"   💬 ChatModel: {'✅' if health.get('chat_model_loaded') else '❌'}")
     logger.info(f"   🔍 SearchEngine: {'✅' if health.get('search_engine_loaded') else '❌'}")
+    logger.info(f"   🧵 Modelos: {health.get('models_readiness', {}).get('state', 'unknown')}")
     logger.info("-" * 15)
     logger.info(f"   🔍 Intents totales: {health.get('total_intents', 0)}")
     logger.info(f"   🔎 Intents de búsqueda: {health.get('search_intents_count', 0)}")
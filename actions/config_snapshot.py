@@ -0,0 +1,119 @@
+# actions/config_snapshot.py
+"""
+Snapshots compilados (pickle) de los YAML que lee el gestor de configuración.
+
+Parsear domain.yml y lookup_tables.yml con yaml.safe_load cuesta decenas de ms
+en cada arranque del action server. El resultado ya procesado se guarda junto
+con el mtime, el tamaño y el sha256 del YAML de origen; si el archivo no cambió
+se carga el pickle, y si cambió se vuelve a parsear y se reescribe el snapshot.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============== CONFIGURACIÓN ==============
+CONFIG_SNAPSHOT_ENABLED = os.getenv("CONFIG_SNAPSHOT_ENABLED", "true").lower() == "true"
+CONFIG_SNAPSHOT_DIR = os.getenv("CONFIG_SNAPSHOT_DIR", os.path.join(BASE_DIR, ".cache", "config_snapshots"))
+# Subir cuando cambie la forma de lo que se guarda (p.ej. el parser de lookups)
+CONFIG_SNAPSHOT_VERSION = 1
+# ===========================================
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(stat: str):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def _snapshot_path(source: Path, kind: str) -> Path:
+    source_id = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+    return Path(CONFIG_SNAPSHOT_DIR) / f"{kind}-{source_id}.pickle"
+
+
+def _read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+        if isinstance(snapshot, dict) and snapshot.get("version") == CONFIG_SNAPSHOT_VERSION:
+            return snapshot
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️ [ConfigSnapshot] Snapshot ilegible {path.name} ({e}), se regenera")
+        _count("errors")
+    return None
+
+
+def _write_snapshot(path: Path, snapshot: Dict[str, Any]):
+    """Escritura atómica: tmp + replace, así otro worker nunca lee un pickle a medias"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        _count("writes")
+    except Exception as e:
+        logger.warning(f"⚠️ [ConfigSnapshot] No se pudo escribir {path.name}: {e}")
+        _count("errors")
+
+
+def load_with_snapshot(source: Path, kind: str, parse: Callable[[str], Any]) -> Any:
+    """
+    Devuelve parse(texto de source), usando el snapshot si el YAML no cambió.
+
+    Validación: mtime_ns + tamaño iguales -> hit directo; si difieren pero el
+    sha256 del contenido coincide (checkout, touch) -> hit y se actualiza el
+    mtime guardado; si no, se parsea y se reescribe.
+    """
+    if not CONFIG_SNAPSHOT_ENABLED:
+        return parse(source.read_text(encoding="utf-8"))
+
+    stat = source.stat()
+    snapshot_path = _snapshot_path(source, kind)
+    snapshot = _read_snapshot(snapshot_path)
+
+    if snapshot and snapshot["mtime_ns"] == stat.st_mtime_ns and snapshot["size"] == stat.st_size:
+        _count("hits")
+        logger.debug(f"[ConfigSnapshot] Hit {kind} ({source})")
+        return snapshot["data"]
+
+    raw = source.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if snapshot and snapshot["sha256"] == digest:
+        _count("hits")
+        snapshot.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _write_snapshot(snapshot_path, snapshot)
+        return snapshot["data"]
+
+    _count("misses")
+    data = parse(raw.decode("utf-8"))
+    _write_snapshot(snapshot_path, {
+        "version": CONFIG_SNAPSHOT_VERSION,
+        "source": str(source),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "data": data
+    })
+    logger.info(f"💾 [ConfigSnapshot] Snapshot de {kind} regenerado desde {source}")
+    return data
+
+
+def get_snapshot_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["enabled"] = CONFIG_SNAPSHOT_ENABLED
+    return stats
@@ -1,6 +1,7 @@
 # conversation_state.py - Sistema Unificado de Sugerencias con Mejoras Integradas
 import logging
-from typing import Dict, Any, List, Optional
+import os
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 import json
 import re
@@ -11,9 +12,31 @@ from .helpers import (
     is_search_intent, is_small_talk_intent, detect_sentiment_in_message,
     detect_implicit_intentions, get_intent_info, get_search_type_from_intent
 )
+from .lookup_index import MEDICAL_PATTERNS, TermFeatures, clean_term, simple_soundex, term_features
+from .suggestion_cache import get_suggestion_cache
 
 logger = logging.getLogger(__name__)
 
+try:
+    import numpy as np  # type: ignore
+    _HAS_NUMPY = True
+except ImportError:
+    np = None
+    _HAS_NUMPY = False
+    logger.warning(
+        "⚠️ [Similarity] NumPy no instalado: score_many usa el scoring par a par "
+        "(agregar numpy a las dependencias del action server)"
+    )
+
+# ============== CONFIGURACIÓN ==============
+# Máximo de candidatos que reciben el scoring completo de AdvancedSimilarityMatcher
+SUGGESTION_MAX_CANDIDATES = int(os.getenv("SUGGESTION_MAX_CANDIDATES", "300"))
+# Debajo de este tamaño de lote el scoring vectorizado no compensa el overhead de NumPy
+SIMILARITY_BATCH_MIN_SIZE = int(os.getenv("SIMILARITY_BATCH_MIN_SIZE", "8"))
+# Entradas que conserva el slot search_history (ring buffer: se descartan las más viejas)
+SEARCH_HISTORY_MAX_ENTRIES = int(os.getenv("SEARCH_HISTORY_MAX_ENTRIES", "10"))
+# ===========================================
+
 def normalize_pending_suggestion(value):
     """Asegura que pending_suggestion sea un dict o None."""
     if isinstance(value, dict):
@@ -41,6 +64,53 @@ def get_slot_safely(tracker: Tracker, slot_name: str, default_value: Any = None)
         logger.warning(f"Slot '{slot_name}' no existe o no se puede acceder: {e}")
         return default_value
 
+def _compact_value(value: Any) -> Any:
+    """Saca vacíos recursivamente y pasa floats enteros a int (20.0 -> 20)"""
+    if isinstance(value, dict):
+        compact = {}
+        for key, item in value.items():
+            item = _compact_value(item)
+            if item is not None and item != "" and item != [] and item != {}:
+                compact[key] = item
+        return compact
+    if isinstance(value, (list, tuple)):
+        return [_compact_value(item) for item in value if item is not None and item != ""]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def compact_search_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Parámetros de búsqueda listos para guardar en search_history: sin valores
+    vacíos ni claves internas ('_previous_search_type', etc.), misma forma.
+    """
+    if not isinstance(params, dict):
+        return {}
+    return _compact_value({k: v for k, v in params.items() if not str(k).startswith('_')})
+
+def bounded_search_history(search_history: Any) -> List[Dict[str, Any]]:
+    """Últimas SEARCH_HISTORY_MAX_ENTRIES entradas (trackers viejos pueden traer más)"""
+    if not isinstance(search_history, list):
+        return []
+    return search_history[-SEARCH_HISTORY_MAX_ENTRIES:] if SEARCH_HISTORY_MAX_ENTRIES > 0 else []
+
+def append_search_history(search_history: Any, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Devuelve una lista nueva con la entrada compactada al final, acotada a
+    SEARCH_HISTORY_MAX_ENTRIES. El tamaño del slot queda constante por turno.
+    """
+    parameters = entry.get('parameters')
+    entry = _compact_value({k: v for k, v in entry.items() if k != 'parameters'})
+    if parameters is not None:
+        entry['parameters'] = compact_search_params(parameters)
+    history = list(search_history) if isinstance(search_history, list) else []
+    history.append(entry)
+    return bounded_search_history(history)
+
+def history_timestamp() -> str:
+    """Timestamp de las entradas de search_history (precisión de segundos)"""
+    return datetime.now().isoformat(timespec='seconds')
+
 # ESTADO DE CONVERSACION (mantenido igual)
 class ConversationState:
     @staticmethod
@@ -67,7 +137,7 @@ class ConversationState:
             suggestion_context = get_slot_safely(tracker, "suggestion_context")
             
             # Slots de historial y contexto
-            search_history = get_slot_safely(tracker, "search_history", [])
+            search_history = bounded_search_history(get_slot_safely(tracker, "search_history", []))
             context_decision_pending = get_slot_safely(tracker, "context_decision_pending", False)
             current_search_params = get_slot_safely(tracker, "current_search_params")
             validation_errors = get_slot_safely(tracker, "validation_errors", [])
@@ -171,29 +241,8 @@ class AdvancedSimilarityMatcher:
             'medical_abbreviation': 0.9
         }
         
-        # Patrones especiales para términos médicos
-        self.medical_patterns = {
-            # Expansiones de abreviaciones
-            'iv': ['intravenoso', 'intravenosa', 'endovenoso'],
-            'im': ['intramuscular', 'via intramuscular'],
-            'po': ['por via oral', 'oral', 'via oral'],
-            'sc': ['subcutaneo', 'subcutánea', 'hipodermico'],
-            'id': ['intradermal', 'intradermico'],
-            'ip': ['intraperitoneal'],
-            'ic': ['intracardaco', 'intracardiaco'],
-            
-            # Unidades de medida
-            'mg': ['miligramo', 'miligramos'],
-            'ml': ['mililitro', 'mililitros'],
-            'kg': ['kilogramo', 'kilogramos'],
-            'gr': ['gramo', 'gramos'],
-            'ui': ['unidad internacional', 'unidades internacionales'],
-            
-            # Términos veterinarios comunes
-            'felv': ['leucemia felina', 'virus leucemia felina'],
-            'fiv': ['inmunodeficiencia felina', 'virus inmunodeficiencia felina'],
-            'pif': ['peritonitis infecciosa felina']
-        }
+        # Patrones especiales para términos médicos (compartidos con las features de lookup)
+        self.medical_patterns = MEDICAL_PATTERNS
     
     def calculate_similarity(self, input_term: str, lookup_term: str, entity_type: str = "") -> float:
         """
@@ -233,43 +282,148 @@ class AdvancedSimilarityMatcher:
             # 7. Abreviaciones médicas
             scores['medical_abbreviation'] = self._medical_abbreviation_similarity(input_clean, lookup_clean)
             
-            # Calcular score final ponderado
-            final_score = 0.0
-            total_weight = 0.0
+            return self._weighted_score(scores, input_clean, lookup_clean, entity_type)
             
-            for algorithm, score in scores.items():
-                if score > 0:
-                    weight = self.algorithm_weights.get(algorithm, 0.1)
-                    final_score += score * weight
-                    total_weight += weight
+        except Exception as e:
+            logger.error(f"Error calculando similitud entre '{input_term}' y '{lookup_term}': {e}")
+            return 0.0
+    
+    def _weighted_score(self, scores: Dict[str, float], input_clean: str, lookup_clean: str,
+                        entity_type: str) -> float:
+        """Combina los scores por algoritmo con algorithm_weights"""
+        final_score = 0.0
+        total_weight = 0.0
+        
+        for algorithm, score in scores.items():
+            if score > 0:
+                weight = self.algorithm_weights.get(algorithm, 0.1)
+                final_score += score * weight
+                total_weight += weight
+        
+        # Normalizar por peso total
+        if total_weight > 0:
+            final_score = final_score / total_weight
+        
+        # Bonificación por tipo de entidad específico
+        if entity_type:
+            final_score += self._entity_type_bonus(input_clean, lookup_clean, entity_type)
+        
+        return min(final_score, 1.0)
+    
+    def score_many(self, input_term: str, candidates: List[str], entity_type: str = "",
+                   features: Optional[List[TermFeatures]] = None) -> List[float]:
+        """
+        Versión por lotes de calculate_similarity: mismo score ponderado para cada candidato.
+        
+        El lado lookup sale de `features` (TermFeatures precomputadas por el LookupIndex
+        de la categoría), así que por mensaje solo se procesa el input. Levenshtein y
+        substring común más largo se calculan con NumPy para todo el lote a la vez
+        (arrays de code points con padding); sin NumPy, o con lotes chicos, par a par.
+        """
+        if not candidates:
+            return []
+        
+        input_clean = self._normalize_term(input_term) if input_term else ""
+        if not input_clean:
+            return [self.calculate_similarity(input_term, candidate, entity_type) for candidate in candidates]
+        
+        try:
+            if features is None:
+                features = [term_features(candidate) for candidate in candidates]
+            
+            input_lower = input_clean.lower()
+            input_soundex = simple_soundex(input_clean)
+            input_expansions = self._expansions_for(input_lower)
             
-            # Normalizar por peso total
-            if total_weight > 0:
-                final_score = final_score / total_weight
+            if _HAS_NUMPY and len(candidates) >= SIMILARITY_BATCH_MIN_SIZE:
+                levenshtein = self._batch_levenshtein_similarity(input_clean, [f.clean for f in features])
+                common_lengths = self._batch_longest_common_substring(input_lower, [f.lower for f in features])
+            else:
+                levenshtein = [self._levenshtein_similarity(input_clean, f.clean) for f in features]
+                common_lengths = [len(self._longest_common_substring(input_lower, f.lower)) for f in features]
             
-            # Bonificación por tipo de entidad específico
-            if entity_type:
-                final_score += self._entity_type_bonus(input_clean, lookup_clean, entity_type)
+            results = []
+            for i, candidate in enumerate(candidates):
+                feature = features[i]
+                
+                if not candidate or not feature.clean:
+                    # Casos borde (vacíos tras normalizar): mismo camino que el scoring individual
+                    results.append(self.calculate_similarity(input_term, candidate, entity_type))
+                    continue
+                
+                scores = {}
+                if input_clean == feature.clean:
+                    scores['exact_match'] = 1.0
+                if input_lower == feature.lower:
+                    scores['case_insensitive'] = 1.0
+                scores['sequence_matcher'] = difflib.SequenceMatcher(None, input_lower, feature.lower).ratio()
+                # Contención o LCS: en ambos casos es len(común) / len(mayor)
+                scores['substring_match'] = common_lengths[i] / max(len(input_lower), len(feature.lower))
+                scores['levenshtein_distance'] = levenshtein[i]
+                scores['soundex_like'] = self._soundex_code_similarity(input_soundex, feature.soundex)
+                scores['medical_abbreviation'] = self._expansion_similarity(
+                    input_lower, input_expansions, feature.lower, feature.expansions
+                )
+                
+                results.append(self._weighted_score(scores, input_clean, feature.clean, entity_type))
             
-            return min(final_score, 1.0)
+            return results
             
         except Exception as e:
-            logger.error(f"Error calculando similitud entre '{input_term}' y '{lookup_term}': {e}")
-            return 0.0
+            logger.error(f"Error en scoring por lotes para '{input_term}': {e}")
+            return [self.calculate_similarity(input_term, candidate, entity_type) for candidate in candidates]
     
-    def _normalize_term(self, term: str) -> str:
-        """Normaliza términos para comparación"""
-        if not term:
-            return ""
+    @staticmethod
+    def _pad_code_points(terms: List[str]):
+        """Matriz (k, max_len) de code points con -1 como padding (nunca coincide)"""
+        lengths = np.fromiter((len(term) for term in terms), dtype=np.int64, count=len(terms))
+        width = int(lengths.max()) if len(terms) else 0
+        matrix = np.full((len(terms), max(width, 1)), -1, dtype=np.int64)
+        for row, term in enumerate(terms):
+            if term:
+                matrix[row, :len(term)] = [ord(char) for char in term]
+        return matrix, lengths
+    
+    def _batch_levenshtein_similarity(self, s1: str, terms: List[str]) -> List[float]:
+        """_levenshtein_similarity de s1 contra cada término, vectorizado sobre el lote"""
+        matrix, lengths = self._pad_code_points(terms)
+        k, width = matrix.shape
         
-        # Remover acentos y caracteres especiales
-        import unicodedata
-        normalized = unicodedata.normalize('NFKD', term).encode('ascii', 'ignore').decode('utf-8')
+        # Fila i de la matriz DP para todos los candidatos a la vez: (k, width + 1)
+        previous = np.tile(np.arange(width + 1, dtype=np.int64), (k, 1))
+        for i, char in enumerate(s1, start=1):
+            current = np.empty_like(previous)
+            current[:, 0] = i
+            substitution = previous[:, :-1] + (matrix != ord(char))
+            current[:, 1:] = np.minimum(substitution, previous[:, 1:] + 1)
+            # Inserciones: dependencia secuencial dentro de la fila
+            for j in range(1, width + 1):
+                np.minimum(current[:, j], current[:, j - 1] + 1, out=current[:, j])
+            previous = current
         
-        # Limpiar espacios extra
-        normalized = re.sub(r'\s+', ' ', normalized.strip())
+        distances = previous[np.arange(k), lengths]
+        max_lens = np.maximum(lengths, len(s1))
+        similarities = 1.0 - distances / np.maximum(max_lens, 1)
+        return [0.0 if not s1 or not length else float(sim) for sim, length in zip(similarities, lengths)]
+    
+    def _batch_longest_common_substring(self, s1: str, terms: List[str]) -> List[int]:
+        """Largo del substring común más largo entre s1 y cada término"""
+        matrix, _ = self._pad_code_points(terms)
+        k, width = matrix.shape
+        
+        previous = np.zeros((k, width + 1), dtype=np.int64)
+        longest = np.zeros(k, dtype=np.int64)
+        for char in s1:
+            current = np.zeros_like(previous)
+            current[:, 1:] = (previous[:, :-1] + 1) * (matrix == ord(char))
+            np.maximum(longest, current.max(axis=1), out=longest)
+            previous = current
         
-        return normalized
+        return [int(length) for length in longest]
+    
+    def _normalize_term(self, term: str) -> str:
+        """Normaliza términos para comparación"""
+        return clean_term(term)
     
     def _substring_similarity(self, term1: str, term2: str) -> float:
         """Calcula similitud basada en substrings"""
@@ -337,63 +491,40 @@ class AdvancedSimilarityMatcher:
     
     def _phonetic_similarity(self, s1: str, s2: str) -> float:
         """Similitud fonética simple (soundex-like)"""
-        def simple_soundex(s):
-            if not s:
-                return ""
-            
-            # Convertir a mayúsculas y tomar primera letra
-            s = s.upper()
-            soundex = s[0]
-            
-            # Mapeo simple de consonantes
-            mapping = {'B': '1', 'F': '1', 'P': '1', 'V': '1',
-                      'C': '2', 'G': '2', 'J': '2', 'K': '2', 'Q': '2', 'S': '2', 'X': '2', 'Z': '2',
-                      'D': '3', 'T': '3',
-                      'L': '4',
-                      'M': '5', 'N': '5',
-                      'R': '6'}
-            
-            for char in s[1:]:
-                if char in mapping:
-                    code = mapping[char]
-                    if len(soundex) == 0 or soundex[-1] != code:
-                        soundex += code
-                if len(soundex) >= 4:
-                    break
-            
-            return soundex.ljust(4, '0')[:4]
-        
-        try:
-            soundex1 = simple_soundex(s1)
-            soundex2 = simple_soundex(s2)
-            
-            if soundex1 == soundex2:
-                return 0.8
-            elif soundex1[0] == soundex2[0]:  # Misma primera letra
-                return 0.4
-            else:
-                return 0.0
-        except:
-            return 0.0
+        return self._soundex_code_similarity(simple_soundex(s1), simple_soundex(s2))
+    
+    @staticmethod
+    def _soundex_code_similarity(soundex1: str, soundex2: str) -> float:
+        if soundex1 == soundex2:
+            return 0.8
+        elif soundex1 and soundex2 and soundex1[0] == soundex2[0]:  # Misma primera letra
+            return 0.4
+        return 0.0
     
     def _medical_abbreviation_similarity(self, input_term: str, lookup_term: str) -> float:
         """Similitud específica para abreviaciones médicas"""
         input_lower = input_term.lower()
         lookup_lower = lookup_term.lower()
-        
+        return self._expansion_similarity(
+            input_lower, self._expansions_for(input_lower),
+            lookup_lower, self._expansions_for(lookup_lower)
+        )
+    
+    def _expansions_for(self, term_lower: str) -> tuple:
+        return tuple(expansion.lower() for expansion in self.medical_patterns.get(term_lower, ()))
+    
+    @staticmethod
+    def _expansion_similarity(input_lower: str, input_expansions: tuple,
+                              lookup_lower: str, lookup_expansions: tuple) -> float:
         # Verificar si input es abreviación conocida
-        if input_lower in self.medical_patterns:
-            expansions = self.medical_patterns[input_lower]
-            for expansion in expansions:
-                if expansion.lower() in lookup_lower or lookup_lower in expansion.lower():
-                    return 0.9
+        for expansion in input_expansions:
+            if expansion in lookup_lower or lookup_lower in expansion:
+                return 0.9
         
         # Verificar lo contrario
-        if lookup_lower in self.medical_patterns:
-            expansions = self.medical_patterns[lookup_lower]
-            for expansion in expansions:
-                if expansion.lower() in input_lower or input_lower in expansion.lower():
-                    return 0.9
+        for expansion in lookup_expansions:
+            if expansion in input_lower or input_lower in expansion:
+                return 0.9
         
         return 0.0
     
@@ -516,7 +647,20 @@ class SuggestionManager:
                           min_similarity: float = 0.6) -> List[Dict[str, Any]]:
         """
         NUEVA FUNCIÓN INTEGRADA: Encuentra términos similares usando el sistema avanzado de similitud
+        (memoizado por entidad + input normalizado en el cache de sugerencias)
         """
+        cache = get_suggestion_cache()
+        key = cache.make_key("find_similar_terms", entity_type, input_value, max_suggestions, min_similarity)
+        result = cache.get_or_compute(
+            key, lambda: self._find_similar_terms_uncached(input_value, entity_type, max_suggestions, min_similarity)
+        )
+        # El hit puede venir de otra variante del input ("Bravekto " vs "bravekto")
+        for candidate in result:
+            candidate['original_input'] = input_value
+        return result
+    
+    def _find_similar_terms_uncached(self, input_value: str, entity_type: str, max_suggestions: int,
+                                     min_similarity: float) -> List[Dict[str, Any]]:
         try:
             # Intentar usar ConfigManager
             try:
@@ -533,36 +677,36 @@ class SuggestionManager:
                 return self._fallback_similarity_search(input_value, entity_type, max_suggestions)
             
             candidates = []
-            lookup_values = lookup_tables[entity_type]
+            lookup_values, lookup_features = self._candidate_values(
+                input_value, entity_type, lookup_tables[entity_type]
+            )
+            
+            logger.debug(f"Buscando términos similares a '{input_value}' en {len(lookup_values)} "
+                         f"candidatos de {len(lookup_tables[entity_type])} valores de '{entity_type}'")
             
-            logger.debug(f"Buscando términos similares a '{input_value}' en {len(lookup_values)} valores de '{entity_type}'")
+            similarity_scores = self.similarity_matcher.score_many(
+                input_value, lookup_values, entity_type, lookup_features
+            )
             
-            for lookup_value in lookup_values:
-                try:
-                    similarity_score = self.similarity_matcher.calculate_similarity(
-                        input_value, lookup_value, entity_type
-                    )
+            for lookup_value, similarity_score in zip(lookup_values, similarity_scores):
+                if similarity_score >= min_similarity:
+                    candidates.append({
+                        'suggestion': lookup_value,
+                        'similarity': similarity_score,
+                        'entity_type': entity_type,
+                        'original_input': input_value,
+                        'match_confidence': self._classify_match_confidence(similarity_score)
+                    })
                     
-                    if similarity_score >= min_similarity:
-                        candidates.append({
-                            'suggestion': lookup_value,
-                            'similarity': similarity_score,
-                            'entity_type': entity_type,
-                            'original_input': input_value,
-                            'match_confidence': self._classify_match_confidence(similarity_score)
-                        })
-                        
-                        logger.debug(f"Candidato encontrado: '{lookup_value}' (similitud: {similarity_score:.3f})")
-                        
-                except Exception as e:
-                    logger.error(f"Error calculando similitud para '{lookup_value}': {e}")
-                    continue
+                    logger.debug(f"Candidato encontrado: '{lookup_value}' (similitud: {similarity_score:.3f})")
             
             # Ordenar por similitud descendente
             candidates.sort(key=lambda x: x['similarity'], reverse=True)
             
             # Aplicar post-procesamiento
-            processed_candidates = self._post_process_suggestions(candidates, input_value, entity_type)
+            processed_candidates = self._post_process_suggestions(
+                candidates, input_value, entity_type, max_results=max_suggestions
+            )
             
             result = processed_candidates[:max_suggestions]
             
@@ -576,6 +720,44 @@ class SuggestionManager:
             logger.error(f"Error buscando términos similares para '{input_value}': {e}", exc_info=True)
             return []
     
+    def _candidate_values(self, input_value: str, entity_type: str,
+                          lookup_values: List[str]) -> Tuple[List[str], Optional[List[TermFeatures]]]:
+        """
+        Genera candidatos con el índice de trigramas de la categoría para no
+        correr los 7 algoritmos contra toda la tabla. Suma coincidencias por
+        prefijo y abreviaciones médicas, que no comparten trigramas con el input.
+        Devuelve también las TermFeatures precomputadas de cada candidato (o None sin índice).
+        """
+        try:
+            from actions.config import get_lookup_index
+            index = get_lookup_index(entity_type)
+        except ImportError:
+            index = None
+        
+        if index is None or len(index) != len(lookup_values):
+            return list(lookup_values), None
+        
+        if len(index) <= SUGGESTION_MAX_CANDIDATES:
+            return list(index.values), list(index.features)
+        
+        positions = dict.fromkeys(index.ngram_candidates(input_value, SUGGESTION_MAX_CANDIDATES))
+        
+        # Mismo prefijo de 3 letras (el post-procesado les da boost)
+        input_norm = self.similarity_matcher._normalize_term(input_value).lower()
+        if len(input_norm) >= 3:
+            positions.update(dict.fromkeys(index.with_prefix(input_norm[:3])))
+        
+        # Abreviaciones en ambos sentidos: "iv" <-> "intravenoso"
+        expansions = self.similarity_matcher._expansions_for(input_norm)
+        if expansions:
+            positions.update(dict.fromkeys(
+                pos for pos, features in enumerate(index.features)
+                if any(expansion in features.lower or features.lower in expansion for expansion in expansions)
+            ))
+        positions.update(dict.fromkeys(index.abbreviation_positions))
+        
+        return [index.values[pos] for pos in positions], [index.features[pos] for pos in positions]
+    
     def _classify_match_confidence(self, similarity_score: float) -> str:
         """Clasifica la confianza del match"""
         if similarity_score >= 0.9:
@@ -590,38 +772,90 @@ class SuggestionManager:
             return 'very_low'
     
     def _post_process_suggestions(self, candidates: List[Dict[str, Any]], 
-                                 input_value: str, entity_type: str) -> List[Dict[str, Any]]:
-        """Post-procesa sugerencias para mejorar relevancia"""
+                                 input_value: str, entity_type: str,
+                                 max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Post-procesa sugerencias para mejorar relevancia.
+        
+        Aplica el boost por prefijo, ordena y recorre en orden hasta juntar max_results
+        sugerencias distintas. Dos sugerencias son duplicadas si comparten forma
+        normalizada (hash) o si su distancia de Levenshtein (calculada solo en la
+        banda diagonal) equivale a una similitud > 0.95; cada candidata se compara
+        solo contra las ya aceptadas.
+        """
         if not candidates:
             return candidates
         
-        # Filtrar duplicados muy similares
-        filtered_candidates = []
-        for candidate in candidates:
-            is_duplicate = False
-            for existing in filtered_candidates:
-                if self.similarity_matcher.calculate_similarity(
-                    candidate['suggestion'], existing['suggestion']
-                ) > 0.95:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                filtered_candidates.append(candidate)
-        
         # Boost para términos que empiezan igual
         input_lower = input_value.lower()
-        for candidate in filtered_candidates:
+        for candidate in candidates:
             suggestion_lower = candidate['suggestion'].lower()
             if suggestion_lower.startswith(input_lower[:3]) and len(input_lower) >= 3:
                 candidate['similarity'] += 0.05
                 candidate['boost_reason'] = 'prefix_match'
         
-        # Re-ordenar después de boosts
-        filtered_candidates.sort(key=lambda x: x['similarity'], reverse=True)
+        # Ordenar después de boosts (estable: a igual score se mantiene el orden original)
+        candidates = sorted(candidates, key=lambda x: x['similarity'], reverse=True)
+        
+        filtered_candidates = []
+        seen_keys = set()
+        kept_forms = []
+        for candidate in candidates:
+            form = self.similarity_matcher._normalize_term(candidate['suggestion']).lower()
+            key = re.sub(r'[^a-z0-9]', '', form)
+            if key in seen_keys:
+                continue
+            
+            if any(self._is_near_duplicate(form, kept) for kept in kept_forms):
+                continue
+            
+            seen_keys.add(key)
+            kept_forms.append(form)
+            filtered_candidates.append(candidate)
+            
+            if max_results is not None and len(filtered_candidates) >= max_results:
+                break
         
         return filtered_candidates
     
+    @staticmethod
+    def _is_near_duplicate(term1: str, term2: str, min_similarity: float = 0.95) -> bool:
+        """
+        True si 1 - distancia_levenshtein / largo_max > min_similarity.
+        Solo se llenan las celdas con |i - j| <= k (k = distancia máxima
+        admitida): fuera de esa banda diagonal la distancia ya supera k.
+        """
+        max_len = max(len(term1), len(term2))
+        max_distance = 0
+        while max_distance + 1 < max_len and 1.0 - (max_distance + 1) / max_len > min_similarity:
+            max_distance += 1
+        if max_distance == 0:
+            return term1 == term2
+        if abs(len(term1) - len(term2)) > max_distance:
+            return False
+        
+        k = max_distance
+        too_far = k + 1
+        n2 = len(term2)
+        previous = [j if j <= k else too_far for j in range(n2 + 1)]
+        for i, char1 in enumerate(term1, start=1):
+            low, high = max(1, i - k), min(n2, i + k)
+            current = [too_far] * (n2 + 1)
+            if i <= k:
+                current[0] = i
+            for j in range(low, high + 1):
+                current[j] = min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char1 != term2[j - 1]),
+                    too_far
+                )
+            if min(current[low - 1:high + 1]) > k:
+                return False
+            previous = current
+        
+        return previous[n2] <= k
+    
     def _fallback_similarity_search(self, input_value: str, entity_type: str, 
                                    max_suggestions: int) -> List[Dict[str, Any]]:
         """Búsqueda de fallback cuando no hay ConfigManager"""
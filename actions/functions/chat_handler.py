@@ -6,13 +6,17 @@ Maneja contexto, caché, fallbacks y comunicación con el dispatcher.
 
 import logging
 import hashlib
+import os
+import threading
 import time
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 
 from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 
 from actions.models.model_manager import get_chat_model
+from actions.functions.semantic_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +25,13 @@ SYSTEM_PROMPT = """Te llamas Pompi, asistente veterinario.
 Respuestas cortas: máximo 2 oraciones.
 Siempre preguntá qué necesita."""
 
-# Caché de respuestas
-RESPONSE_CACHE = {}
-MAX_CACHE_SIZE = 50
+# Caché de respuestas (LRU + TTL)
+MAX_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "1800"))              # segundos
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Marca del texto del usuario en prompts con caché semántico (se reemplaza por user_text)
+USER_TEXT_PLACEHOLDER = "<<user_text>>"
 
 # Mensajes de fallback por tipo de error
 FALLBACK_MESSAGES = {
@@ -35,13 +43,94 @@ FALLBACK_MESSAGES = {
 # ===========================================
 
 
+class ResponseCache:
+    """
+    Caché LRU thread-safe de respuestas generadas, con TTL por entrada y
+    tope de memoria (bytes UTF-8 de claves + respuestas).
+    """
+    
+    def __init__(self, max_size: int = MAX_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+    
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if now <= expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                self._remove(key)
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """ttl opcional: vida de esta entrada en particular (por defecto self.ttl)"""
+        size = len(key) + len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_size or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+    
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+    
+    def clear(self) -> int:
+        with self._lock:
+            cleared = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        return cleared
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["total_entries"] = len(self._entries)
+            stats["memory_bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_size"] = self.max_size
+        stats["max_bytes"] = self.max_bytes
+        stats["ttl"] = self.ttl
+        stats["usage_percent"] = (stats["total_entries"] / self.max_size) * 100 if self.max_size else 0.0
+        return stats
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
 def generate_text_with_context(
     prompt: str, 
     tracker: Optional[Tracker] = None, 
     dispatcher: Optional[CollectingDispatcher] = None,
     fallback_template: Optional[str] = None,
     max_new_tokens: int = 150, 
-    temperature: float = 0.3
+    temperature: float = 0.3,
+    cache_scope: Optional[str] = None,
+    user_text: Optional[str] = None,
+    cache_similar: bool = True
 ) -> Optional[str]:
     """
     ✅ FUNCIÓN PRINCIPAL - GENERACIÓN DE TEXTO CON CONTEXTO
@@ -57,6 +146,13 @@ def generate_text_with_context(
         fallback_template: Template de Rasa a usar si falla (opcional)
         max_new_tokens: Máximo de tokens a generar
         temperature: Temperatura para generación
+        cache_scope: Si se indica (p.ej. "smalltalk:saludo"), habilita el caché
+            semántico: mensajes parecidos de user_text en el mismo scope y con
+            la misma plantilla de prompt reutilizan la respuesta
+        user_text: Texto del usuario. Si prompt es una plantilla con
+            USER_TEXT_PLACEHOLDER, se inserta ahí (requerido con cache_scope)
+        cache_similar: False = el caché semántico solo acepta el mismo texto
+            normalizado, sin variantes (para mensajes de contenido libre)
     
     Returns:
         str si no hay dispatcher, None si hay dispatcher
@@ -67,18 +163,31 @@ def generate_text_with_context(
         # Obtener modelo (se inicializa automáticamente si es necesario)
         chat_model = get_chat_model()
         
-        # Construir contexto
-        context_info = _build_lightweight_context(tracker) if tracker else ""
-        full_prompt = (
-            f"Contexto de la conversación:\n{context_info}\n\nInstrucción:\n{prompt}"
-            if context_info else prompt
+        # Construir contexto. Con cache_scope la respuesta se comparte entre
+        # usuarios: sin la última búsqueda, que es propia de cada uno
+        context_info = (
+            _build_lightweight_context(tracker, include_search=not cache_scope) if tracker else ""
         )
         
+        # El texto del usuario entra recién acá: la plantilla sin él define el scope semántico
+        prompt_template = prompt if USER_TEXT_PLACEHOLDER in prompt else None
+        if prompt_template is not None:
+            prompt = prompt_template.replace(USER_TEXT_PLACEHOLDER, user_text or "")
+        full_prompt = _build_full_prompt(prompt, context_info)
+        
         # Verificar caché
         cache_key = _get_cache_key(full_prompt, max_new_tokens, temperature)
-        if cache_key in RESPONSE_CACHE:
+        cached_response = RESPONSE_CACHE.get(cache_key)
+        
+        semantic_scope = None
+        if cached_response is None and cache_scope and user_text and prompt_template is not None:
+            semantic_scope = _get_semantic_scope(
+                cache_scope, _build_full_prompt(prompt_template, context_info), max_new_tokens, temperature
+            )
+            cached_response = get_semantic_cache().get(semantic_scope, user_text, similar=cache_similar)
+        
+        if cached_response is not None:
             logger.info("[ChatHandler] ✅ Respuesta desde caché")
-            cached_response = RESPONSE_CACHE[cache_key]
             
             if dispatcher:
                 dispatcher.utter_message(text=cached_response)
@@ -106,6 +215,8 @@ def generate_text_with_context(
             
             # Guardar en caché
             _update_cache(cache_key, generated_text)
+            if semantic_scope:
+                get_semantic_cache().set(semantic_scope, user_text, generated_text)
             
             if dispatcher:
                 dispatcher.utter_message(text=generated_text)
@@ -137,7 +248,10 @@ def generate_with_safe_fallback(
     tracker: Optional[Tracker] = None,
     fallback_template: str = "utter_default",
     max_new_tokens: int = 150,
-    temperature: float = 0.1
+    temperature: float = 0.1,
+    cache_scope: Optional[str] = None,
+    user_text: Optional[str] = None,
+    cache_similar: bool = True
 ) -> None:
     """
     ✅ WRAPPER SIMPLIFICADO - Genera con fallback seguro
@@ -151,7 +265,10 @@ def generate_with_safe_fallback(
         dispatcher=dispatcher,
         fallback_template=fallback_template,
         max_new_tokens=max_new_tokens,
-        temperature=temperature
+        temperature=temperature,
+        cache_scope=cache_scope,
+        user_text=user_text,
+        cache_similar=cache_similar
     )
 
 
@@ -164,12 +281,25 @@ def _get_cache_key(prompt: str, max_tokens: int, temperature: float) -> str:
     ).hexdigest()
 
 
+def _build_full_prompt(prompt: str, context_info: str) -> str:
+    return (
+        f"Contexto de la conversación:\n{context_info}\n\nInstrucción:\n{prompt}"
+        if context_info else prompt
+    )
+
+
+def _get_semantic_scope(cache_scope: str, full_template: str, max_tokens: int, temperature: float) -> str:
+    """
+    Scope del caché semántico: el prompt armado con el placeholder en lugar
+    del texto del usuario (plantilla + contexto sin datos propios del usuario),
+    así solo se comparan mensajes que recibieron exactamente la misma instrucción.
+    """
+    return f"{cache_scope}:{_get_cache_key(full_template, max_tokens, temperature)}"
+
+
 def _update_cache(key: str, value: str):
-    """Actualiza caché con límite de tamaño."""
-    if len(RESPONSE_CACHE) >= MAX_CACHE_SIZE:
-        # Eliminar el primero (FIFO)
-        RESPONSE_CACHE.pop(next(iter(RESPONSE_CACHE)))
-    RESPONSE_CACHE[key] = value
+    """Actualiza caché (el LRU se encarga de capacidad, memoria y expiración)."""
+    RESPONSE_CACHE.set(key, value)
 
 
 def _handle_fallback(
@@ -216,12 +346,12 @@ def _handle_fallback(
     return fallback_text
 
 
-def _build_lightweight_context(tracker: Tracker) -> str:
+def _build_lightweight_context(tracker: Tracker, include_search: bool = True) -> str:
     """
     Construye contexto ligero desde el tracker.
     
     Extrae información relevante de:
-    - Historial de búsquedas
+    - Historial de búsquedas (salvo include_search=False)
     - Intent actual
     - Slots relevantes
     """
@@ -229,7 +359,7 @@ def _build_lightweight_context(tracker: Tracker) -> str:
         context_parts = []
         
         # 1. Información de búsqueda reciente
-        search_history = tracker.get_slot('search_history')
+        search_history = tracker.get_slot('search_history') if include_search else None
         if search_history and len(search_history) > 0:
             last_search = search_history[-1]
             params = last_search.get('parameters', {})
@@ -258,18 +388,14 @@ def _build_lightweight_context(tracker: Tracker) -> str:
 # ============== UTILIDADES DE DIAGNÓSTICO ==============
 
 def get_cache_stats() -> Dict[str, Any]:
-    """Retorna estadísticas del caché de respuestas."""
-    return {
-        'total_entries': len(RESPONSE_CACHE),
-        'max_size': MAX_CACHE_SIZE,
-        'usage_percent': (len(RESPONSE_CACHE) / MAX_CACHE_SIZE) * 100
-    }
+    """Retorna estadísticas del caché de respuestas (entradas, memoria, hits/misses/evictions)."""
+    stats = RESPONSE_CACHE.get_stats()
+    stats['semantic'] = get_semantic_cache().get_stats()
+    return stats
 
 
 def clear_cache():
     """Limpia el caché de respuestas."""
-    global RESPONSE_CACHE
-    cleared_count = len(RESPONSE_CACHE)
-    RESPONSE_CACHE.clear()
+    cleared_count = RESPONSE_CACHE.clear() + get_semantic_cache().clear()
     logger.info(f"[ChatHandler] Caché limpiado ({cleared_count} entradas)")
     return cleared_count
\ No newline at end of file
@@ -1,11 +1,18 @@
 # actions/models/connection_broker.py
 import os
+import asyncio
+import concurrent.futures
+import hashlib
+import json
 import logging
+import threading
 import time
+import httpx
 import requests
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+from collections import deque
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 # from dotenv import load_dotenv
 from openai import OpenAI, APITimeoutError, APIConnectionError, NotFoundError
 
@@ -27,12 +34,43 @@ MODEL_CPU = os.getenv("MODEL_SEARCH_CPU", "pompi_search_cpu")
 # RunPod
 RUNPOD_ENDPOINT_ID = os.getenv("RUNPOD_ENDPOINT_ID")
 RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY")
-RUNPOD_POLL_INTERVAL = 2  # segundos entre checks
+RUNPOD_POLL_INITIAL_INTERVAL = float(os.getenv("RUNPOD_POLL_INITIAL_INTERVAL", "0.25"))  # primer check
+RUNPOD_POLL_MAX_INTERVAL = float(os.getenv("RUNPOD_POLL_MAX_INTERVAL", "2"))  # tope entre checks
+RUNPOD_POLL_BACKOFF = 1.6  # factor de crecimiento entre checks
 RUNPOD_MAX_WAIT_TIME = 120  # timeout máximo para RunPod
+RUNPOD_USE_RUNSYNC = os.getenv("RUNPOD_USE_RUNSYNC", "true").lower() == "true"
+RUNPOD_RUNSYNC_TIMEOUT = float(os.getenv("RUNPOD_RUNSYNC_TIMEOUT", "95"))  # /runsync retiene la conexión
 
 # Timeouts generales
 OLLAMA_TIMEOUT = 120
 OLLAMA_CLIENT_TIMEOUT = 90
+
+# Pools HTTP async (uno por backend, compartidos entre requests)
+BROKER_POOL_MAX_CONNECTIONS = int(os.getenv("BROKER_POOL_MAX_CONNECTIONS", "32"))
+BROKER_POOL_MAX_KEEPALIVE = int(os.getenv("BROKER_POOL_MAX_KEEPALIVE", "16"))
+BROKER_POOL_KEEPALIVE_EXPIRY = float(os.getenv("BROKER_POOL_KEEPALIVE_EXPIRY", "60"))
+
+# Circuit breaker por conexión
+CB_FAILURE_THRESHOLD = int(os.getenv("BROKER_CB_FAILURE_THRESHOLD", "3"))  # fallas seguidas para abrir
+CB_COOLDOWN = float(os.getenv("BROKER_CB_COOLDOWN", "15"))  # segundos abierto antes de half-open
+CB_PROBE_INTERVAL = float(os.getenv("BROKER_CB_PROBE_INTERVAL", "5"))  # cada cuánto corre el prober
+CB_PROBE_TIMEOUT = float(os.getenv("BROKER_CB_PROBE_TIMEOUT", "5"))
+
+# Ruteo: "latency" = menor tiempo esperado, "priority" = orden estático
+ROUTING_MODE = os.getenv("BROKER_ROUTING_MODE", "latency")
+ROUTING_EWMA_ALPHA = float(os.getenv("BROKER_ROUTING_EWMA_ALPHA", "0.3"))
+ROUTING_WINDOW_SIZE = int(os.getenv("BROKER_ROUTING_WINDOW_SIZE", "50"))  # muestras para p95
+ROUTING_EXPLORE_AFTER = float(os.getenv("BROKER_ROUTING_EXPLORE_AFTER", "300"))  # re-muestrear backends olvidados (0 = nunca)
+ROUTING_EXPLORE_MAX_TOKENS = int(os.getenv("BROKER_ROUTING_EXPLORE_MAX_TOKENS", "64"))  # tamaño del request de medición
+
+# Hedging: si el primario no respondió al percentil P de su latencia, se
+# dispara el mismo request al siguiente backend y gana el primero.
+HEDGE_PERCENTILE = float(os.getenv("BROKER_HEDGE_PERCENTILE", "90"))
+HEDGE_DEFAULT_BUDGET = float(os.getenv("BROKER_HEDGE_DEFAULT_BUDGET", "8"))  # sin muestras todavía
+HEDGE_MIN_BUDGET = float(os.getenv("BROKER_HEDGE_MIN_BUDGET", "1"))
+
+# Single-flight: coalescer requests idénticos (messages, temperature, max_tokens, timeout y modo)
+SINGLE_FLIGHT_ENABLED = os.getenv("BROKER_SINGLE_FLIGHT", "true").lower() == "true"
 # ===========================================
 
 
@@ -43,6 +81,13 @@ class ConnectionType(Enum):
     RUNPOD = "runpod"
 
 
+class CircuitState(Enum):
+    """Estados del circuit breaker de una conexión"""
+    CLOSED = "closed"        # Tráfico normal
+    OPEN = "open"            # Sin tráfico hasta que pase el cool-down
+    HALF_OPEN = "half_open"  # Se permite una sola request/probe de prueba
+
+
 @dataclass
 class ConnectionConfig:
     """Configuración de una conexión"""
@@ -53,10 +98,28 @@ class ConnectionConfig:
     last_used: Optional[float] = None
     total_requests: int = 0
     total_failures: int = 0
+    circuit_state: CircuitState = CircuitState.CLOSED
+    consecutive_failures: int = 0
+    opened_at: Optional[float] = None
+    half_open_in_flight: bool = False
+    times_opened: int = 0
+    # Estadísticas para ruteo por latencia
+    ewma_latency: Optional[float] = None        # segundos por request
+    ewma_sec_per_token: Optional[float] = None  # segundos por token pedido (max_tokens)
+    ewma_error_rate: float = 0.0
+    last_explored: Optional[float] = None       # última medición en background (prober)
+    latency_window: deque = field(default_factory=lambda: deque(maxlen=ROUTING_WINDOW_SIZE))
 
 
 class RunPodClient:
-    """Cliente para interactuar con RunPod"""
+    """
+    Cliente para interactuar con RunPod.
+    Intenta primero /runsync (sin polling si el worker está caliente) y, si el
+    job sigue en cola, hace polling de /status con backoff exponencial.
+    Los jobs abandonados (timeout o cancelación) se cancelan en RunPod una vez
+    conocido su id. Mientras /runsync retiene la conexión el id todavía no se
+    conoce, por eso las llamadas cancelables (hedging) envían por /run.
+    """
     
     def __init__(self, endpoint_id: str, api_key: str):
         self.endpoint_id = endpoint_id
@@ -69,86 +132,133 @@ class RunPodClient:
             "Authorization": f"Bearer {self.api_key}"
         }
     
-    def run_job(self, messages: List[Dict], temperature: float = 0.3, 
-                max_tokens: int = 500) -> str:
-        """
-        Envía un job a RunPod y espera el resultado.
-        Convierte formato OpenAI messages a prompt simple.
-        """
+    def _build_body(self, messages: List[Dict], temperature: float, max_tokens: int) -> Dict:
         # Convertir messages a prompt
-        prompt = self._messages_to_prompt(messages)
-        
-        url = f"{self.base_url}/{self.endpoint_id}/run"
-        body = {
+        return {
             "input": {
-                "prompt": prompt,
+                "prompt": self._messages_to_prompt(messages),
                 "temperature": temperature,
                 "max_tokens": max_tokens
             }
         }
+    
+    def _submit_url(self, use_runsync: bool = RUNPOD_USE_RUNSYNC) -> str:
+        endpoint = "runsync" if use_runsync else "run"
+        return f"{self.base_url}/{self.endpoint_id}/{endpoint}"
+    
+    def _poll_delays(self):
+        """Delays de polling: arranca corto y crece hasta RUNPOD_POLL_MAX_INTERVAL"""
+        delay = RUNPOD_POLL_INITIAL_INTERVAL
+        while True:
+            yield delay
+            delay = min(delay * RUNPOD_POLL_BACKOFF, RUNPOD_POLL_MAX_INTERVAL)
+    
+    def _parse_job_status(self, job_status: Dict) -> Optional[str]:
+        """
+        Interpreta una respuesta de /runsync o /status.
+        Retorna el texto si terminó, None si sigue pendiente; lanza si falló.
+        """
+        status = job_status.get("status")
+        
+        if status == "COMPLETED":
+            return self._extract_text_from_output(job_status.get("output"))
         
-        logger.info(f"📤 [RunPod] Enviando job...")
+        if status in ["FAILED", "CANCELLED", "TIMED_OUT"]:
+            error = job_status.get("error", status)
+            raise RuntimeError(f"RunPod job failed: {error}")
         
+        if status not in ["IN_QUEUE", "IN_PROGRESS"]:
+            logger.warning(f"⚠️ [RunPod] Estado desconocido: {status}")
+        
+        return None
+    
+    async def arun_job(self, http: httpx.AsyncClient, messages: List[Dict],
+                       temperature: float = 0.3, max_tokens: int = 500,
+                       cancellable: bool = False) -> str:
+        """
+        Versión async de run_job: usa el pool compartido del broker
+        y no bloquea ningún hilo mientras espera el resultado.
+
+        cancellable=True (hedging: el perdedor se cancela) fuerza /run, que
+        devuelve el id al instante y deja el job cancelable desde el primer
+        momento. Con /runsync, una cancelación durante el POST corta la
+        conexión pero el job sigue corriendo en RunPod sin id para cancelarlo.
+        """
+        body = self._build_body(messages, temperature, max_tokens)
+        use_runsync = RUNPOD_USE_RUNSYNC and not cancellable
+
+        logger.info(f"📤 [RunPod] Enviando job (async, {'runsync' if use_runsync else 'run'})...")
+        start_time = time.time()
+
         try:
-            # Enviar job
-            response = requests.post(url, headers=self._get_headers(), json=body, timeout=30)
-            response.raise_for_status()
-            job_data = response.json()
-            job_id = job_data.get("id")
-            
-            if not job_id:
-                raise ValueError("No se recibió job_id de RunPod")
-            
-            logger.info(f"✅ [RunPod] Job {job_id} enviado")
-            
-            # Esperar resultado
-            return self._wait_for_result(job_id)
-            
-        except requests.RequestException as e:
-            logger.error(f"❌ [RunPod] Error en request: {e}")
+            response = await http.post(
+                self._submit_url(use_runsync), headers=self._get_headers(), json=body,
+                timeout=RUNPOD_RUNSYNC_TIMEOUT if use_runsync else 10
+            )
+        except asyncio.CancelledError:
+            if use_runsync:
+                logger.warning(
+                    "⚠️ [RunPod] Cancelado durante /runsync: el job queda corriendo "
+                    "en RunPod hasta terminar (su id no llegó a conocerse)"
+                )
             raise
-    
-    def _wait_for_result(self, job_id: str) -> str:
-        """Espera el resultado de un job"""
+        response.raise_for_status()
+        job_data = response.json()
+
+        text = self._parse_job_status(job_data)
+        if text is not None:
+            logger.info(f"✅ [RunPod] Job completado vía runsync en {time.time() - start_time:.2f}s")
+            return text
+
+        job_id = job_data.get("id")
+        if not job_id:
+            raise ValueError("No se recibió job_id de RunPod")
+
+        logger.info(f"✅ [RunPod] Job {job_id} en cola, pasando a polling")
+
+        try:
+            return await self._await_result(http, job_id, start_time)
+        except (asyncio.CancelledError, TimeoutError):
+            # Hedge perdido, llamador cancelado o timeout: liberar el worker.
+            # La cancelación va desacoplada para no demorar al que canceló.
+            asyncio.ensure_future(self.acancel_job(http, job_id))
+            raise
+
+    async def _await_result(self, http: httpx.AsyncClient, job_id: str,
+                            start_time: Optional[float] = None) -> str:
+        """Espera el resultado de un job sin bloquear el event loop"""
         url = f"{self.base_url}/{self.endpoint_id}/status/{job_id}"
-        start_time = time.time()
-        
+        start_time = start_time or time.time()
+        delays = self._poll_delays()
+
         logger.info(f"⏳ [RunPod] Esperando resultado de {job_id}...")
-        
+
         while True:
             elapsed = time.time() - start_time
-            
+
             if elapsed > RUNPOD_MAX_WAIT_TIME:
                 raise TimeoutError(f"RunPod timeout después de {elapsed:.1f}s")
-            
-            try:
-                response = requests.get(url, headers=self._get_headers(), timeout=10)
-                response.raise_for_status()
-                job_status = response.json()
-                
-                status = job_status.get("status")
-                
-                if status == "COMPLETED":
-                    output = job_status.get("output")
-                    logger.info(f"✅ [RunPod] Job completado en {elapsed:.2f}s")
-                    return self._extract_text_from_output(output)
-                
-                elif status == "FAILED":
-                    error = job_status.get("error", "Unknown error")
-                    raise RuntimeError(f"RunPod job failed: {error}")
-                
-                elif status in ["IN_QUEUE", "IN_PROGRESS"]:
-                    # Continuar esperando
-                    time.sleep(RUNPOD_POLL_INTERVAL)
-                
-                else:
-                    logger.warning(f"⚠️ [RunPod] Estado desconocido: {status}")
-                    time.sleep(RUNPOD_POLL_INTERVAL)
-                    
-            except requests.RequestException as e:
-                logger.error(f"❌ [RunPod] Error checking status: {e}")
-                raise
-    
+
+            await asyncio.sleep(next(delays))
+
+            response = await http.get(url, headers=self._get_headers(), timeout=10)
+            response.raise_for_status()
+            text = self._parse_job_status(response.json())
+
+            if text is not None:
+                logger.info(f"✅ [RunPod] Job completado en {time.time() - start_time:.2f}s")
+                return text
+
+    async def acancel_job(self, http: httpx.AsyncClient, job_id: str):
+        try:
+            await http.post(
+                f"{self.base_url}/{self.endpoint_id}/cancel/{job_id}",
+                headers=self._get_headers(), timeout=5
+            )
+            logger.info(f"🛑 [RunPod] Job {job_id} cancelado")
+        except Exception as e:
+            logger.warning(f"⚠️ [RunPod] No se pudo cancelar {job_id}: {e}")
+
     def _messages_to_prompt(self, messages: List[Dict]) -> str:
         """Convierte formato OpenAI messages a un prompt simple"""
         prompt_parts = []
@@ -221,13 +331,48 @@ class ConnectionBroker:
         self.ollama_cpu_client: Optional[OpenAI] = None
         self.runpod_client: Optional[RunPodClient] = None
         self._initialized = False
-        
+        self._init_lock = threading.Lock()
+
+        # Event loop propio (hilo daemon) donde viven los pools async.
+        # Los clientes httpx quedan atados a este loop, así que se reutilizan
+        # entre llamadas sin importar si el llamador es sync o usa otro loop.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._http_clients: Dict[ConnectionType, httpx.AsyncClient] = {}
+        self._prober_future = None
+        self._explore_tasks: set = set()  # mediciones en background (referencia fuerte)
+
+        # Estadísticas de hedging (agregadas + últimas llamadas)
+        self._hedge_stats: Dict[str, int] = {
+            "calls": 0,
+            "hedged": 0,
+            "primary_wins": 0,
+            "backup_wins": 0,
+            "fallback_wins": 0,
+            "cancelled": 0,
+            "failures": 0
+        }
+        self._hedge_history: deque = deque(maxlen=100)
+
+        # Single-flight: requests idénticos en vuelo comparten una llamada.
+        # clave -> [task, cantidad de llamadores esperando]
+        self._inflight: Dict[str, List[Any]] = {}
+        self._flight_stats: Dict[str, int] = {"leaders": 0, "coalesced": 0}
+
     def initialize(self):
         """Inicializa todas las conexiones disponibles"""
         if self._initialized:
             logger.info("🔒 [Broker] Ya inicializado")
             return
         
+        # El warm-up en background y el primer request pueden llegar a la vez
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._initialize_connections()
+    
+    def _initialize_connections(self):
         logger.info("=" * 60)
         logger.info("🚀 [Broker] INICIALIZANDO CONEXIONES")
         logger.info("=" * 60)
@@ -242,8 +387,15 @@ class ConnectionBroker:
 
         # 2. Ollama CPU (Prioridad 2)
         self._init_ollama_cpu()
-        
+
+        # Las conexiones configuradas que no respondieron arrancan con el
+        # circuito abierto: el prober las reincorpora cuando vuelvan.
+        for config in self.connections.values():
+            if not config.available and self._can_probe(config.conn_type):
+                self._open_circuit(config, config.last_error or "init failed")
+
         self._initialized = True
+        self._start_prober()
         self._log_status()
     
     def _init_ollama_gpu(self):
@@ -352,104 +504,677 @@ class ConnectionBroker:
                  max_tokens: int = 500, timeout: int = OLLAMA_TIMEOUT) -> Optional[str]:
         """
         Genera texto usando la mejor conexión disponible.
-        Intenta en orden de prioridad con fallback automático.
+        Wrapper sync sobre agenerate() para los llamadores existentes:
+        ejecuta la corrutina en el loop del broker y espera el resultado.
         """
         if not self._initialized:
             self.initialize()
         
-        # Ordenar conexiones por prioridad
-        sorted_conns = sorted(
-            self.connections.values(),
-            key=lambda c: c.priority
+        future = asyncio.run_coroutine_threadsafe(
+            self._single_flight(
+                self._flight_key(messages, temperature, max_tokens, timeout),
+                lambda: self._agenerate(messages, temperature, max_tokens, timeout)
+            ),
+            self._get_loop()
         )
+        return self._wait_sync(future, timeout)
+    
+    async def agenerate(self, messages: List[Dict], temperature: float = 0.3,
+                        max_tokens: int = 500, timeout: int = OLLAMA_TIMEOUT) -> Optional[str]:
+        """
+        Versión awaitable de generate().
+        La generación corre en el loop del broker (pools keep-alive compartidos);
+        el llamador solo espera el futuro, sin ocupar un hilo.
+        """
+        if not self._initialized:
+            await asyncio.get_running_loop().run_in_executor(None, self.initialize)
         
+        future = asyncio.run_coroutine_threadsafe(
+            self._single_flight(
+                self._flight_key(messages, temperature, max_tokens, timeout),
+                lambda: self._agenerate(messages, temperature, max_tokens, timeout)
+            ),
+            self._get_loop()
+        )
+        return await asyncio.wrap_future(future)
+    
+    # ============== SINGLE-FLIGHT ==============
+
+    @staticmethod
+    def _flight_key(messages: List[Dict], temperature: float, max_tokens: int,
+                    timeout: float, mode: str = "direct") -> str:
+        """
+        Solo se comparten llamadas con los mismos ajustes: un llamador con
+        timeout corto o que pidió hedging no se cuelga de un request distinto.
+        mode: "direct" o "hedged:<percentil>".
+        """
+        payload = json.dumps(
+            {"messages": messages, "temperature": temperature, "max_tokens": max_tokens,
+             "timeout": timeout, "mode": mode},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Si ya hay una llamada idéntica en vuelo, espera su resultado en vez de
+        lanzar otra. La llamada compartida solo se cancela cuando no queda
+        ningún llamador esperándola.
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return await factory()
+
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(factory())
+            entry = [task, 0]
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+            self._flight_stats["leaders"] += 1
+        else:
+            self._flight_stats["coalesced"] += 1
+            logger.info(f"🔗 [Broker] Request idéntico en vuelo, compartiendo resultado ({entry[1]} esperando)")
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] <= 1:
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def get_flight_stats(self) -> Dict[str, Any]:
+        """Estadísticas de coalescing (llamadas reales vs. compartidas)"""
+        stats = dict(self._flight_stats)
+        total = stats["leaders"] + stats["coalesced"]
+        stats["in_flight"] = len(self._inflight)
+        stats["coalesced_rate"] = round(stats["coalesced"] / total, 3) if total else 0.0
+        return stats
+
+    async def _agenerate(self, messages: List[Dict], temperature: float,
+                         max_tokens: int, timeout: int) -> Optional[str]:
+        """
+        Intenta las conexiones en orden de ruteo con fallback automático.
+        Corre siempre dentro del loop del broker.
+        """
         last_error = None
-        
-        for config in sorted_conns:
-            if not config.available:
+
+        for config in self._rank_connections(max_tokens):
+            if not self._allow_request(config):
                 continue
-            
-            try:
-                logger.info(f"🧠 [Broker] Intentando con {config.conn_type.value}...")
-                start = time.time()
-                
-                result = self._generate_with_connection(
-                    config.conn_type, messages, temperature, max_tokens, timeout
-                )
-                
-                elapsed = time.time() - start
-                
-                if result:
-                    # Actualizar estadísticas
-                    config.total_requests += 1
-                    config.last_used = time.time()
-                    config.last_error = None
-                    
-                    logger.info(
-                        f"✅ [Broker] Éxito con {config.conn_type.value} "
-                        f"({elapsed:.2f}s, {config.total_requests} requests)"
-                    )
-                    return result
-                
-            except Exception as e:
-                elapsed = time.time() - start
-                last_error = str(e)
-                
-                # Actualizar estadísticas de error
-                config.total_failures += 1
-                config.last_error = last_error
-                
-                logger.warning(
-                    f"⚠️ [Broker] Falló {config.conn_type.value} después de {elapsed:.2f}s: {e}"
-                )
-                
-                # Si es un error grave, marcar como no disponible temporalmente
-                if isinstance(e, (APIConnectionError, requests.ConnectionError)):
-                    config.available = False
-                    logger.warning(f"🚫 [Broker] Deshabilitando {config.conn_type.value} temporalmente")
-                
-                continue  # Intentar siguiente conexión
-        
+
+            result, error = await self._run_on_connection(
+                config, messages, temperature, max_tokens, timeout
+            )
+            if result:
+                return result
+            last_error = error or last_error
+
         # Si llegamos aquí, todas las conexiones fallaron
         logger.error(f"❌ [Broker] TODAS las conexiones fallaron. Último error: {last_error}")
         return None
-    
-    def _generate_with_connection(
-        self, 
+
+    def generate_hedged(self, messages: List[Dict], temperature: float = 0.3,
+                        max_tokens: int = 500, timeout: int = OLLAMA_TIMEOUT,
+                        hedge_percentile: Optional[float] = None) -> Optional[str]:
+        """
+        Igual que generate(), pero con hedging: si el primario no responde
+        dentro del presupuesto (percentil de su latencia), se corre el mismo
+        request en el siguiente backend y gana el primero; el otro se cancela.
+        """
+        if not self._initialized:
+            self.initialize()
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._single_flight(
+                self._flight_key(
+                    messages, temperature, max_tokens, timeout,
+                    f"hedged:{hedge_percentile or HEDGE_PERCENTILE}"
+                ),
+                lambda: self._agenerate_hedged(
+                    messages, temperature, max_tokens, timeout, hedge_percentile
+                )
+            ),
+            self._get_loop()
+        )
+        return self._wait_sync(future, timeout)
+
+    def _wait_sync(self, future, timeout: float) -> Optional[str]:
+        """
+        Espera desde el hilo de la action un resultado del loop del broker,
+        con tope timeout x conexiones (el peor caso del fallback en cadena).
+        Si se excede, cancela la corrutina y devuelve None como cualquier
+        generación fallida, en vez de dejar el hilo colgado para siempre.
+        """
+        bound = timeout * max(1, len(self.connections))
+        try:
+            return future.result(timeout=bound)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.error(f"❌ [Broker] Generación sin respuesta después de {bound:.0f}s, cancelada")
+            return None
+
+    async def agenerate_hedged(self, messages: List[Dict], temperature: float = 0.3,
+                               max_tokens: int = 500, timeout: int = OLLAMA_TIMEOUT,
+                               hedge_percentile: Optional[float] = None) -> Optional[str]:
+        """Versión awaitable de generate_hedged()"""
+        if not self._initialized:
+            await asyncio.get_running_loop().run_in_executor(None, self.initialize)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._single_flight(
+                self._flight_key(
+                    messages, temperature, max_tokens, timeout,
+                    f"hedged:{hedge_percentile or HEDGE_PERCENTILE}"
+                ),
+                lambda: self._agenerate_hedged(
+                    messages, temperature, max_tokens, timeout, hedge_percentile
+                )
+            ),
+            self._get_loop()
+        )
+        return await asyncio.wrap_future(future)
+
+    async def _agenerate_hedged(self, messages: List[Dict], temperature: float,
+                                max_tokens: int, timeout: int,
+                                hedge_percentile: Optional[float]) -> Optional[str]:
+        percentile = hedge_percentile or HEDGE_PERCENTILE
+        call_start = time.time()
+        candidates = iter(self._rank_connections(max_tokens))
+        record: Dict[str, Any] = {
+            "primary": None, "backup": None, "budget": None,
+            "hedged": False, "winner": None, "elapsed": None
+        }
+
+        def next_config() -> Optional[ConnectionConfig]:
+            for config in candidates:
+                if self._allow_request(config):
+                    return config
+            return None
+
+        def launch(config: ConnectionConfig) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self._run_on_connection(
+                    config, messages, temperature, max_tokens, timeout, cancellable=True
+                )
+            )
+
+        pending: Dict[asyncio.Future, ConnectionConfig] = {}
+        last_error = None
+
+        primary = next_config()
+        if primary is not None:
+            record["primary"] = primary.conn_type.value
+            record["budget"] = self._hedge_budget(primary, percentile)
+            pending[launch(primary)] = primary
+
+        try:
+            while pending:
+                wait_timeout = None if record["hedged"] else record["budget"]
+                done, _ = await asyncio.wait(
+                    list(pending.keys()), timeout=wait_timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Venció el presupuesto: un solo hedge por llamada
+                    record["hedged"] = True
+                    backup = next_config()
+                    if backup is not None:
+                        record["backup"] = backup.conn_type.value
+                        logger.info(
+                            f"🏁 [Broker] Hedge: {record['primary']} superó "
+                            f"{record['budget']:.2f}s, lanzando {record['backup']}"
+                        )
+                        pending[launch(backup)] = backup
+                    continue
+
+                for task in done:
+                    config = pending.pop(task)
+                    result, error = task.result()
+                    if result:
+                        record["winner"] = config.conn_type.value
+                        return result
+                    last_error = error or last_error
+
+                if not pending:
+                    # Fallaron todos los lanzados: fallback al siguiente backend
+                    fallback = next_config()
+                    if fallback is not None:
+                        if not record["hedged"]:
+                            record["budget"] = self._hedge_budget(fallback, percentile)
+                        pending[launch(fallback)] = fallback
+
+            logger.error(f"❌ [Broker] TODAS las conexiones fallaron (hedged). Último error: {last_error}")
+            return None
+
+        finally:
+            # Cancelar al perdedor (o a todos si el llamador canceló)
+            for task in pending:
+                task.cancel()
+            record["elapsed"] = round(time.time() - call_start, 3)
+            self._record_hedge(record, cancelled=len(pending))
+
+    def _hedge_budget(self, config: ConnectionConfig, percentile: float) -> float:
+        """Presupuesto antes de hedgear: percentil de latencia del backend"""
+        budget = self._latency_percentile(config, percentile)
+        if budget is None:
+            budget = HEDGE_DEFAULT_BUDGET
+        return max(HEDGE_MIN_BUDGET, budget)
+
+    def _record_hedge(self, record: Dict[str, Any], cancelled: int):
+        stats = self._hedge_stats
+        stats["calls"] += 1
+        stats["cancelled"] += cancelled
+        if record["hedged"] and record["backup"]:
+            stats["hedged"] += 1
+
+        winner = record["winner"]
+        if winner is None:
+            stats["failures"] += 1
+        elif winner == record["primary"]:
+            stats["primary_wins"] += 1
+        elif winner == record["backup"]:
+            stats["backup_wins"] += 1
+        else:
+            stats["fallback_wins"] += 1
+
+        self._hedge_history.append(record)
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """Estadísticas de hedging para ajustar el presupuesto"""
+        stats = dict(self._hedge_stats)
+        calls = stats["calls"]
+        stats["hedge_rate"] = round(stats["hedged"] / calls, 3) if calls else 0.0
+        stats["backup_win_rate"] = (
+            round(stats["backup_wins"] / stats["hedged"], 3) if stats["hedged"] else 0.0
+        )
+        stats["percentile"] = HEDGE_PERCENTILE
+        stats["recent"] = list(self._hedge_history)[-10:]
+        return stats
+
+    async def _run_on_connection(
+        self,
+        config: ConnectionConfig,
+        messages: List[Dict],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        cancellable: bool = False
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Un intento sobre una conexión, con estadísticas y circuit breaker.
+        Retorna (resultado, error); nunca propaga excepciones salvo cancelación.
+        cancellable: el intento puede cancelarse a mitad de camino (hedging).
+        """
+        start = time.time()
+        try:
+            logger.info(f"🧠 [Broker] Intentando con {config.conn_type.value}...")
+
+            result = await self._agenerate_with_connection(
+                config.conn_type, messages, temperature, max_tokens, timeout, cancellable
+            )
+
+            elapsed = time.time() - start
+
+            if result:
+                # Actualizar estadísticas
+                config.total_requests += 1
+                config.last_used = time.time()
+                self._record_latency(config, elapsed, max_tokens)
+                self._record_success(config)
+
+                logger.info(
+                    f"✅ [Broker] Éxito con {config.conn_type.value} "
+                    f"({elapsed:.2f}s, {config.total_requests} requests)"
+                )
+                return result, None
+
+            # Respuesta vacía: liberar el slot de prueba sin cambiar el estado
+            config.half_open_in_flight = False
+            return None, "empty response"
+
+        except asyncio.CancelledError:
+            config.half_open_in_flight = False
+            raise
+
+        except Exception as e:
+            elapsed = time.time() - start
+            last_error = str(e) or type(e).__name__
+
+            # Actualizar estadísticas de error
+            config.total_failures += 1
+            self._record_error_outcome(config)
+
+            logger.warning(
+                f"⚠️ [Broker] Falló {config.conn_type.value} después de {elapsed:.2f}s: {last_error}"
+            )
+
+            # Los errores de conexión abren el circuito de inmediato;
+            # el resto cuenta para el umbral de fallas consecutivas.
+            self._record_failure(
+                config, last_error,
+                fatal=isinstance(e, (APIConnectionError, requests.ConnectionError, httpx.TransportError))
+            )
+            return None, last_error
+
+    async def _agenerate_with_connection(
+        self,
         conn_type: ConnectionType,
         messages: List[Dict],
         temperature: float,
         max_tokens: int,
-        timeout: int
+        timeout: int,
+        cancellable: bool = False
     ) -> Optional[str]:
-        """Genera usando una conexión específica"""
+        """Genera usando una conexión específica (async, con pool compartido)"""
         
-        if conn_type == ConnectionType.OLLAMA_GPU:
-            response = self.ollama_gpu_client.chat.completions.create(
-                model=MODEL_GPU,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                timeout=timeout
-            )
-            return response.choices[0].message.content.strip()
+        http = self._get_http_client(conn_type)
         
-        elif conn_type == ConnectionType.OLLAMA_CPU:
-            response = self.ollama_cpu_client.chat.completions.create(
-                model=MODEL_CPU,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
+        if conn_type in (ConnectionType.OLLAMA_GPU, ConnectionType.OLLAMA_CPU):
+            base_url = OLLAMA_GPU_URL if conn_type == ConnectionType.OLLAMA_GPU else OLLAMA_CPU_URL
+            model = MODEL_GPU if conn_type == ConnectionType.OLLAMA_GPU else MODEL_CPU
+            
+            # Mismo endpoint OpenAI-compatible que el cliente OpenAI de la inicialización
+            response = await http.post(
+                f"{base_url.rstrip('/')}/chat/completions",
+                json={
+                    "model": model,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                },
+                headers={"Authorization": "Bearer ollama"},
                 timeout=timeout
             )
-            return response.choices[0].message.content.strip()
+            response.raise_for_status()
+            data = response.json()
+            return (data["choices"][0]["message"].get("content") or "").strip()
         
         elif conn_type == ConnectionType.RUNPOD:
-            return self.runpod_client.run_job(messages, temperature, max_tokens)
+            return await self.runpod_client.arun_job(
+                http, messages, temperature, max_tokens, cancellable=cancellable
+            )
         
         else:
             raise ValueError(f"Tipo de conexión desconocido: {conn_type}")
     
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Devuelve (creándolo si hace falta) el event loop del broker"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="broker-event-loop",
+                    daemon=True
+                )
+                self._loop_thread.start()
+                logger.info("🔁 [Broker] Event loop async iniciado")
+        return self._loop
+    
+    def _get_http_client(self, conn_type: ConnectionType) -> httpx.AsyncClient:
+        """
+        Cliente httpx con pool keep-alive para un backend.
+        Se crea perezosamente dentro del loop del broker y se reutiliza.
+        """
+        client = self._http_clients.get(conn_type)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=BROKER_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=BROKER_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=BROKER_POOL_KEEPALIVE_EXPIRY
+                ),
+                timeout=OLLAMA_CLIENT_TIMEOUT
+            )
+            self._http_clients[conn_type] = client
+        return client
+    
+    async def _aclose_http_clients(self):
+        clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug(f"[Broker] Error cerrando pool: {e}")
+    
+    def close(self):
+        """Cierra los pools HTTP y detiene el loop del broker"""
+        with self._loop_lock:
+            loop = self._loop
+            self._loop = None
+        
+        if loop is None or loop.is_closed():
+            return
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self._aclose_http_clients(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ [Broker] Error cerrando pools: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            logger.info("🔌 [Broker] Pools cerrados")
+
+    # ============== RUTEO POR LATENCIA ==============
+
+    def _rank_connections(self, max_tokens: int) -> List[ConnectionConfig]:
+        """
+        Ordena las conexiones para un request.
+        En modo "latency" gana el menor tiempo esperado para max_tokens;
+        la prioridad estática solo desempata.
+        """
+        if ROUTING_MODE != "latency":
+            return sorted(self.connections.values(), key=lambda c: c.priority)
+
+        return sorted(
+            self.connections.values(),
+            key=lambda c: (self._expected_time(c, max_tokens), c.priority)
+        )
+
+    def _expected_time(self, config: ConnectionConfig, max_tokens: int) -> float:
+        """
+        Tiempo esperado de completar un request de max_tokens.
+        Backends sin muestras todavía usan un prior pesimista (el peor p95
+        observado o HEDGE_DEFAULT_BUDGET); en ambos casos la tasa de error
+        infla la estimación como costo esperado de reintento. Re-medir los
+        backends que quedaron sin tráfico es trabajo del prober, no de una
+        request de usuario.
+        """
+        if config.ewma_sec_per_token is None:
+            estimate = self._pessimistic_prior()
+        else:
+            estimate = config.ewma_sec_per_token * max(max_tokens, 1)
+        return estimate / max(0.05, 1.0 - config.ewma_error_rate)
+
+    def _pessimistic_prior(self) -> float:
+        """Peor p95 observado entre todas las conexiones (mínimo HEDGE_DEFAULT_BUDGET)"""
+        observed = [
+            self._latency_percentile(config, 95) for config in self.connections.values()
+        ]
+        return max([HEDGE_DEFAULT_BUDGET] + [p95 for p95 in observed if p95 is not None])
+
+    def _record_latency(self, config: ConnectionConfig, elapsed: float, max_tokens: int):
+        alpha = ROUTING_EWMA_ALPHA
+        per_token = elapsed / max(max_tokens, 1)
+
+        if config.ewma_latency is None:
+            config.ewma_latency = elapsed
+            config.ewma_sec_per_token = per_token
+        else:
+            config.ewma_latency = alpha * elapsed + (1 - alpha) * config.ewma_latency
+            config.ewma_sec_per_token = alpha * per_token + (1 - alpha) * config.ewma_sec_per_token
+
+        config.ewma_error_rate = (1 - alpha) * config.ewma_error_rate
+        config.latency_window.append(elapsed)
+
+    def _record_error_outcome(self, config: ConnectionConfig):
+        alpha = ROUTING_EWMA_ALPHA
+        config.ewma_error_rate = alpha * 1.0 + (1 - alpha) * config.ewma_error_rate
+
+    def _latency_percentile(self, config: ConnectionConfig, pct: float) -> Optional[float]:
+        """Percentil de latencia sobre la ventana de muestras recientes"""
+        if not config.latency_window:
+            return None
+        samples = sorted(config.latency_window)
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+    # ============== CIRCUIT BREAKER ==============
+
+    def _allow_request(self, config: ConnectionConfig) -> bool:
+        """
+        Decide si una conexión puede recibir tráfico según su circuito.
+        OPEN pasa a HALF_OPEN al vencer el cool-down y deja pasar una sola
+        request de prueba; el resto sigue de largo hasta que se resuelva.
+        """
+        if config.circuit_state == CircuitState.CLOSED:
+            return config.available
+
+        if config.circuit_state == CircuitState.OPEN:
+            if config.opened_at is None or time.time() - config.opened_at < CB_COOLDOWN:
+                return False
+            config.circuit_state = CircuitState.HALF_OPEN
+            logger.info(f"🟡 [Broker] {config.conn_type.value} en half-open")
+
+        if config.half_open_in_flight:
+            return False
+        config.half_open_in_flight = True
+        return True
+
+    def _record_success(self, config: ConnectionConfig):
+        """Cierra el circuito y resetea los contadores de falla"""
+        if config.circuit_state != CircuitState.CLOSED:
+            logger.info(f"🟢 [Broker] {config.conn_type.value} recuperada, circuito cerrado")
+        config.circuit_state = CircuitState.CLOSED
+        config.available = True
+        config.consecutive_failures = 0
+        config.opened_at = None
+        config.half_open_in_flight = False
+        config.last_error = None
+
+    def _record_failure(self, config: ConnectionConfig, error: str, fatal: bool = False):
+        """Registra una falla y abre el circuito si corresponde"""
+        config.consecutive_failures += 1
+        config.last_error = error
+        config.half_open_in_flight = False
+
+        if (fatal
+                or config.circuit_state == CircuitState.HALF_OPEN
+                or config.consecutive_failures >= CB_FAILURE_THRESHOLD):
+            self._open_circuit(config, error)
+
+    def _open_circuit(self, config: ConnectionConfig, reason: str):
+        config.circuit_state = CircuitState.OPEN
+        config.available = False
+        config.opened_at = time.time()
+        config.half_open_in_flight = False
+        config.times_opened += 1
+        logger.warning(
+            f"🚫 [Broker] Circuito abierto para {config.conn_type.value} "
+            f"({reason}); reintento en {CB_COOLDOWN:.0f}s"
+        )
+
+    def _can_probe(self, conn_type: ConnectionType) -> bool:
+        """Solo se sondean backends configurados (cliente creado)"""
+        if conn_type == ConnectionType.OLLAMA_GPU:
+            return self.ollama_gpu_client is not None
+        if conn_type == ConnectionType.OLLAMA_CPU:
+            return self.ollama_cpu_client is not None
+        if conn_type == ConnectionType.RUNPOD:
+            return self.runpod_client is not None
+        return False
+
+    def _start_prober(self):
+        """Lanza el loop de probes en segundo plano (idempotente)"""
+        if self._prober_future is not None and not self._prober_future.done():
+            return
+        self._prober_future = asyncio.run_coroutine_threadsafe(self._probe_loop(), self._get_loop())
+
+    async def _probe_loop(self):
+        """
+        Sondea periódicamente las conexiones con el circuito abierto cuyo
+        cool-down ya venció, para devolverles el tráfico sin esperar a que
+        una request de usuario haga de conejillo de indias. Las cerradas que
+        quedaron sin muestras recientes se re-miden con _explore_connection.
+        """
+        while True:
+            await asyncio.sleep(CB_PROBE_INTERVAL)
+            for config in list(self.connections.values()):
+                if config.circuit_state == CircuitState.CLOSED:
+                    self._maybe_explore(config)
+                    continue
+                if not self._can_probe(config.conn_type):
+                    continue
+                if not self._allow_request(config):
+                    continue
+                try:
+                    await self._probe_connection(config.conn_type)
+                    self._record_success(config)
+                except asyncio.CancelledError:
+                    config.half_open_in_flight = False
+                    raise
+                except Exception as e:
+                    logger.debug(f"[Broker] Probe {config.conn_type.value} falló: {e}")
+                    self._record_failure(config, str(e) or type(e).__name__)
+
+    def _maybe_explore(self, config: ConnectionConfig):
+        """Lanza una medición en background si la conexión no tiene muestras recientes"""
+        if ROUTING_MODE != "latency" or ROUTING_EXPLORE_AFTER <= 0:
+            return
+        if not config.available or not self._can_probe(config.conn_type):
+            return
+        now = time.time()
+        if config.last_used is not None and now - config.last_used < ROUTING_EXPLORE_AFTER:
+            return
+        if config.last_explored is not None and now - config.last_explored < ROUTING_EXPLORE_AFTER:
+            return
+        config.last_explored = now
+        task = asyncio.ensure_future(self._explore_connection(config))
+        self._explore_tasks.add(task)
+        task.add_done_callback(self._explore_tasks.discard)
+
+    async def _explore_connection(self, config: ConnectionConfig):
+        """
+        Request de medición (ROUTING_EXPLORE_MAX_TOKENS) fuera del camino del
+        usuario: actualiza latencia, tasa de error y circuito como cualquier
+        intento, así el ruteo vuelve a tener datos de backends lentos sin
+        mandarles tráfico real.
+        """
+        logger.info(f"🔭 [Broker] Midiendo {config.conn_type.value} en background")
+        await self._run_on_connection(
+            config, [{"role": "user", "content": "Respondé solo: ok"}],
+            0.0, ROUTING_EXPLORE_MAX_TOKENS, OLLAMA_TIMEOUT
+        )
+
+    async def _probe_connection(self, conn_type: ConnectionType):
+        """Probe liviano: equivalente async de models.list() / health de RunPod"""
+        http = self._get_http_client(conn_type)
+
+        if conn_type in (ConnectionType.OLLAMA_GPU, ConnectionType.OLLAMA_CPU):
+            base_url = OLLAMA_GPU_URL if conn_type == ConnectionType.OLLAMA_GPU else OLLAMA_CPU_URL
+            model = MODEL_GPU if conn_type == ConnectionType.OLLAMA_GPU else MODEL_CPU
+
+            response = await http.get(f"{base_url.rstrip('/')}/models", timeout=CB_PROBE_TIMEOUT)
+            response.raise_for_status()
+            available_models = [m.get("id", "") for m in response.json().get("data", [])]
+            if not any(m.startswith(model) for m in available_models):
+                raise RuntimeError(f"Model {model} not found")
+
+        elif conn_type == ConnectionType.RUNPOD:
+            response = await http.get(
+                f"{self.runpod_client.base_url}/{self.runpod_client.endpoint_id}",
+                headers=self.runpod_client._get_headers(),
+                timeout=CB_PROBE_TIMEOUT
+            )
+            # 404 es OK, significa que el endpoint existe (igual que en _init_runpod)
+            if response.status_code not in [200, 404]:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
     def get_status(self) -> Dict[str, Any]:
         """Retorna el estado actual de todas las conexiones"""
         status = {}
@@ -461,11 +1186,33 @@ class ConnectionBroker:
                 "total_requests": config.total_requests,
                 "total_failures": config.total_failures,
                 "last_error": config.last_error,
-                "last_used": config.last_used
+                "last_used": config.last_used,
+                "circuit_state": config.circuit_state.value,
+                "consecutive_failures": config.consecutive_failures,
+                "times_opened": config.times_opened,
+                "ewma_latency": round(config.ewma_latency, 3) if config.ewma_latency is not None else None,
+                "p95_latency": self._latency_percentile(config, 95),
+                "ewma_sec_per_token": config.ewma_sec_per_token,
+                "error_rate": round(config.ewma_error_rate, 3),
+                "latency_samples": len(config.latency_window),
+                "retry_in": (
+                    max(0.0, round(CB_COOLDOWN - (time.time() - config.opened_at), 1))
+                    if config.circuit_state == CircuitState.OPEN and config.opened_at else None
+                )
             }
         
         return status
     
+    def get_traffic_stats(self) -> Dict[str, Any]:
+        """
+        Hedging y single-flight de todo el broker. Va aparte de get_status(),
+        que los llamadores recorren como un dict de conexiones.
+        """
+        return {
+            "hedging": self.get_hedge_stats(),
+            "single_flight": self.get_flight_stats()
+        }
+    
     def _log_status(self):
         """Muestra un resumen del estado de las conexiones"""
         logger.info("=" * 60)
@@ -474,6 +1221,8 @@ class ConnectionBroker:
         
         for conn_type, config in sorted(self.connections.items(), key=lambda x: x[1].priority):
             status = "✅ Disponible" if config.available else "❌ No disponible"
+            if config.circuit_state != CircuitState.CLOSED:
+                status += f" [circuito {config.circuit_state.value}]"
             error = f" ({config.last_error})" if config.last_error else ""
             
             logger.info(f"  [{config.priority}] {conn_type.value}: {status}{error}")
@@ -491,6 +1240,10 @@ class ConnectionBroker:
         elif conn_type == ConnectionType.RUNPOD:
             self._init_runpod()
 
+        config = self.connections.get(conn_type)
+        if config and not config.available and self._can_probe(conn_type):
+            self._open_circuit(config, config.last_error or "reset failed")
+
 
 # ============== INSTANCIA GLOBAL ==============
 _broker = ConnectionBroker()
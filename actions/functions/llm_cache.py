@@ -0,0 +1,196 @@
+# actions/functions/llm_cache.py
+"""
+Cache persistente (SQLite) de respuestas del LLM para la extracción de
+parámetros de búsqueda.
+
+Los prompts de new_search / modification son deterministas (TEMPERATURE baja,
+system prompt fijo), así que el mismo mensaje normalizado con los mismos
+parámetros pre-analizados produce la misma salida. Guardarla en disco evita
+pagar inferencia de nuevo, incluso después de reiniciar el action server.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============== CONFIGURACIÓN ==============
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(BASE_DIR, "..", ".cache", "llm_cache.sqlite3")
+)
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # segundos
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# ===========================================
+
+
+def normalize_cache_message(text: str) -> str:
+    """Normalización liviana: minúsculas, espacios colapsados, sin puntuación final"""
+    text = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return text.rstrip(" .!?¡¿")
+
+
+class LLMResponseCache:
+    """
+    Cache clave -> respuesta cruda del LLM con TTL y tope de entradas.
+    Al superar el tope se descartan las menos usadas recientemente.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+
+        if self.enabled:
+            self._open()
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+            self._conn.commit()
+            logger.info(f"💾 [LLMCache] Cache persistente en {self.path}")
+        except Exception as e:
+            logger.warning(f"⚠️ [LLMCache] No se pudo abrir el cache ({e}), deshabilitado")
+            self._conn = None
+            self.enabled = False
+
+    @staticmethod
+    def make_key(kind: str, user_message: str, params: Dict[str, Any], prompt_version: str) -> str:
+        """Clave = tipo + mensaje normalizado + params (orden canónico) + versión de prompt"""
+        payload = json.dumps(
+            {
+                "kind": kind,
+                "message": normalize_cache_message(user_message),
+                "params": params,
+                "prompt": prompt_version
+            },
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled or self._conn is None:
+            return None
+
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+
+                value, created_at = row
+                if now - created_at > self.ttl:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._stats["expired"] += 1
+                    self._stats["misses"] += 1
+                    return None
+
+                self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self._stats["hits"] += 1
+                return value
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [LLMCache] Error leyendo cache: {e}")
+            return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled or self._conn is None or not value:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._stats["writes"] += 1
+                self._evict_if_needed()
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [LLMCache] Error escribiendo cache: {e}")
+
+    def _evict_if_needed(self):
+        """Borra expiradas y, si sigue excedido, las menos usadas (deja 10% de margen)"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+
+        total = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if total <= self.max_entries:
+            return
+
+        to_delete = total - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+            (to_delete,)
+        )
+        self._stats["evictions"] += to_delete
+        logger.info(f"🧹 [LLMCache] {to_delete} entradas desalojadas")
+
+    def clear(self):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["entries"] = 0
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+# ============== INSTANCIA GLOBAL ==============
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Obtiene la instancia global del cache de LLM"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+    return _llm_cache
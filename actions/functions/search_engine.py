@@ -1,8 +1,13 @@
 # actions/actions_busqueda/search_engine.py
+import copy
+import hashlib
 import logging
 import os
 import time
 import json
+import textwrap
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, Any, Tuple, List, Optional
 
 # from dotenv import load_dotenv
@@ -10,6 +15,7 @@ from actions.functions.conections_broker import ConnectionBroker, ConnectionType
 # from openai import OpenAI, APITimeoutError, APIConnectionError, NotFoundError
 
 from actions.api_client import search_products, search_offers
+from actions.functions.llm_cache import get_llm_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +23,53 @@ logger = logging.getLogger(__name__)
 OLLAMA_API_KEY = "ollama"
 TEMPERATURE = 0.1
 GENERATION_TIMEOUT = 120
+# Subir al cambiar los builders de prompts: invalida el cache persistente del LLM
+PROMPT_VERSION = "1"
+# Búsqueda especulativa: la API se consulta con el pre-análisis en paralelo al LLM
+SPECULATIVE_DIRECT_SEARCH = os.getenv("SPECULATIVE_DIRECT_SEARCH", "true").lower() == "true"
+SPECULATIVE_MAX_WORKERS = int(os.getenv("SPECULATIVE_MAX_WORKERS", "8"))
 # ===========================================
 
+# ============== PIEZAS DE PROMPTS ==============
+# Compartidas por los builders de clasificación, búsqueda nueva y
+# clasificación + extracción: se editan en un solo lugar
+CLASSIFICATION_CRITERIA = """BÚSQUEDA incluye:
+- Solicitudes de productos (nombre, categoría, animal, síntoma, dosis)
+- Solicitudes de ofertas, descuentos, promociones
+- Comparaciones de precios, stock
+- Filtros específicos (proveedor, estado, cantidad)
+- Ejemplos: "busco antibióticos para perros", "ofertas con más de 20% descuento", "productos nuevos"
+
+CONVERSACIONAL incluye:
+- Saludos, despedidas, agradecimientos
+- Preguntas sobre el servicio, cómo funciona
+- Quejas, feedback negativo
+- Conversación casual sin intención de búsqueda
+- Ejemplos: "hola", "gracias", "no me sirvió", "¿cómo funciona esto?\""""
+
+SEARCH_FILTER_FIELDS = """"nombre": ["producto1", "producto2"],
+"proveedor": ["Richmond", "Holliday"],
+"categoria": ["Antiparasitarios"],
+"animal": ["perro", "gato"],
+"sintoma": ["vomitos"],
+"estado": ["nuevo", "poco_stock"],
+"descuento_min": 20,
+"descuento_max": 50,
+"bonificacion_min": 10,
+"bonificacion_max": 30,
+"stock_min": 5,
+"stock_max": 100,
+"dosis_gramaje": "500mg",
+"dosis_volumen": "10ml",
+"dosis_forma": "comprimidos\""""
+
+ARRAY_FIELDS_RULE = """Los campos 'nombre', 'proveedor', 'categoria', 'animal', 'sintoma', y 'estado' DEBEN ser arrays `[]`.
+- INCORRECTO: "proveedor": "holliday"
+- CORRECTO: "proveedor": ["holliday"]"""
+
+ESTADO_RULES = """- Si "action" es "search_products", el ÚNICO estado válido es "en_oferta".
+- Si "action" es "search_offers", puedes usar: "nuevo", "vistas", "poco_stock", "vence_pronto"."""
+
 # Mapeo de estados (sin cambios)
 ESTADO_MAP = {
     "en_oferta": ["rebajado", "promocion", "oferta", "con_descuento", "en_promocion"],
@@ -28,6 +79,20 @@ ESTADO_MAP = {
     "vistas": ["ya_vistas", "visitadas"]
 }
 
+_speculative_executor = ThreadPoolExecutor(
+    max_workers=SPECULATIVE_MAX_WORKERS,
+    thread_name_prefix="speculative-search"
+)
+
+
+@dataclass
+class SpeculativeSearch:
+    """Búsqueda directa lanzada en paralelo al LLM con los params del pre-análisis"""
+    future: Future
+    params: Dict[str, Any]
+    search_type: str
+
+
 class SearchEngine:
     """
     Motor de búsqueda inteligente con LLM.
@@ -139,10 +204,14 @@ class SearchEngine:
         user_message: str,
         is_modification: bool = False,
         previous_params: Dict[str, Any] = None,
-        chat_history: List[Dict] = None
+        chat_history: List[Dict] = None,
+        speculative: Optional[SpeculativeSearch] = None
     ) -> Dict[str, Any]:
         """
         🔄 MODIFICADO: Usa _is_broker_available() para el fallback.
+        
+        speculative: búsqueda directa ya lanzada con search_params
+        (ver start_speculative_direct); se reutiliza si el LLM no cambia nada.
         """
         if not self._is_loaded:
             self.load()
@@ -164,13 +233,14 @@ class SearchEngine:
             return self._execute_with_llm_new_search(
                 pre_analyzed_params=search_params,
                 user_message=user_message,
-                search_type=search_type
+                search_type=search_type,
+                speculative=speculative
             )
         
         # ⚠️ CASO 3: Fallback si NO hay broker
         else:
             logger.warning("⚠️ [SearchEngine] No hay LLM (Broker) disponible. Usando pre-análisis directo.")
-            return self.execute_direct(search_params, search_type)
+            return self.execute_direct_or_reuse(search_params, search_type, speculative)
     
     # ============== ✅ NUEVO: BÚSQUEDA NUEVA CON LLM ==============
     
@@ -178,7 +248,8 @@ class SearchEngine:
         self,
         pre_analyzed_params: Dict[str, Any],
         user_message: str,
-        search_type: str
+        search_type: str,
+        speculative: Optional[SpeculativeSearch] = None
     ) -> Dict[str, Any]:
         """
         🔄 MODIFICADO: Usa self.broker.generate() en lugar de try/except GPU/CPU
@@ -199,22 +270,35 @@ class SearchEngine:
         llm_time = 0.0
         llm_used = "none"
         
+        llm_cache = get_llm_cache()
+        cache_key = llm_cache.make_key(
+            f"new_search:{search_type}", user_message, pre_analyzed_params,
+            self._prompt_version(system_prompt)
+        )
+        
         try:
-            # --- ✅ NUEVO: Llamada única al Broker ---
-            logger.info(f"🧠 [NewSearch] Enviando a Broker...")
-            
-            raw_response = self.broker.generate(
-                messages=messages,
-                temperature=TEMPERATURE,
-                max_tokens=500,
-                timeout=GENERATION_TIMEOUT
-            )
+            raw_response = llm_cache.get(cache_key)
             
-            llm_time = time.time() - llm_start
-            
-            # Obtener qué conexión se usó
-            status = self.broker.get_status()
-            llm_used = self._get_last_used_connection(status)
+            if raw_response is not None:
+                llm_time = time.time() - llm_start
+                llm_used = "cache"
+            else:
+                # --- ✅ NUEVO: Llamada única al Broker ---
+                # Hedged: la latencia de cola es lo que más se nota en la búsqueda
+                logger.info(f"🧠 [NewSearch] Enviando a Broker (hedged)...")
+                
+                raw_response = self.broker.generate_hedged(
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=500,
+                    timeout=GENERATION_TIMEOUT
+                )
+                
+                llm_time = time.time() - llm_start
+                
+                # Obtener qué conexión se usó
+                status = self.broker.get_status()
+                llm_used = self._get_last_used_connection(status)
             
             # --- ❌ ELIMINADO: Lógica try/except GPU/CPU ---
 
@@ -223,7 +307,7 @@ class SearchEngine:
                 logger.error("❌ [NewSearch] El Broker retornó None")
                 return self._fallback_to_direct(
                     pre_analyzed_params, search_type, 
-                    "Broker returned None", llm_time
+                    "Broker returned None", llm_time, speculative
                 )
 
             logger.info(f"✅ [NewSearch] Broker respondió en {llm_time:.3f}s (usando {llm_used})")
@@ -231,6 +315,8 @@ class SearchEngine:
             # --- 3. Parsear respuesta (sin cambios) ---
             logger.debug(f"[NewSearch] Respuesta cruda: {raw_response}")
             llm_output = self._extract_json_from_response(raw_response)
+            if llm_used != "cache":
+                llm_cache.set(cache_key, raw_response)
             logger.debug(f"    LLM Output: {json.dumps(llm_output, ensure_ascii=False)}")
             
             # 4. Extraer parámetros finales (sin cambios)
@@ -243,8 +329,8 @@ class SearchEngine:
             
             logger.info(f"🛠️ [NewSearch] Parámetros finales del LLM: {json.dumps(final_params, ensure_ascii=False)}")
             
-            # 5. Ejecutar búsqueda directa (sin cambios)
-            direct_result = self.execute_direct(final_params, final_search_type)
+            # 5. Ejecutar búsqueda directa (o reutilizar la especulativa)
+            direct_result = self.execute_direct_or_reuse(final_params, final_search_type, speculative)
             direct_result["llm_time"] = llm_time
             direct_result["llm_used"] = llm_used # Ahora será "ollama_gpu", "ollama_cpu", etc.
             direct_result["final_params"] = final_params
@@ -257,7 +343,7 @@ class SearchEngine:
             logger.error(f"❌ [NewSearch] Error parseando JSON: {e}")
             return self._fallback_to_direct(
                 pre_analyzed_params, search_type, 
-                f"JSON parsing error: {e}", llm_time
+                f"JSON parsing error: {e}", llm_time, speculative
             )
         
         except Exception as e:
@@ -266,7 +352,7 @@ class SearchEngine:
             logger.error(f"❌ [NewSearch] Error en Broker.generate(): {e}", exc_info=True)
             return self._fallback_to_direct(
                 pre_analyzed_params, search_type, 
-                f"Error Broker: {str(e)}", llm_time
+                f"Error Broker: {str(e)}", llm_time, speculative
             )
     
     # ============== ✅ MODIFICADO: MODIFICACIÓN CON LLM ==============
@@ -299,21 +385,34 @@ class SearchEngine:
         llm_time = 0.0
         llm_used = "none"
         
+        llm_cache = get_llm_cache()
+        cache_key = llm_cache.make_key(
+            f"modification:{search_type}", user_message,
+            {"previous": previous_params, "current": current_params},
+            self._prompt_version(system_prompt)
+        )
+        
         try:
-            # --- ✅ NUEVO: Llamada única al Broker ---
-            logger.info(f"🧠 [Modification] Enviando a Broker...")
-            
-            raw_response = self.broker.generate(
-                messages=messages,
-                temperature=TEMPERATURE,
-                max_tokens=500,
-                timeout=GENERATION_TIMEOUT
-            )
-            
-            llm_time = time.time() - llm_start
+            raw_response = llm_cache.get(cache_key)
             
-            status = self.broker.get_status()
-            llm_used = self._get_last_used_connection(status)
+            if raw_response is not None:
+                llm_time = time.time() - llm_start
+                llm_used = "cache"
+            else:
+                # --- ✅ NUEVO: Llamada única al Broker ---
+                logger.info(f"🧠 [Modification] Enviando a Broker...")
+                
+                raw_response = self.broker.generate(
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=500,
+                    timeout=GENERATION_TIMEOUT
+                )
+                
+                llm_time = time.time() - llm_start
+                
+                status = self.broker.get_status()
+                llm_used = self._get_last_used_connection(status)
             
             # --- ❌ ELIMINADO: Lógica try/except GPU/CPU ---
             
@@ -330,6 +429,8 @@ class SearchEngine:
             # --- 3. Parsear respuesta (sin cambios) ---
             logger.debug(f"[Modification] Respuesta cruda: {raw_response}")
             llm_output = self._extract_json_from_response(raw_response)
+            if llm_used != "cache":
+                llm_cache.set(cache_key, raw_response)
             logger.debug(f"    LLM Output: {json.dumps(llm_output, ensure_ascii=False)}")
             
             # 4. Extraer parámetros (sin cambios)
@@ -364,6 +465,14 @@ class SearchEngine:
                 f"Error Broker: {str(e)}", llm_time
             )
     
+    def _prompt_version(self, system_prompt: str) -> str:
+        """Hash del system prompt + PROMPT_VERSION (parte de la clave del cache)"""
+        return hashlib.sha256(f"{PROMPT_VERSION}:{system_prompt}".encode("utf-8")).hexdigest()[:16]
+    
+    def get_llm_cache_stats(self) -> Dict[str, Any]:
+        """Hits/misses del cache persistente de extracción"""
+        return get_llm_cache().get_stats()
+    
     # ============== BÚSQUEDA DIRECTA (SIN LLM) ==============
     
     def execute_direct(self, search_params: Dict[str, Any], search_type: str) -> Dict[str, Any]:
@@ -407,18 +516,92 @@ class SearchEngine:
                 "total_results": 0
             }
     
+    # ============== BÚSQUEDA ESPECULATIVA ==============
+    
+    def start_speculative_direct(
+        self, 
+        search_params: Dict[str, Any], 
+        search_type: str
+    ) -> Optional[SpeculativeSearch]:
+        """
+        Lanza execute_direct con el pre-análisis en segundo plano, para que
+        la API corra en paralelo al LLM en vez de después.
+        """
+        if not SPECULATIVE_DIRECT_SEARCH:
+            return None
+        
+        params = copy.deepcopy(search_params)
+        try:
+            future = _speculative_executor.submit(self.execute_direct, params, search_type)
+        except RuntimeError as e:
+            logger.warning(f"⚠️ [Speculative] No se pudo lanzar: {e}")
+            return None
+        
+        logger.info("🔮 [Speculative] Búsqueda directa lanzada en paralelo al LLM")
+        return SpeculativeSearch(future=future, params=params, search_type=search_type)
+    
+    def execute_direct_or_reuse(
+        self, 
+        search_params: Dict[str, Any], 
+        search_type: str,
+        speculative: Optional[SpeculativeSearch] = None
+    ) -> Dict[str, Any]:
+        """
+        Si la búsqueda especulativa pidió exactamente lo mismo a la API,
+        reutiliza su resultado; si no, paga solo la segunda llamada.
+        """
+        if speculative is not None:
+            if self._same_api_request(speculative.params, speculative.search_type, search_params, search_type):
+                try:
+                    result = dict(speculative.future.result())
+                    if result.get("success"):
+                        logger.info("🔮 [Speculative] Hit: params finales = pre-análisis, resultado reutilizado")
+                        result["speculative_hit"] = True
+                        return result
+                except Exception as e:
+                    logger.warning(f"⚠️ [Speculative] Falló la búsqueda especulativa: {e}")
+            else:
+                logger.info("🔮 [Speculative] Miss: el LLM cambió los parámetros")
+                speculative.future.cancel()
+        
+        result = self.execute_direct(search_params, search_type)
+        if speculative is not None:
+            result["speculative_hit"] = False
+        return result
+    
+    def _same_api_request(
+        self, 
+        params_a: Dict[str, Any], 
+        type_a: str, 
+        params_b: Dict[str, Any], 
+        type_b: str
+    ) -> bool:
+        """Compara lo que efectivamente se mandaría a la API"""
+        if type_a != type_b:
+            return False
+        
+        action = "search_offers" if type_a == "ofertas" else "search_products"
+        try:
+            api_a = self._transform_params_for_api(params_a, action)
+            api_b = self._transform_params_for_api(params_b, action)
+        except Exception:
+            return False
+        
+        return json.dumps(api_a, sort_keys=True, default=str) == json.dumps(api_b, sort_keys=True, default=str)
+    
     def _fallback_to_direct(
         self, 
         search_params: Dict[str, Any], 
         search_type: str, 
         reason: str, 
-        llm_time: float = 0.0
+        llm_time: float = 0.0,
+        speculative: Optional[SpeculativeSearch] = None
     ) -> Dict[str, Any]:
         """Helper para centralizar el fallback a búsqueda directa."""
         logger.warning(
             f"⚠️ [SearchEngine] Fallback a búsqueda directa. Razón: {reason}"
         )
-        direct_result = self.execute_direct(search_params, search_type)
+        direct_result = self.execute_direct_or_reuse(search_params, search_type, speculative)
         direct_result["llm_time"] = llm_time
         direct_result["llm_used"] = False
         direct_result["fallback_reason"] = reason
@@ -442,21 +625,7 @@ class SearchEngine:
     FORMATO OBLIGATORIO (responde SOLO este JSON):
     {{
         "action": "{action_obligatoria}",
-        "nombre": ["producto1", "producto2"],
-        "proveedor": ["Richmond", "Holliday"],
-        "categoria": ["Antiparasitarios"],
-        "animal": ["perro", "gato"],
-        "sintoma": ["vomitos"],
-        "estado": ["nuevo", "poco_stock"],
-        "descuento_min": 20,
-        "descuento_max": 50,
-        "bonificacion_min": 10,
-        "bonificacion_max": 30,
-        "stock_min": 5,
-        "stock_max": 100,
-        "dosis_gramaje": "500mg",
-        "dosis_volumen": "10ml",
-        "dosis_forma": "comprimidos"
+{textwrap.indent(SEARCH_FILTER_FIELDS, " " * 8)}
     }}
 
     REGLAS CRÍTICAS:
@@ -464,9 +633,7 @@ class SearchEngine:
         Tu JSON DEBE incluir la clave "action" con el valor "{action_obligatoria}".
         NO USES la clave "búsqueda". USA LA CLAVE "action".
 
-    2.  **FORMATO ARRAY OBLIGATORIO**: Los campos 'nombre', 'proveedor', 'categoria', 'animal', 'sintoma', y 'estado' DEBEN ser arrays `[]`.
-        - INCORRECTO: "proveedor": "holliday"
-        - CORRECTO: "proveedor": ["holliday"]
+    2.  **FORMATO ARRAY OBLIGATORIO**: {textwrap.indent(ARRAY_FIELDS_RULE, " " * 8).lstrip()}
 
     3.  **PRE-ANÁLISIS**: El pre-análisis del NLU (que verás en el prompt del usuario) es una *guía*. Úsalo.
         - Si el pre-análisis dice `"descuento_min": 20`, tu JSON debe tener `"descuento_min": 20`.
@@ -475,8 +642,7 @@ class SearchEngine:
     4.  **MENSAJE DEL USUARIO**: Úsalo para encontrar filtros que el NLU omitió (como 'amoxicilina' en "busco amoxicilina para perros").
         
     5.  **REGLA DE ESTADOS vs ACCIÓN (IMPORTANTE):**
-        - Si "action" es "search_products", el ÚNICO estado válido es "en_oferta".
-        - Si "action" es "search_offers", puedes usar: "nuevo", "vistas", "poco_stock", "vence_pronto".
+{textwrap.indent(ESTADO_RULES, " " * 8)}
         - Si el usuario pide "productos nuevos" (y la action es "search_products"), NO uses el filtro de estado, ignóralo.
 
     Responde SOLO el JSON, nada más."""
@@ -846,30 +1012,18 @@ JSON FINAL:"""
     
     def _build_classification_system_prompt(self) -> str:
         """System prompt para clasificar intención."""
-        return """Eres un clasificador de intenciones para un chatbot veterinario.
+        return f"""Eres un clasificador de intenciones para un chatbot veterinario.
 
 Tu tarea: Determinar si el mensaje del usuario es una BÚSQUEDA de productos/ofertas o es CONVERSACIONAL.
 
-BÚSQUEDA incluye:
-- Solicitudes de productos (nombre, categoría, animal, síntoma, dosis)
-- Solicitudes de ofertas, descuentos, promociones
-- Comparaciones de precios, stock
-- Filtros específicos (proveedor, estado, cantidad)
-- Ejemplos: "busco antibióticos para perros", "ofertas con más de 20% descuento", "productos nuevos"
-
-CONVERSACIONAL incluye:
-- Saludos, despedidas, agradecimientos
-- Preguntas sobre el servicio, cómo funciona
-- Quejas, feedback negativo
-- Conversación casual sin intención de búsqueda
-- Ejemplos: "hola", "gracias", "no me sirvió", "¿cómo funciona esto?"
+{CLASSIFICATION_CRITERIA}
 
 FORMATO OBLIGATORIO (responde SOLO este JSON):
-{
+{{
     "is_search": true/false,
     "confidence": 0.0-1.0,
     "reasoning": "breve explicación"
-}"""
+}}"""
 
     def _build_classification_user_prompt(
         self,
@@ -930,6 +1084,138 @@ Clasifica la intención y responde con el JSON."""
                 return {"is_search": False, "confidence": 0.6, "reasoning": "Keyword match (conversational)"}
 
 
+    # ============== ✅ NUEVO: CLASIFICAR + EXTRAER EN UNA LLAMADA ==============
+
+    def classify_and_extract(
+        self,
+        user_message: str,
+        context: Dict[str, Any],
+        search_type: str = "productos"
+    ) -> Dict[str, Any]:
+        """
+        Clasifica el mensaje y, si es búsqueda, extrae los parámetros en la
+        MISMA generación. Reemplaza la secuencia classify_intent ->
+        generación de parámetros -> execute_search (hasta 3 llamadas al LLM):
+        los params devueltos ya están listos para execute_direct.
+        
+        Returns:
+            Dict con success, is_search, confidence, reasoning, search_params,
+            search_type, llm_time, llm_used (y error si falló)
+        """
+        if not self._is_loaded:
+            self.load()
+        
+        result = {
+            "success": False,
+            "is_search": False,
+            "confidence": 0.0,
+            "reasoning": "",
+            "search_params": {},
+            "search_type": search_type,
+            "llm_time": 0.0,
+            "llm_used": "none"
+        }
+        
+        if not self._is_broker_available():
+            logger.warning("⚠️ [ClassifyExtract] No hay LLM (Broker) disponible, asumiendo conversacional")
+            result["reasoning"] = "No LLM (Broker) available"
+            result["error"] = "No LLM (Broker) available"
+            return result
+        
+        llm_start = time.time()
+        
+        messages = [
+            {"role": "system", "content": self._build_classify_extract_system_prompt()},
+            {"role": "user", "content": self._build_classification_user_prompt(user_message, context)}
+        ]
+        
+        try:
+            logger.info(f"🧠 [ClassifyExtract] Clasificando + extrayendo con Broker...")
+            
+            raw_response = self.broker.generate(
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=500,
+                timeout=GENERATION_TIMEOUT
+            )
+            
+            result["llm_time"] = time.time() - llm_start
+            result["llm_used"] = self._get_last_used_connection(self.broker.get_status())
+            
+            if raw_response is None:
+                logger.error("❌ [ClassifyExtract] El Broker retornó None")
+                result["reasoning"] = "No LLM (Broker) responded"
+                result["error"] = "Broker returned None"
+                return result
+            
+            # Clasificación: mismo parser que classify_intent
+            classification = self._parse_classification_response(raw_response)
+            result.update(classification)
+            result["success"] = True
+            
+            if result["is_search"]:
+                try:
+                    llm_output = self._extract_json_from_response(raw_response)
+                except json.JSONDecodeError as e:
+                    # Se clasificó (por keywords) pero no hay params utilizables
+                    result["success"] = False
+                    result["error"] = f"JSON parsing error: {e}"
+                    return result
+                
+                action = llm_output.get("action", "search_offers" if search_type == "ofertas" else "search_products")
+                result["search_type"] = "ofertas" if action == "search_offers" else "productos"
+                result["search_params"] = {
+                    k: v for k, v in llm_output.items()
+                    if k not in ("action", "is_search", "confidence", "reasoning") and v not in (None, "", [])
+                }
+            
+            logger.info(
+                f"✅ [ClassifyExtract] {'BÚSQUEDA' if result['is_search'] else 'CONVERSACIONAL'} "
+                f"(conf: {result['confidence']:.2f}, {result['llm_used'].upper()}, {result['llm_time']:.2f}s) "
+                f"params={json.dumps(result['search_params'], ensure_ascii=False)}"
+            )
+            return result
+        
+        except Exception as e:
+            logger.error(f"❌ [ClassifyExtract] Error: {e}", exc_info=True)
+            result["llm_time"] = time.time() - llm_start
+            result["reasoning"] = f"Error: {str(e)}"
+            result["error"] = str(e)
+            return result
+
+    def _build_classify_extract_system_prompt(self) -> str:
+        """
+        System prompt combinado: clasificación + parámetros de búsqueda.
+        Arma los mismos criterios y reglas de extracción que los prompts separados.
+        """
+        return f"""Eres un clasificador y extractor de búsquedas para un chatbot veterinario.
+
+Tu tarea:
+1. Determinar si el mensaje del usuario es una BÚSQUEDA de productos/ofertas o es CONVERSACIONAL.
+2. Si es BÚSQUEDA, extraer los filtros de búsqueda en el MISMO JSON.
+
+{CLASSIFICATION_CRITERIA}
+
+FORMATO OBLIGATORIO (responde SOLO este JSON):
+{{
+    "is_search": true/false,
+    "confidence": 0.0-1.0,
+    "reasoning": "breve explicación",
+    "action": "search_products" o "search_offers",
+{textwrap.indent(SEARCH_FILTER_FIELDS, " " * 4)}
+}}
+
+REGLAS:
+1. Si es CONVERSACIONAL, responde solo "is_search", "confidence" y "reasoning".
+2. Si es BÚSQUEDA, incluye SOLO los filtros que el usuario mencionó. No inventes valores.
+3. "action" es "search_offers" si pide ofertas, descuentos o promociones; si no, "search_products".
+4. {textwrap.indent(ARRAY_FIELDS_RULE, " " * 3).lstrip()}
+5. Estados según la acción:
+{textwrap.indent(ESTADO_RULES, " " * 3)}
+
+Responde SOLO el JSON, nada más."""
+
+
 # ============== INSTANCIA GLOBAL ==============
 _search_engine = SearchEngine()
 
@@ -0,0 +1,206 @@
+# actions/functions/semantic_cache.py
+"""
+Caché semántico de generaciones para small-talk y off-topic.
+
+Los prompts de saludo/agradecimiento/off-topic cambian solo por el texto del
+usuario ("hola", "holaa", "Hola!!"), así que la clave md5 exacta de
+chat_handler casi nunca pega. Acá el texto se normaliza (sin acentos ni
+signos, alargamientos de 3+ letras acotados a 2, orden de palabras intacto)
+y, si no hay match exacto, solo se acepta un mensaje guardado en el mismo
+scope (intent + plantilla del prompt + contexto) con las mismas palabras en
+el mismo orden, donde lo único que cambia es algún alargamiento de vocal
+("holaa" ~ "hola"). Cambiar una palabra, un número o el orden nunca pega:
+"perro" != "pero", "2022" != "2018", "no me siento bien" != "me siento bien".
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from actions.lookup_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# ============== CONFIGURACIÓN ==============
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))              # segundos
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "128"))
+SEMANTIC_CACHE_MAX_PER_SCOPE = int(os.getenv("SEMANTIC_CACHE_MAX_PER_SCOPE", "64"))
+# Mensajes más largos que esto no son small-talk reutilizable
+SEMANTIC_CACHE_MAX_TEXT_LEN = int(os.getenv("SEMANTIC_CACHE_MAX_TEXT_LEN", "120"))
+# ===========================================
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9 ]+")
+# Solo letras: "2000" o "1000" no se tocan
+_ELONGATION_RE = re.compile(r"([a-z])\1{2,}")
+_RUN_RE = re.compile(r"([a-z0-9])\1*")
+_VOWELS = frozenset("aeiou")
+
+
+def normalize_utterance(text: str) -> str:
+    """'¡Holaaaa, Buenas!' -> 'holaa buenas' (sin acentos/signos, alargamientos de 3+ letras a 2, mismo orden)"""
+    text = _NON_WORD_RE.sub(" ", normalize_text(text or ""))
+    text = _ELONGATION_RE.sub(r"\1\1", text)
+    return " ".join(text.split())
+
+
+def _runs(token: str) -> List[Tuple[str, int]]:
+    return [(match.group(1), len(match.group(0))) for match in _RUN_RE.finditer(token)]
+
+
+def _is_elongation_of(token_a: str, token_b: str) -> bool:
+    """Misma palabra salvo vocales duplicadas ('holaa' ~ 'hola'); 'perro' vs 'pero' no"""
+    if token_a == token_b:
+        return True
+    runs_a, runs_b = _runs(token_a), _runs(token_b)
+    if len(runs_a) != len(runs_b):
+        return False
+    for (char_a, count_a), (char_b, count_b) in zip(runs_a, runs_b):
+        if char_a != char_b or (count_a != count_b and char_a not in _VOWELS):
+            return False
+    return True
+
+
+def same_words(normalized_a: str, normalized_b: str) -> bool:
+    """Mismas palabras en el mismo orden, admitiendo solo alargamientos de vocales"""
+    tokens_a, tokens_b = normalized_a.split(), normalized_b.split()
+    return len(tokens_a) == len(tokens_b) and all(
+        _is_elongation_of(a, b) for a, b in zip(tokens_a, tokens_b)
+    )
+
+
+class _Entry:
+    __slots__ = ("normalized", "response", "expires_at")
+
+    def __init__(self, normalized: str, response: str, expires_at: float):
+        self.normalized = normalized
+        self.response = response
+        self.expires_at = expires_at
+
+
+class SemanticResponseCache:
+    """
+    scope -> {texto normalizado -> _Entry}. LRU en ambos niveles, TTL por
+    entrada, thread-safe. Lookup: match exacto O(1) y si no (y similar=True),
+    la entrada más reciente del scope con las mismas palabras (same_words),
+    a lo sumo SEMANTIC_CACHE_MAX_PER_SCOPE comparaciones.
+    """
+
+    def __init__(self, ttl: float = SEMANTIC_CACHE_TTL,
+                 max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES, max_per_scope: int = SEMANTIC_CACHE_MAX_PER_SCOPE,
+                 enabled: bool = SEMANTIC_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self.max_per_scope = max_per_scope
+        self.enabled = enabled
+        self._scopes: "OrderedDict[str, OrderedDict[str, _Entry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stored": 0, "evictions": 0}
+
+    def _usable(self, text: str) -> Optional[str]:
+        if not self.enabled or not text or len(text) > SEMANTIC_CACHE_MAX_TEXT_LEN:
+            return None
+        return normalize_utterance(text) or None
+
+    def get(self, scope: str, text: str, similar: bool = True) -> Optional[str]:
+        """similar=False: solo match exacto del texto normalizado"""
+        normalized = self._usable(text)
+        if normalized is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if not entries:
+                self._stats["misses"] += 1
+                return None
+            self._scopes.move_to_end(scope)
+
+            for key in [k for k, e in entries.items() if e.expires_at < now]:
+                del entries[key]
+
+            entry = entries.get(normalized)
+            if entry is not None:
+                entries.move_to_end(normalized)
+                self._stats["exact_hits"] += 1
+                return entry.response
+
+            if not similar:
+                self._stats["misses"] += 1
+                return None
+
+            best = next(
+                (candidate for candidate in reversed(entries.values())
+                 if same_words(normalized, candidate.normalized)),
+                None
+            )
+            if best is not None:
+                entries.move_to_end(best.normalized)
+                self._stats["similar_hits"] += 1
+                logger.info(f"[SemanticCache] ✅ '{normalized}' ≈ '{best.normalized}'")
+                return best.response
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, scope: str, text: str, response: str):
+        normalized = self._usable(text)
+        if normalized is None or not response:
+            return
+
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = OrderedDict()
+            self._scopes.move_to_end(scope)
+
+            entries[normalized] = _Entry(normalized, response, time.time() + self.ttl)
+            entries.move_to_end(normalized)
+            self._stats["stored"] += 1
+
+            while len(entries) > self.max_per_scope:
+                entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            while len(self._scopes) > self.max_scopes:
+                _, dropped = self._scopes.popitem(last=False)
+                self._stats["evictions"] += len(dropped)
+
+    def clear(self) -> int:
+        with self._lock:
+            cleared = sum(len(entries) for entries in self._scopes.values())
+            self._scopes.clear()
+        return cleared
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["scopes"] = len(self._scopes)
+            stats["entries"] = sum(len(entries) for entries in self._scopes.values())
+        hits = stats["exact_hits"] + stats["similar_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# ============== INSTANCIA GLOBAL ==============
+_semantic_cache: Optional[SemanticResponseCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticResponseCache:
+    """Obtiene la instancia global del caché semántico"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticResponseCache()
+    return _semantic_cache
+
+
+def get_semantic_cache_stats() -> Dict[str, Any]:
+    return get_semantic_cache().get_stats()
@@ -2,7 +2,7 @@ import logging
 import re
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-from .config import INTENT_CONFIG
+from .config import get_intent_config
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +17,7 @@ ENABLE_MANUAL_SEARCH = False # ✅ DESACTIVAR búsqueda manual (muy lenta)
 
 def get_intent_info(intent_name: str) -> Dict[str, Any]:
     """Obtiene información de configuración para un intent específico"""
-    return INTENT_CONFIG.get("intents", {}).get(intent_name, {})
+    return get_intent_config().get("intents", {}).get(intent_name, {})
 
 def is_search_intent(intent_name: str) -> bool:
     """Determina si un intent es de tipo búsqueda"""
@@ -0,0 +1,200 @@
+# actions/lookup_index.py
+"""
+Índices precomputados sobre las lookup tables.
+
+Las lookup tables son estáticas durante la vida del proceso, así que toda la
+normalización (NFKD + ascii + lower) se hace una sola vez al cargarlas. La
+validación y las sugerencias consultan estas estructuras en lugar de
+re-normalizar ~1.300 valores en cada mensaje. Lo mismo con las features que
+usa el matcher de similitud (forma limpia, soundex, abreviaciones).
+"""
+
+import logging
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX_MAX_LEN = 3   # prefijos indexados: 1..3 caracteres
+NGRAM_SIZE = 3       # trigramas de caracteres
+
+# Abreviaciones médicas/veterinarias y sus expansiones (usadas por el matcher de similitud)
+MEDICAL_PATTERNS: Dict[str, List[str]] = {
+    # Expansiones de abreviaciones
+    'iv': ['intravenoso', 'intravenosa', 'endovenoso'],
+    'im': ['intramuscular', 'via intramuscular'],
+    'po': ['por via oral', 'oral', 'via oral'],
+    'sc': ['subcutaneo', 'subcutánea', 'hipodermico'],
+    'id': ['intradermal', 'intradermico'],
+    'ip': ['intraperitoneal'],
+    'ic': ['intracardaco', 'intracardiaco'],
+    
+    # Unidades de medida
+    'mg': ['miligramo', 'miligramos'],
+    'ml': ['mililitro', 'mililitros'],
+    'kg': ['kilogramo', 'kilogramos'],
+    'gr': ['gramo', 'gramos'],
+    'ui': ['unidad internacional', 'unidades internacionales'],
+    
+    # Términos veterinarios comunes
+    'felv': ['leucemia felina', 'virus leucemia felina'],
+    'fiv': ['inmunodeficiencia felina', 'virus inmunodeficiencia felina'],
+    'pif': ['peritonitis infecciosa felina']
+}
+
+_SOUNDEX_MAPPING = {
+    'B': '1', 'F': '1', 'P': '1', 'V': '1',
+    'C': '2', 'G': '2', 'J': '2', 'K': '2', 'Q': '2', 'S': '2', 'X': '2', 'Z': '2',
+    'D': '3', 'T': '3',
+    'L': '4',
+    'M': '5', 'N': '5',
+    'R': '6'
+}
+
+
+def normalize_text(text: str) -> str:
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("utf-8").lower()
+
+
+def clean_term(term: str) -> str:
+    """Sin acentos ni caracteres no-ascii y con espacios colapsados (conserva mayúsculas)"""
+    if not term:
+        return ""
+    normalized = unicodedata.normalize('NFKD', term).encode('ascii', 'ignore').decode('utf-8')
+    return re.sub(r'\s+', ' ', normalized.strip())
+
+
+def simple_soundex(s: str) -> str:
+    """Soundex simplificado de 4 caracteres"""
+    if not s:
+        return ""
+    
+    s = s.upper()
+    soundex = s[0]
+    
+    for char in s[1:]:
+        if char in _SOUNDEX_MAPPING:
+            code = _SOUNDEX_MAPPING[char]
+            if len(soundex) == 0 or soundex[-1] != code:
+                soundex += code
+        if len(soundex) >= 4:
+            break
+    
+    return soundex.ljust(4, '0')[:4]
+
+
+class TermFeatures(NamedTuple):
+    """Features de un término que el matcher de similitud necesita del lado lookup"""
+    clean: str                    # clean_term
+    lower: str                    # clean.lower()
+    soundex: str                  # simple_soundex(clean)
+    expansions: Tuple[str, ...]   # expansiones si el término es una abreviación conocida
+
+
+def term_features(term: str) -> TermFeatures:
+    clean = clean_term(term)
+    lower = clean.lower()
+    expansions = tuple(expansion.lower() for expansion in MEDICAL_PATTERNS.get(lower, ()))
+    return TermFeatures(clean, lower, simple_soundex(clean), expansions)
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> List[str]:
+    """N-gramas de caracteres con padding (así los bordes también cuentan)"""
+    padded = f" {text} "
+    if len(padded) < n:
+        return [padded]
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class LookupIndex:
+    """
+    Índice inmutable de una categoría de lookup.
+
+    - normalized_set: pertenencia O(1)
+    - norm_to_original: valor normalizado -> valor original (primera aparición)
+    - prefix_index: prefijo normalizado (1..PREFIX_MAX_LEN) -> posiciones
+    - ngram_index: trigrama -> posiciones (generación de candidatos difusos)
+    - features: TermFeatures por posición (scoring de similitud sin recalcular el lado lookup)
+    - abbreviation_positions: posiciones cuyo valor es una abreviación de MEDICAL_PATTERNS
+    """
+
+    __slots__ = (
+        "category", "values", "normalized", "normalized_set",
+        "norm_to_original", "prefix_index", "ngram_index",
+        "features", "abbreviation_positions"
+    )
+
+    def __init__(self, category: str, values: Iterable[str]):
+        self.category = category
+        self.values: Tuple[str, ...] = tuple(values)
+        self.normalized: Tuple[str, ...] = tuple(normalize_text(v) for v in self.values)
+        self.normalized_set: FrozenSet[str] = frozenset(self.normalized)
+
+        norm_to_original: Dict[str, str] = {}
+        prefix_index: Dict[str, List[int]] = {}
+        ngram_index: Dict[str, List[int]] = {}
+
+        for pos, norm in enumerate(self.normalized):
+            norm_to_original.setdefault(norm, self.values[pos])
+
+            for length in range(1, min(PREFIX_MAX_LEN, len(norm)) + 1):
+                prefix_index.setdefault(norm[:length], []).append(pos)
+
+            for gram in set(char_ngrams(norm)):
+                ngram_index.setdefault(gram, []).append(pos)
+
+        self.norm_to_original: Dict[str, str] = norm_to_original
+        self.prefix_index: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in prefix_index.items()}
+        self.ngram_index: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in ngram_index.items()}
+
+        self.features: Tuple[TermFeatures, ...] = tuple(term_features(v) for v in self.values)
+        self.abbreviation_positions: Tuple[int, ...] = tuple(
+            pos for pos, features in enumerate(self.features) if features.expansions
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def contains(self, value: str) -> bool:
+        return normalize_text(value) in self.normalized_set
+
+    def original_for(self, normalized_value: str) -> Optional[str]:
+        return self.norm_to_original.get(normalized_value)
+
+    def with_prefix(self, value: str) -> List[int]:
+        """Posiciones cuyo valor normalizado empieza con el prefijo (hasta PREFIX_MAX_LEN)"""
+        norm = normalize_text(value)
+        if not norm:
+            return []
+        key = norm[:PREFIX_MAX_LEN]
+        positions = self.prefix_index.get(key, ())
+        if len(norm) <= PREFIX_MAX_LEN:
+            return list(positions)
+        return [pos for pos in positions if self.normalized[pos].startswith(norm)]
+
+    def ngram_candidates(self, value: str, limit: int = 200) -> List[int]:
+        """
+        Posiciones ordenadas por cantidad de trigramas compartidos con value.
+        Costo proporcional a las posting lists tocadas, no al tamaño de la tabla.
+        """
+        norm = normalize_text(value)
+        if not norm:
+            return []
+
+        counts: Counter = Counter()
+        for gram in set(char_ngrams(norm)):
+            for pos in self.ngram_index.get(gram, ()):
+                counts[pos] += 1
+
+        return [pos for pos, _ in counts.most_common(limit)]
+
+
+def build_lookup_indexes(lookup_tables: Dict[str, List[str]]) -> Dict[str, LookupIndex]:
+    """Construye un LookupIndex por categoría"""
+    indexes = {category: LookupIndex(category, values) for category, values in lookup_tables.items()}
+    logger.info(f"🗂️ Índices de lookup construidos: {len(indexes)} categorías")
+    return indexes
@@ -1,7 +1,10 @@
 # actions/models/model_manager.py (REFACTORIZADO)
 import logging
+import os
+import threading
 import time
-from typing import Optional, List, Dict
+from enum import Enum
+from typing import Any, Optional, List, Dict
 
 from actions.functions.conections_broker import get_broker
 from actions.functions.search_engine import SearchEngine
@@ -10,9 +13,25 @@ logger = logging.getLogger(__name__)
 
 # ============== CONFIGURACIÓN ==============
 GENERATION_TIMEOUT = 40
+# Inicializar broker + warmup en un hilo aparte: el import de actions.config
+# (y el arranque del action server) no espera a los LLM remotos
+MODELS_BACKGROUND_INIT = os.getenv("MODELS_BACKGROUND_INIT", "true").lower() == "true"
+MODELS_WARMUP = os.getenv("MODELS_WARMUP", "true").lower() == "true"
+# Si la inicialización en background falla se reintenta al próximo uso,
+# con espera exponencial entre intentos (segundos)
+MODELS_INIT_RETRY_BACKOFF = float(os.getenv("MODELS_INIT_RETRY_BACKOFF", "5"))
+MODELS_INIT_RETRY_MAX_BACKOFF = float(os.getenv("MODELS_INIT_RETRY_MAX_BACKOFF", "300"))
 # ===========================================
 
 
+class ModelReadiness(Enum):
+    """Estado de inicialización de los modelos"""
+    COLD = "cold"            # todavía no se inició nada
+    WARMING_UP = "warming_up"  # broker conectando / warmup en curso
+    READY = "ready"          # broker inicializado con al menos una conexión disponible
+    DEGRADED = "degraded"    # inicializado sin conexiones disponibles o con error
+
+
 class ChatModel:
     """
     Modelo conversacional para respuestas generales.
@@ -134,6 +153,13 @@ class ChatModel:
             return {"error": "Broker no cargado"}
         
         return self.broker.get_status()
+    
+    def get_broker_stats(self) -> Dict:
+        """Estadísticas de hedging / single-flight del broker"""
+        if not self._is_loaded:
+            return {"error": "Broker no cargado"}
+        
+        return self.broker.get_traffic_stats()
 
 
 class ModelManager:
@@ -146,6 +172,14 @@ class ModelManager:
         self.chat_model = ChatModel()
         self.search_engine = SearchEngine()
         self._initialized = False
+        self._init_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._readiness = ModelReadiness.COLD
+        self._init_started_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+        self._init_error: Optional[str] = None
+        self._init_failures = 0
+        self._retry_after = 0.0
     
     def initialize(self, warmup: bool = True):
         """Inicializa ambos modelos."""
@@ -153,7 +187,16 @@ class ModelManager:
             logger.info("[ModelManager] Ya inicializado")
             return
         
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._initialize_models(warmup)
+    
+    def _initialize_models(self, warmup: bool):
         total_start = time.time()
+        self._readiness = ModelReadiness.WARMING_UP
+        self._init_started_at = total_start
+        self._init_error = None
         logger.info("=" * 60)
         logger.info("[ModelManager] 🚀 INICIANDO CARGA DE MODELOS")
         logger.info("=" * 60)
@@ -181,6 +224,10 @@ class ModelManager:
             
             total = time.time() - total_start
             self._initialized = True
+            self._ready_at = time.time()
+            self._readiness = (
+                ModelReadiness.READY if self.search_engine._is_broker_available() else ModelReadiness.DEGRADED
+            )
             
             logger.info("=" * 60)
             logger.info(f"[ModelManager] ✅ CARGA COMPLETA en {total:.2f}s")
@@ -192,8 +239,89 @@ class ModelManager:
         except Exception as e:
             logger.error(f"[ModelManager] ❌ Error crítico: {e}", exc_info=True)
             self._initialized = False
+            self._readiness = ModelReadiness.DEGRADED
+            self._init_error = str(e)
             raise
     
+    def start_background_init(self, warmup: bool = MODELS_WARMUP):
+        """
+        Lanza initialize() en un hilo daemon y vuelve enseguida.
+        Mientras tanto ChatModel / SearchEngine cargan el broker al primer uso.
+        """
+        if self._initialized or self._warmup_thread is not None:
+            return
+        if time.time() < self._retry_after:
+            return
+        
+        with self._init_lock:
+            if self._initialized or self._warmup_thread is not None:
+                return
+            self._readiness = ModelReadiness.WARMING_UP
+            self._init_started_at = time.time()
+            self._warmup_thread = threading.Thread(
+                target=self._background_init,
+                args=(warmup,),
+                name="model-warmup",
+                daemon=True
+            )
+            self._warmup_thread.start()
+        
+        logger.info("[ModelManager] 🧵 Inicialización de modelos en background")
+    
+    def _background_init(self, warmup: bool):
+        try:
+            self.initialize(warmup=warmup)
+            self._init_failures = 0
+        except Exception as e:
+            # Liberar el hilo para que _ensure_initializing() pueda reintentar
+            self._init_failures += 1
+            backoff = min(
+                MODELS_INIT_RETRY_BACKOFF * (2 ** (self._init_failures - 1)),
+                MODELS_INIT_RETRY_MAX_BACKOFF
+            )
+            self._retry_after = time.time() + backoff
+            logger.warning(
+                f"[ModelManager] ⚠️ Warm-up en background falló ({self._init_failures}): {e}. "
+                f"Reintento al próximo uso en {backoff:.0f}s"
+            )
+        finally:
+            with self._init_lock:
+                self._warmup_thread = None
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta que termine la inicialización en background (para tests/scripts)"""
+        thread = self._warmup_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._refresh_readiness() == ModelReadiness.READY
+    
+    def _refresh_readiness(self) -> ModelReadiness:
+        """Una vez inicializado, READY/DEGRADED sigue el estado actual del broker"""
+        if self._initialized:
+            try:
+                available = self.search_engine._is_broker_available()
+            except Exception:
+                available = False
+            self._readiness = ModelReadiness.READY if available else ModelReadiness.DEGRADED
+        return self._readiness
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Estado de inicialización para health checks"""
+        init_seconds = None
+        if self._init_started_at:
+            init_seconds = round((self._ready_at or time.time()) - self._init_started_at, 2)
+        readiness = self._refresh_readiness()
+        
+        return {
+            "state": readiness.value,
+            "ready": readiness == ModelReadiness.READY,
+            "initialized": self._initialized,
+            "background": self._warmup_thread is not None,
+            "init_seconds": init_seconds,
+            "init_failures": self._init_failures,
+            "error": self._init_error
+        }
+    
     def _log_broker_status(self):
         """Muestra el estado del broker"""
         try:
@@ -215,22 +343,33 @@ class ModelManager:
     
     def get_chat_model(self) -> ChatModel:
         """Obtiene la instancia de ChatModel, inicializando si es necesario."""
-        if not self._initialized:
-            self.initialize()
+        self._ensure_initializing()
         return self.chat_model
     
     def get_search_engine(self) -> SearchEngine:
         """Obtiene la instancia de SearchEngine, inicializando si es necesario."""
-        if not self._initialized:
-            self.initialize()
+        self._ensure_initializing()
         return self.search_engine
     
+    def _ensure_initializing(self):
+        """En modo background no bloquea: el broker se carga al primer uso o en el hilo de warm-up"""
+        if self._initialized:
+            return
+        if MODELS_BACKGROUND_INIT:
+            self.start_background_init()
+        else:
+            self.initialize()
+    
     def get_broker_status(self) -> Dict:
         """Obtiene el estado del broker (útil para monitoring)"""
         if not self._initialized:
             return {"error": "ModelManager no inicializado"}
         
         return self.chat_model.get_broker_status()
+    
+    def get_broker_stats(self) -> Dict:
+        """Hedging y single-flight del broker (no fuerza la inicialización)"""
+        return self.chat_model.get_broker_stats()
 
 
 # ============== INSTANCIAS GLOBALES ==============
@@ -252,4 +391,12 @@ def get_search_engine() -> SearchEngine:
 
 def get_broker_status() -> Dict:
     """Helper para obtener estado del broker desde cualquier parte"""
-    return _model_manager.get_broker_status()
\ No newline at end of file
+    return _model_manager.get_broker_status()
+
+def get_broker_stats() -> Dict:
+    """Helper para obtener las estadísticas de hedging / single-flight del broker"""
+    return _model_manager.get_broker_stats()
+
+def get_model_readiness() -> Dict[str, Any]:
+    """Estado de inicialización de los modelos (cold / warming_up / ready / degraded)"""
+    return _model_manager.get_readiness()
\ No newline at end of file
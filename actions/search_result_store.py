@@ -0,0 +1,222 @@
+# actions/search_result_store.py
+"""
+Resultados de búsqueda paginados del lado del action server.
+
+En lugar de mandar todos los productos/ofertas en el custom payload
+(action server -> Rasa -> bot/main.py -> Flutter), se guarda el resultado
+completo bajo un handle y se envía solo la primera página con los totales.
+Las páginas siguientes se piden con el handle (action_pagina_resultados_busqueda,
+expuesta por bot/main.py en GET /search_results/{handle}).
+
+Los handles viven en SQLite (SEARCH_RESULTS_STORE_PATH) y no en memoria del
+proceso: la página 2 puede caer en otro worker del action server que el que
+hizo la búsqueda. Con varias réplicas el archivo tiene que estar en un volumen
+compartido (en docker-compose, actions/.cache ya lo está vía ./actions).
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============== CONFIGURACIÓN ==============
+SEARCH_RESULTS_PAGINATION = os.getenv("SEARCH_RESULTS_PAGINATION", "false").lower() == "true"
+SEARCH_RESULTS_PAGE_SIZE = int(os.getenv("SEARCH_RESULTS_PAGE_SIZE", "20"))
+SEARCH_RESULTS_HANDLE_TTL = float(os.getenv("SEARCH_RESULTS_HANDLE_TTL", "1800"))  # segundos
+SEARCH_RESULTS_MAX_HANDLES = int(os.getenv("SEARCH_RESULTS_MAX_HANDLES", "500"))
+# Compartido entre workers/réplicas: con varias réplicas tiene que estar en un volumen común
+SEARCH_RESULTS_STORE_PATH = os.getenv(
+    "SEARCH_RESULTS_STORE_PATH",
+    os.path.join(BASE_DIR, ".cache", "search_results.sqlite3")
+)
+# ===========================================
+
+
+class SearchResultStore:
+    """
+    Handles de resultados en SQLite (WAL, TTL + LRU por último acceso), así
+    cualquier worker del action server puede servir las páginas de un handle
+    creado por otro. Cada handle queda asociado al sender_id que hizo la
+    búsqueda. Si el archivo no se puede abrir, la paginación se apaga y se
+    manda el resultado completo (nunca un handle que otro proceso no vea).
+    """
+
+    def __init__(self, page_size: int = SEARCH_RESULTS_PAGE_SIZE, ttl: float = SEARCH_RESULTS_HANDLE_TTL,
+                 max_handles: int = SEARCH_RESULTS_MAX_HANDLES, enabled: bool = SEARCH_RESULTS_PAGINATION,
+                 path: str = SEARCH_RESULTS_STORE_PATH):
+        self.page_size = max(1, page_size)
+        self.ttl = ttl
+        self.max_handles = max_handles
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"stored": 0, "page_hits": 0, "page_misses": 0, "evictions": 0}
+
+        if self.enabled:
+            self._open()
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                " handle TEXT PRIMARY KEY,"
+                " sender_id TEXT,"
+                " search_type TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_results_access ON search_results(last_access)"
+            )
+            self._conn.commit()
+            logger.info(f"📄 [SearchResultStore] Handles compartidos en {self.path}")
+        except Exception as e:
+            logger.warning(f"⚠️ [SearchResultStore] No se pudo abrir el store ({e}), paginación deshabilitada")
+            self._conn = None
+            self.enabled = False
+
+    def paginate(self, search_results: Dict[str, Any], search_type: str,
+                 sender_id: Optional[str]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Devuelve (search_results de la página 1, info de paginación). Si la
+        paginación está apagada, todo entra en una página o no se pudo
+        guardar el handle, devuelve el resultado sin tocar y None.
+        """
+        results = search_results.get('results') or []
+        if not self.enabled or self._conn is None or len(results) <= self.page_size:
+            return search_results, None
+
+        handle = uuid.uuid4().hex
+        now = time.time()
+        try:
+            payload = json.dumps(search_results, ensure_ascii=False, default=str)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO search_results (handle, sender_id, search_type, payload, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (handle, sender_id, search_type, payload, now, now)
+                )
+                self._stats["stored"] += 1
+                self._evict_if_needed()
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ [SearchResultStore] No se pudo guardar el handle ({e}), se envía todo")
+            return search_results, None
+
+        logger.info(f"📄 [SearchResultStore] {len(results)} resultados guardados en {handle[:8]} "
+                    f"(página de {self.page_size})")
+        return self._page(search_results, handle, 1)
+
+    def get_page(self, handle: str, page: int,
+                 sender_id: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """(search_type, search_results de la página, paginación) o None si el handle no existe o venció"""
+        if self._conn is None:
+            return None
+
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT sender_id, search_type, payload, created_at FROM search_results WHERE handle = ?",
+                    (handle,)
+                ).fetchone()
+                if row is not None and now - row[3] > self.ttl:
+                    self._conn.execute("DELETE FROM search_results WHERE handle = ?", (handle,))
+                    self._conn.commit()
+                    row = None
+                if row is None or (sender_id and row[0] and row[0] != sender_id):
+                    self._stats["page_misses"] += 1
+                    return None
+                self._conn.execute("UPDATE search_results SET last_access = ? WHERE handle = ?", (now, handle))
+                self._conn.commit()
+                self._stats["page_hits"] += 1
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [SearchResultStore] Error leyendo el handle {handle[:8]}: {e}")
+            return None
+
+        _, search_type, payload, _ = row
+        page_results, pagination = self._page(json.loads(payload), handle, page)
+        return search_type, page_results, pagination
+
+    def _evict_if_needed(self):
+        """Borra vencidos y, si sigue excedido, los menos usados recientemente"""
+        self._conn.execute("DELETE FROM search_results WHERE created_at < ?", (time.time() - self.ttl,))
+
+        total = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+        if total <= self.max_handles:
+            return
+
+        to_delete = total - self.max_handles
+        self._conn.execute(
+            "DELETE FROM search_results WHERE handle IN "
+            "(SELECT handle FROM search_results ORDER BY last_access ASC, rowid ASC LIMIT ?)",
+            (to_delete,)
+        )
+        self._stats["evictions"] += to_delete
+
+    def _page(self, search_results: Dict[str, Any], handle: str,
+              page: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        results = search_results.get('results') or []
+        total_pages = max(1, math.ceil(len(results) / self.page_size))
+        page = min(max(1, page), total_pages)
+        start = (page - 1) * self.page_size
+
+        page_results = dict(search_results)
+        page_results['results'] = results[start:start + self.page_size]
+        page_results['returned_results'] = len(page_results['results'])
+
+        pagination = {
+            "handle": handle,
+            "page": page,
+            "page_size": self.page_size,
+            "total_pages": total_pages,
+            "total_available": len(results),
+            "has_more": page < total_pages
+        }
+        return page_results, pagination
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["handles"] = 0
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    stats["handles"] = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        stats["enabled"] = self.enabled
+        stats["page_size"] = self.page_size
+        return stats
+
+
+# ============== INSTANCIA GLOBAL ==============
+_search_result_store: Optional[SearchResultStore] = None
+_search_result_store_lock = threading.Lock()
+
+
+def get_search_result_store() -> SearchResultStore:
+    """Obtiene la instancia global del store de resultados paginados"""
+    global _search_result_store
+    if _search_result_store is None:
+        with _search_result_store_lock:
+            if _search_result_store is None:
+                _search_result_store = SearchResultStore()
+    return _search_result_store
+
+
+def get_search_result_store_stats() -> Dict[str, Any]:
+    return get_search_result_store().get_stats()
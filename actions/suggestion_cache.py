@@ -0,0 +1,124 @@
+# actions/suggestion_cache.py
+"""
+Cache LRU + TTL compartido para el pipeline de sugerencias de entidades.
+
+Los usuarios repiten los mismos errores de tipeo ("bravekto" por "bravecto"),
+así que SuggestionManager.find_similar_terms y get_entity_suggestions guardan
+su resultado por (namespace, entidad, input normalizado). El cache se invalida
+cada vez que se recargan las lookup tables.
+"""
+
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from actions.lookup_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# ============== CONFIGURACIÓN ==============
+SUGGESTION_CACHE_ENABLED = os.getenv("SUGGESTION_CACHE_ENABLED", "true").lower() == "true"
+SUGGESTION_CACHE_MAX_ENTRIES = int(os.getenv("SUGGESTION_CACHE_MAX_ENTRIES", "2048"))
+SUGGESTION_CACHE_TTL = float(os.getenv("SUGGESTION_CACHE_TTL", "3600"))  # segundos
+# ===========================================
+
+
+def normalize_suggestion_input(value: str) -> str:
+    """Sin acentos, minúsculas y espacios colapsados"""
+    return re.sub(r"\s+", " ", normalize_text(value or "").strip())
+
+
+class SuggestionCache:
+    """
+    Cache en memoria thread-safe. Cada invalidación incrementa `generation`;
+    un cálculo que empezó antes de una invalidación no se guarda.
+    """
+
+    def __init__(self, max_entries: int = SUGGESTION_CACHE_MAX_ENTRIES,
+                 ttl: float = SUGGESTION_CACHE_TTL, enabled: bool = SUGGESTION_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.generation = 0
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(namespace: str, entity_type: str, value: str, *extra: Hashable) -> Tuple[Hashable, ...]:
+        return (namespace, entity_type or "", normalize_suggestion_input(value)) + extra
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        """Devuelve una copia del valor cacheado o lo calcula y lo guarda"""
+        if not self.enabled:
+            return compute()
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            generation = self.generation
+
+        value = compute()
+
+        with self._lock:
+            if generation == self.generation:
+                self._entries[key] = (time.time(), copy.deepcopy(value))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+
+        return value
+
+    def invalidate(self, reason: str = ""):
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.generation += 1
+            self._stats["invalidations"] += 1
+        if dropped:
+            logger.info(f"🧹 [SuggestionCache] {dropped} entradas invalidadas{f' ({reason})' if reason else ''}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        return stats
+
+
+# ============== INSTANCIA GLOBAL ==============
+_suggestion_cache: Optional[SuggestionCache] = None
+_suggestion_cache_lock = threading.Lock()
+
+
+def get_suggestion_cache() -> SuggestionCache:
+    """Obtiene la instancia global del cache de sugerencias"""
+    global _suggestion_cache
+    if _suggestion_cache is None:
+        with _suggestion_cache_lock:
+            if _suggestion_cache is None:
+                _suggestion_cache = SuggestionCache()
+    return _suggestion_cache
+
+
+def get_suggestion_cache_stats() -> Dict[str, Any]:
+    return get_suggestion_cache().get_stats()
@@ -17,6 +17,8 @@ import glob
 ACTION_SERVER_URL = os.getenv("ACTION_SERVER_URL", "http://localhost:5055/webhook")
 MODEL_FOLDER = os.getenv("RASA_MODEL_PATH", "models")
 PORT = int(os.getenv("PORT", 8000))
+SEARCH_PAGE_TIMEOUT = int(os.getenv("SEARCH_PAGE_TIMEOUT", 10))
+SEARCH_PAGE_ACTION = "action_pagina_resultados_busqueda"
 
 print(f"🚀 Configuración:")
 print(f"   - Action Server: {ACTION_SERVER_URL}")
@@ -301,6 +303,47 @@ async def get_tracker(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.get("/search_results/{handle}")
+async def get_search_results_page(handle: str, user_id: str = "default_user", page: int = 1):
+    """
+    Devuelve una página de un resultado de búsqueda paginado.
+    El resultado completo vive en el action server (custom['pagination']['handle']);
+    se pide directo al webhook de acciones, sin pasar por el NLU ni el tracker.
+    """
+    if page < 1:
+        raise HTTPException(status_code=400, detail="page must be >= 1")
+
+    payload = {
+        "next_action": SEARCH_PAGE_ACTION,
+        "sender_id": user_id,
+        "tracker": {
+            "sender_id": user_id,
+            "slots": {},
+            "latest_message": {"metadata": {"handle": handle, "page": page}},
+            "events": []
+        },
+        "domain": {}
+    }
+
+    try:
+        result = await asyncio.wait_for(
+            EndpointConfig(url=ACTION_SERVER_URL).request(json=payload, method="post"),
+            timeout=SEARCH_PAGE_TIMEOUT
+        )
+    except Exception as e:
+        print(f"❌ Error pidiendo página {page} de {handle}: {e}")
+        raise HTTPException(status_code=502, detail=f"Action server error: {e}")
+
+    custom = next(
+        (r.get("custom") for r in (result or {}).get("responses", []) if r.get("custom")),
+        None
+    )
+    if not custom or custom.get("error"):
+        raise HTTPException(status_code=404, detail=f"Search results '{handle}' not found or expired")
+
+    print(f"📄 Página {custom['pagination']['page']}/{custom['pagination']['total_pages']} de {handle} enviada")
+    return custom
+
 @app.post("/message", response_model=ChatResponse)
 async def chat(payload: ChatRequest):
     """
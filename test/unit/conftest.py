@@ -0,0 +1,12 @@
+# test/unit/conftest.py
+"""
+Tests unitarios de las piezas puras del action server (caches, breaker,
+scoring). A diferencia de test/cases, no necesitan el bot corriendo:
+  python -m pytest test/unit
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
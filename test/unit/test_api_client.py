@@ -0,0 +1,91 @@
+# test/unit/test_api_client.py
+import pytest
+import requests
+
+from actions import api_client
+from actions.api_client import PooledAPIClient
+
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+def _client(monkeypatch, outcomes):
+    """Cliente cuyo session.get devuelve/lanza los outcomes en orden"""
+    monkeypatch.setattr(api_client.time, "sleep", lambda _: None)
+    client = PooledAPIClient()
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _FakeResponse(outcome)
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    return client, calls
+
+
+def test_read_timeout_is_not_retried(monkeypatch):
+    client, calls = _client(monkeypatch, [requests.exceptions.ReadTimeout(), 200])
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get("http://api/", {})
+    assert len(calls) == 1
+    assert client.get_stats()["failures"] == 1
+
+
+def test_connect_errors_and_5xx_are_retried(monkeypatch):
+    client, calls = _client(monkeypatch, [requests.exceptions.ConnectTimeout(), 503, 200])
+
+    assert client.get("http://api/", {}).status_code == 200
+    assert len(calls) == 3
+
+
+def test_retries_stop_at_total_deadline(monkeypatch):
+    monkeypatch.setattr(api_client, "API_RETRY_MAX_TOTAL", 0)
+    client, calls = _client(monkeypatch, [503, 200])
+
+    assert client.get("http://api/", {}, timeout=0.5).status_code == 503
+    assert len(calls) == 1
+    assert client.get_stats()["retries_expired"] == 1
+
+
+@pytest.mark.parametrize("a, b", [
+    ("7790001234567", "7790001234568"),
+    (7790001234567, 7790001234568),
+    (1234567, 1234568),
+    ("1234567", "1234568"),
+    (0.1, 0.10000001),
+])
+def test_canonical_scalar_never_merges_distinct_numbers(a, b):
+    assert api_client._canonical_scalar(a) != api_client._canonical_scalar(b)
+
+
+@pytest.mark.parametrize("values, expected", [
+    ((20, 20.0, "20", " 20.0 "), "20"),
+    ((0.5, "0.50", ".5"), "0.5"),
+    ((7790001234567, "7790001234567", 7790001234567.0), "7790001234567"),
+    ((True, "TRUE"), "true"),
+])
+def test_canonical_scalar_equivalences(values, expected):
+    assert {api_client._canonical_scalar(v) for v in values} == {expected}
+
+
+@pytest.mark.parametrize("code", ["007", "0779000123", "1e3", "A-12", "12 mg"])
+def test_canonical_scalar_keeps_codes_as_text(code):
+    assert api_client._canonical_scalar(code) == code.lower()
+
+
+def test_canonicalize_api_params_distinguishes_long_codes():
+    first = api_client.canonicalize_api_params({"producto_1": "7790001234567", "cantidad": 20})
+    second = api_client.canonicalize_api_params({"producto_1": "7790001234568", "cantidad": "20.0"})
+    same = api_client.canonicalize_api_params({"cantidad": "20", "producto_1": " 7790001234567 "})
+
+    assert first != second
+    assert first == same
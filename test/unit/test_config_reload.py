@@ -0,0 +1,59 @@
+# test/unit/test_config_reload.py
+import shutil
+from pathlib import Path
+
+import pytest
+
+from actions import config
+
+DATA_DIR = Path(config.__file__).parent / "data"
+
+
+@pytest.fixture
+def reload_sources(tmp_path, monkeypatch):
+    domain = tmp_path / "domain.yml"
+    lookups = tmp_path / "lookup_tables.yml"
+    shutil.copy(DATA_DIR / "domain.yml", domain)
+    shutil.copy(DATA_DIR / "lookup_tables.yml", lookups)
+    monkeypatch.setenv("RASA_DOMAIN_PATH", str(domain))
+    monkeypatch.setenv("RASA_LOOKUP_PATH", str(lookups))
+    yield domain, lookups
+    monkeypatch.undo()
+    config.reload_configuration("restaurar tests")
+
+
+def test_reload_publishes_a_new_snapshot_without_touching_the_old_one(reload_sources):
+    _, lookups = reload_sources
+    before = config.config_manager._state
+    assert not config.validate_entity_value("producto", "Productonuevo")
+
+    text = lookups.read_text(encoding="utf-8")
+    lookups.write_text(text.replace("    - Acedan\n", "    - Acedan\n    - Productonuevo\n", 1), encoding="utf-8")
+
+    assert config.reload_configuration("test")
+    after = config.config_manager._state
+
+    assert after is not before
+    assert "Productonuevo" in after.lookup_tables["producto"]
+    assert "Productonuevo" not in before.lookup_tables["producto"]
+    assert len(before.lookup_index["producto"]) == len(before.lookup_tables["producto"])
+    assert config.validate_entity_value("producto", "Productonuevo")
+    assert config.LOOKUP_TABLES is after.lookup_tables
+
+
+def test_reload_keeps_load_timings_in_health(reload_sources):
+    assert config.reload_configuration("test")
+    health = config.config_manager.get_health_status()
+
+    assert health["domain_loaded"] and health["lookup_tables_loaded"]
+    assert "config_load_ms" in health
+    assert "config_snapshot" in health
+    assert health["last_reload"]["reason"] == "test"
+
+
+def test_index_is_built_from_the_snapshot_it_was_asked_for():
+    state = config.ConfigState(lookup_tables={"animal": ["Perro", "Gato"]})
+    index = config.DomainBasedConfigurationManager._get_or_build_index(state, "animal")
+
+    assert index.contains("perro")
+    assert state.lookup_index == {}   # el snapshot publicado no se modifica
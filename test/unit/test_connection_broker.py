@@ -0,0 +1,189 @@
+# test/unit/test_connection_broker.py
+import asyncio
+
+import pytest
+
+from actions.functions import conections_broker
+from actions.functions.conections_broker import (
+    CircuitState, ConnectionBroker, ConnectionConfig, ConnectionType
+)
+
+MESSAGES = [{"role": "user", "content": "bravecto"}]
+
+
+def test_flight_key_separates_timeout_and_mode():
+    key = ConnectionBroker._flight_key
+    base = key(MESSAGES, 0.3, 100, 30)
+
+    assert base == key(MESSAGES, 0.3, 100, 30)
+    assert base != key(MESSAGES, 0.3, 100, 5)
+    assert base != key(MESSAGES, 0.3, 100, 30, "hedged:90")
+    assert key(MESSAGES, 0.3, 100, 30, "hedged:90") != key(MESSAGES, 0.3, 100, 30, "hedged:50")
+
+
+def test_single_flight_coalesces_identical_calls():
+    broker = ConnectionBroker()
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        same = ConnectionBroker._flight_key(MESSAGES, 0.3, 100, 30)
+        other = ConnectionBroker._flight_key(MESSAGES, 0.3, 100, 5)
+        return await asyncio.gather(
+            broker._single_flight(same, factory),
+            broker._single_flight(same, factory),
+            broker._single_flight(other, factory),
+        )
+
+    assert asyncio.run(scenario()) == ["ok", "ok", "ok"]
+    assert len(calls) == 2
+    assert broker.get_flight_stats()["coalesced"] == 1
+
+
+def test_traffic_stats_are_exposed_apart_from_connections(monkeypatch):
+    broker, _, _ = _routing_broker(monkeypatch)
+    stats = broker.get_traffic_stats()
+
+    assert stats["hedging"]["calls"] == 0
+    assert stats["single_flight"]["in_flight"] == 0
+    # get_status() sigue siendo solo conexiones (los llamadores lo recorren así)
+    assert all("available" in conn for conn in broker.get_status().values())
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """Broker + conexión disponible con un reloj controlado por el test"""
+    now = [1000.0]
+    monkeypatch.setattr(conections_broker.time, "time", lambda: now[0])
+    config = ConnectionConfig(conn_type=ConnectionType.OLLAMA_CPU, priority=1, available=True)
+    return ConnectionBroker(), config, now
+
+
+def test_breaker_opens_after_consecutive_failures(breaker):
+    broker, config, _ = breaker
+    for _ in range(conections_broker.CB_FAILURE_THRESHOLD - 1):
+        broker._record_failure(config, "timeout")
+        assert config.circuit_state == CircuitState.CLOSED
+        assert broker._allow_request(config)
+
+    broker._record_failure(config, "timeout")
+    assert config.circuit_state == CircuitState.OPEN
+    assert not broker._allow_request(config)
+
+
+def test_success_resets_failure_count(breaker):
+    broker, config, _ = breaker
+    broker._record_failure(config, "timeout")
+    broker._record_success(config)
+    for _ in range(conections_broker.CB_FAILURE_THRESHOLD - 1):
+        broker._record_failure(config, "timeout")
+
+    assert config.circuit_state == CircuitState.CLOSED
+
+
+def test_fatal_failure_opens_immediately(breaker):
+    broker, config, _ = breaker
+    broker._record_failure(config, "401", fatal=True)
+
+    assert config.circuit_state == CircuitState.OPEN
+    assert config.times_opened == 1
+
+
+def test_half_open_allows_a_single_trial_after_cooldown(breaker):
+    broker, config, now = breaker
+    broker._open_circuit(config, "caída")
+
+    now[0] += conections_broker.CB_COOLDOWN - 1
+    assert not broker._allow_request(config)
+
+    now[0] += 2
+    assert broker._allow_request(config)
+    assert config.circuit_state == CircuitState.HALF_OPEN
+    assert not broker._allow_request(config)   # la prueba sigue en vuelo
+
+    broker._record_success(config)
+    assert config.circuit_state == CircuitState.CLOSED
+    assert config.available and broker._allow_request(config)
+
+
+def test_half_open_failure_reopens(breaker):
+    broker, config, now = breaker
+    broker._open_circuit(config, "caída")
+    now[0] += conections_broker.CB_COOLDOWN + 1
+    assert broker._allow_request(config)
+
+    broker._record_failure(config, "sigue caída")
+    assert config.circuit_state == CircuitState.OPEN
+    assert config.opened_at == now[0]
+    assert config.times_opened == 2
+    assert not broker._allow_request(config)
+
+
+def _routing_broker(monkeypatch):
+    monkeypatch.setattr(conections_broker, "ROUTING_MODE", "latency")
+    broker = ConnectionBroker()
+    fast = ConnectionConfig(conn_type=ConnectionType.OLLAMA_GPU, priority=1, available=True)
+    slow = ConnectionConfig(conn_type=ConnectionType.OLLAMA_CPU, priority=2, available=True)
+    broker.connections = {fast.conn_type: fast, slow.conn_type: slow}
+    return broker, fast, slow
+
+
+def test_unsampled_failing_backend_loses_to_sampled_one(monkeypatch):
+    broker, fast, slow = _routing_broker(monkeypatch)
+    broker._record_latency(slow, 4.0, 100)
+    for _ in range(2):
+        fast.total_failures += 1
+        broker._record_error_outcome(fast)
+
+    prior = broker._expected_time(fast, 100)
+    assert prior > conections_broker.HEDGE_DEFAULT_BUDGET
+    assert broker._rank_connections(100) == [slow, fast]
+
+
+def test_stale_slow_backend_is_not_promoted_for_user_traffic(monkeypatch):
+    broker, fast, slow = _routing_broker(monkeypatch)
+    broker._record_latency(fast, 1.0, 100)
+    broker._record_latency(slow, 40.0, 100)
+    slow.last_used = 0.0   # hace mucho que no recibe tráfico
+
+    assert broker._rank_connections(100) == [fast, slow]
+
+
+def test_prober_explores_stale_backends_once_per_window(monkeypatch):
+    broker, fast, slow = _routing_broker(monkeypatch)
+    broker.ollama_cpu_client = object()
+    explored = []
+
+    async def fake_explore(config):
+        explored.append(config.conn_type)
+
+    monkeypatch.setattr(broker, "_explore_connection", fake_explore)
+
+    async def scenario():
+        broker._maybe_explore(slow)
+        broker._maybe_explore(slow)
+        broker._maybe_explore(fast)   # sin cliente configurado: no se sondea
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert explored == [ConnectionType.OLLAMA_CPU]
+
+
+def test_sync_wait_is_bounded_and_cancels_the_coroutine():
+    broker = ConnectionBroker()
+    broker.connections = {}
+    started = []
+
+    async def stuck():
+        started.append(1)
+        await asyncio.sleep(60)
+
+    future = asyncio.run_coroutine_threadsafe(stuck(), broker._get_loop())
+    assert broker._wait_sync(future, 0.2) is None
+    assert future.cancelled()
+    assert started
+    broker.close()
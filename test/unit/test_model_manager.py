@@ -0,0 +1,60 @@
+# test/unit/test_model_manager.py
+from actions.models import model_manager
+from actions.models.model_manager import ModelManager, ModelReadiness
+
+
+class _FakeBroker:
+    def __init__(self, available=True):
+        self.available = available
+
+    def get_status(self):
+        return {"ollama_gpu": {"available": self.available, "priority": 1}}
+
+
+def _manager(monkeypatch, outcomes):
+    """Manager cuyo SearchEngine.load falla/carga según los outcomes en orden"""
+    manager = ModelManager()
+    broker = _FakeBroker()
+
+    def fake_load():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        manager.search_engine.broker = broker
+
+    monkeypatch.setattr(manager.chat_model, "load", lambda: None)
+    monkeypatch.setattr(manager.search_engine, "load", fake_load)
+    return manager, broker
+
+
+def test_failed_background_init_is_retried_after_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_manager.time, "time", lambda: now[0])
+    manager, _ = _manager(monkeypatch, [RuntimeError("sin broker"), None])
+
+    manager.start_background_init(warmup=False)
+    assert not manager.wait_until_ready(timeout=5)
+    readiness = manager.get_readiness()
+    assert readiness["state"] == "degraded"
+    assert readiness["background"] is False
+    assert readiness["init_failures"] == 1
+
+    manager.start_background_init(warmup=False)   # todavía en backoff
+    assert manager._warmup_thread is None
+
+    now[0] += model_manager.MODELS_INIT_RETRY_BACKOFF
+    manager.start_background_init(warmup=False)
+    assert manager.wait_until_ready(timeout=5)
+    assert manager.get_readiness()["init_failures"] == 0
+
+
+def test_readiness_follows_the_broker_after_init(monkeypatch):
+    manager, broker = _manager(monkeypatch, [None])
+    manager.initialize(warmup=False)
+    assert manager.get_readiness()["state"] == ModelReadiness.READY.value
+
+    broker.available = False
+    assert manager.get_readiness()["state"] == ModelReadiness.DEGRADED.value
+
+    broker.available = True
+    assert manager.get_readiness()["ready"] is True
@@ -0,0 +1,56 @@
+# test/unit/test_response_cache.py
+from actions.functions import chat_handler
+from actions.functions.chat_handler import ResponseCache
+
+
+def test_get_refreshes_recency_and_lru_evicts_oldest():
+    cache = ResponseCache(max_size=2, ttl=60, max_bytes=10_000)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"     # "b" pasa a ser el menos usado
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_with_default_and_per_entry_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(chat_handler.time, "time", lambda: now[0])
+    cache = ResponseCache(max_size=10, ttl=10, max_bytes=10_000)
+    cache.set("default", "x")
+    cache.set("short", "y", ttl=2)
+
+    now[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == "x"
+    now[0] += 6
+    assert cache.get("default") is None
+    assert cache.get_stats()["expired"] == 2
+    assert len(cache) == 0
+
+
+def test_memory_cap_evicts_and_skips_oversized_values():
+    cache = ResponseCache(max_size=100, ttl=60, max_bytes=20)
+    cache.set("k1", "a" * 8)          # 10 bytes
+    cache.set("k2", "b" * 8)          # 20 bytes en total
+    cache.set("k3", "c" * 8)          # desaloja k1
+    cache.set("big", "z" * 50)        # más grande que todo el caché: no entra
+
+    assert cache.get("k1") is None
+    assert cache.get("k3") == "c" * 8
+    assert cache.get("big") is None
+    assert cache.get_stats()["memory_bytes"] == 20
+
+
+def test_overwrite_replaces_size_and_clear_resets():
+    cache = ResponseCache(max_size=10, ttl=60, max_bytes=1000)
+    cache.set("k", "ñandú")
+    cache.set("k", "ok")
+
+    assert cache.get("k") == "ok"
+    assert cache.get_stats()["memory_bytes"] == len("k") + 2
+    assert cache.clear() == 1
+    assert cache.get_stats()["memory_bytes"] == 0
@@ -0,0 +1,53 @@
+# test/unit/test_runpod_client.py
+import asyncio
+
+import httpx
+
+from actions.functions.conections_broker import RunPodClient
+
+
+def _mock_http(calls, status="IN_PROGRESS"):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path))
+        path = request.url.path
+        if path.endswith("/run") or path.endswith("/runsync"):
+            return httpx.Response(200, json={"id": "job-1", "status": "IN_QUEUE"})
+        if "/status/" in path:
+            return httpx.Response(200, json={"id": "job-1", "status": status})
+        return httpx.Response(200, json={})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_cancellable_job_submits_through_run_and_is_cancelled():
+    calls = []
+    client = RunPodClient("endpoint", "key")
+
+    async def scenario():
+        http = _mock_http(calls)
+        task = asyncio.ensure_future(client.arun_job(http, [{"role": "user", "content": "hola"}], cancellable=True))
+        await asyncio.sleep(0.4)  # ya en polling
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.05)  # el cancel corre desacoplado
+        await http.aclose()
+
+    asyncio.run(scenario())
+
+    assert calls[0] == ("POST", "/v2/endpoint/run")
+    assert ("POST", "/v2/endpoint/cancel/job-1") in calls
+
+
+def test_completed_job_returns_text():
+    client = RunPodClient("endpoint", "key")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "COMPLETED", "output": [{"choices": [{"text": " hola "}]}]})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            return await client.arun_job(http, [{"role": "user", "content": "hola"}])
+
+    assert asyncio.run(scenario()) == "hola"
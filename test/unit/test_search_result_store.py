@@ -0,0 +1,49 @@
+# test/unit/test_search_result_store.py
+from actions.search_result_store import SearchResultStore
+
+
+def _results(n):
+    return {"results": [{"id": i} for i in range(n)], "total_results": n}
+
+
+def _store(tmp_path, **kwargs):
+    kwargs.setdefault("page_size", 10)
+    return SearchResultStore(enabled=True, path=str(tmp_path / "search_results.sqlite3"), **kwargs)
+
+
+def test_handle_is_visible_from_another_worker(tmp_path):
+    worker_a, worker_b = _store(tmp_path), _store(tmp_path)
+
+    first_page, pagination = worker_a.paginate(_results(25), "productos", "user-1")
+    assert [r["id"] for r in first_page["results"]] == list(range(10))
+    assert pagination["total_pages"] == 3
+
+    search_type, page, info = worker_b.get_page(pagination["handle"], 3, "user-1")
+    assert search_type == "productos"
+    assert [r["id"] for r in page["results"]] == list(range(20, 25))
+    assert info["has_more"] is False
+
+
+def test_handle_is_bound_to_sender_and_expires(tmp_path):
+    store = _store(tmp_path, ttl=0)
+    _, pagination = store.paginate(_results(15), "ofertas", "user-1")
+
+    assert store.get_page(pagination["handle"], 2, "user-2") is None
+    assert store.get_page(pagination["handle"], 2, "user-1") is None  # ttl=0: ya venció
+
+
+def test_small_results_and_disabled_store_are_untouched(tmp_path):
+    results = _results(5)
+    assert _store(tmp_path).paginate(results, "productos", "u") == (results, None)
+
+    disabled = SearchResultStore(enabled=False, path=str(tmp_path / "off.sqlite3"))
+    assert disabled.paginate(_results(50), "productos", "u")[1] is None
+
+
+def test_oldest_handles_are_evicted(tmp_path):
+    store = _store(tmp_path, max_handles=2)
+    handles = [store.paginate(_results(15), "productos", "u")[1]["handle"] for _ in range(3)]
+
+    assert store.get_page(handles[0], 1, "u") is None
+    assert store.get_page(handles[2], 1, "u") is not None
+    assert store.get_stats()["handles"] == 2
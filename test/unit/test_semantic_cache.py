@@ -0,0 +1,141 @@
+# test/unit/test_semantic_cache.py
+import pytest
+
+from actions.functions import chat_handler, semantic_cache
+from actions.functions.semantic_cache import SemanticResponseCache, normalize_utterance
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("capital de francia", "capital de italia"),
+    ("me siento bien", "no me siento bien"),
+    ("mundial 2022", "mundial 2018"),
+    ("cuanto es 2 mas 2", "cuanto es 3 mas 3"),
+    ("el perro muerde al gato", "el gato muerde al perro"),
+    ("tengo un perro", "tengo un pero"),
+    ("pedi 100 dosis", "pedi 1000 dosis"),
+    ("hola buenas", "buenas hola"),
+])
+def test_different_messages_never_share_a_response(stored, asked):
+    cache = SemanticResponseCache()
+    cache.set("scope", stored, "respuesta")
+    assert cache.get("scope", asked) is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("hola", "¡Holaaaa!!"),
+    ("hola", "holaa"),
+    ("buenas tardes", "Buenaaas tardes"),
+    ("si", "siiii"),
+    ("perrrro", "perrro"),
+])
+def test_elongations_and_punctuation_share_a_response(stored, asked):
+    cache = SemanticResponseCache()
+    cache.set("scope", stored, "respuesta")
+    assert cache.get("scope", asked) == "respuesta"
+
+
+def test_normalization_keeps_order_digits_and_double_letters():
+    assert normalize_utterance("¡El PERRO, 2000 veces!!") == "el perro 2000 veces"
+    assert normalize_utterance("Holaaaa") == "holaa"
+
+
+def test_exact_only_lookup_skips_variants():
+    cache = SemanticResponseCache()
+    cache.set("scope", "Qué hora es?", "respuesta")
+
+    assert cache.get("scope", "que hora es", similar=False) == "respuesta"
+    assert cache.get("scope", "quee hora es", similar=False) is None
+    assert cache.get("other", "que hora es") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    cache = SemanticResponseCache(ttl=10)
+    cache.set("scope", "hola", "respuesta")
+
+    now[0] += 5
+    assert cache.get("scope", "hola") == "respuesta"
+    now[0] += 6
+    assert cache.get("scope", "hola") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_lru_bounds_entries_and_scopes():
+    cache = SemanticResponseCache(max_scopes=2, max_per_scope=2)
+    cache.set("a", "uno", "1")
+    cache.set("a", "dos", "2")
+    cache.get("a", "uno")           # "dos" pasa a ser el menos usado
+    cache.set("a", "tres", "3")
+
+    assert cache.get("a", "dos") is None
+    assert cache.get("a", "uno") == "1"
+
+    cache.set("b", "hola", "b")
+    cache.get("a", "uno")           # "b" pasa a ser el scope menos usado
+    cache.set("c", "hola", "c")
+    assert cache.get("b", "hola") is None
+    assert cache.get("a", "tres") == "3"
+
+
+class _FakeChatModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_raw(self, messages, temperature, max_tokens):
+        self.calls += 1
+        return f"respuesta {self.calls}"
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = _FakeChatModel()
+    monkeypatch.setattr(chat_handler, "get_chat_model", lambda: model)
+    monkeypatch.setattr(chat_handler, "RESPONSE_CACHE", chat_handler.ResponseCache())
+    monkeypatch.setattr(semantic_cache, "_semantic_cache", SemanticResponseCache())
+    return model
+
+
+def _generate(user_text, **kwargs):
+    template = f'Usuario dice: "{chat_handler.USER_TEXT_PLACEHOLDER}"\nRespondé: Hola.\nBot:'
+    return chat_handler.generate_text_with_context(
+        template, cache_scope="smalltalk:saludo", user_text=user_text, **kwargs
+    )
+
+
+def test_scope_does_not_depend_on_user_text_inside_template(fake_model):
+    # "Bot" también aparece en la plantilla: el scope se arma antes de insertarlo
+    assert _generate("Bot") == "respuesta 1"
+    assert _generate("bot!") == "respuesta 1"
+    assert _generate("Hola") == "respuesta 2"
+    assert fake_model.calls == 2
+
+
+def test_user_text_is_inserted_in_the_prompt(monkeypatch, fake_model):
+    seen = []
+    monkeypatch.setattr(fake_model, "generate_raw", lambda messages, **_: seen.append(messages) or "ok")
+
+    _generate("holis")
+    assert 'Usuario dice: "holis"' in seen[0][-1]["content"]
+    assert chat_handler.USER_TEXT_PLACEHOLDER not in seen[0][-1]["content"]
+
+
+class _FakeTracker:
+    def __init__(self, search_history=None):
+        self.latest_message = {"intent": {"name": "saludo"}}
+        self._slots = {"search_history": search_history}
+
+    def get_slot(self, name):
+        return self._slots.get(name)
+
+
+def test_users_with_a_last_search_share_the_scope(monkeypatch, fake_model):
+    seen = []
+    monkeypatch.setattr(fake_model, "generate_raw", lambda messages, **_: seen.append(messages) or "hola!")
+    searched = _FakeTracker([{"parameters": {"nombre": "amoxicilina"}}])
+
+    assert _generate("hola", tracker=searched) == "hola!"
+    assert _generate("hola", tracker=_FakeTracker()) == "hola!"
+    assert len(seen) == 1
+    assert "amoxicilina" not in seen[0][-1]["content"]   # no entra al prompt compartido
+    assert "Intent actual: saludo" in seen[0][-1]["content"]
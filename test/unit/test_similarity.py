@@ -0,0 +1,72 @@
+# test/unit/test_similarity.py
+import pytest
+
+from actions import conversation_state
+from actions.conversation_state import AdvancedSimilarityMatcher
+
+CANDIDATES = [
+    "Bravecto", "Bravecto Plus", "Nexgard", "Nexgard Spectra", "Simparica", "Simparica Trio",
+    "Revolution", "Frontline", "Ivermectina", "Meloxicam", "mg", "IV", "Amoxicilina", "Ketoprofeno",
+]
+INPUTS = ["bravekto", "nexgar spectra", "simparika trio", "ivermectina 1%", "miligramos", "intravenoso", "x"]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("input_term", INPUTS)
+def test_score_many_matches_pairwise_scores(monkeypatch, use_numpy, input_term):
+    if use_numpy and not conversation_state._HAS_NUMPY:
+        pytest.skip("numpy no instalado")
+    monkeypatch.setattr(conversation_state, "_HAS_NUMPY", use_numpy)
+    matcher = AdvancedSimilarityMatcher()
+
+    batch = matcher.score_many(input_term, CANDIDATES, "producto")
+    pairwise = [matcher.calculate_similarity(input_term, c, "producto") for c in CANDIDATES]
+
+    assert batch == pytest.approx(pairwise, abs=1e-9)
+
+
+def test_score_many_small_batch_and_empty():
+    matcher = AdvancedSimilarityMatcher()
+    assert matcher.score_many("bravecto", []) == []
+    assert matcher.score_many("bravecto", ["Bravecto"]) == [matcher.calculate_similarity("bravecto", "Bravecto")]
+
+
+def _levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def test_near_duplicate_matches_full_levenshtein():
+    import random
+
+    from actions.conversation_state import SuggestionManager
+
+    rng = random.Random(15)
+    base = "amoxicilina con acido clavulanico 500 mg"
+    for _ in range(2000):
+        a = base[:rng.randint(1, len(base))]
+        b = list(a)
+        for _ in range(rng.randint(0, 4)):
+            op, pos = rng.random(), rng.randrange(len(b) + 1)
+            if op < 0.33 and b:
+                b.pop(min(pos, len(b) - 1))
+            elif op < 0.66:
+                b.insert(pos, rng.choice("abcxyz "))
+            elif b:
+                b[min(pos, len(b) - 1)] = rng.choice("abcxyz ")
+        b = "".join(b)
+        expected = 1.0 - _levenshtein(a, b) / max(len(a), len(b), 1) > 0.95
+        assert SuggestionManager._is_near_duplicate(a, b) == expected, (a, b)
+
+
+def test_near_duplicate_threshold_is_strict():
+    from actions.conversation_state import SuggestionManager
+
+    # 20 caracteres, 1 edición: similitud exactamente 0.95 -> no es duplicado
+    assert not SuggestionManager._is_near_duplicate("a" * 20, "a" * 19 + "b")
+    assert SuggestionManager._is_near_duplicate("a" * 21, "a" * 20 + "b")